@@ -0,0 +1,88 @@
+"""
+Исполнитель для asyncio.
+
+Парсеры -- обычные (синхронные) генераторы, поэтому строка разбирается
+и вычисляется в потоке. Но потоки не работают одновременно: есть одна
+"эстафетная палочка" на цикл событий, и каждые every шагов разбора
+поток отдаёт её обратно циклу. Так много вычислений чередуются на одном
+цикле, а цикл не ждёт дольше, чем every шагов одного разбора.
+"""
+import asyncio
+from contextvars import copy_context
+from typing import Any, Dict, Optional
+from weakref import WeakKeyDictionary
+
+from executor import Executor
+from line import Line
+from parser.state import ParseState
+from source import AsyncBaseSource
+
+
+class _Slicer(ParseState):
+    """ Каждые every шагов разбора отдаёт управление циклу событий """
+
+    def __init__(self, every: int, pause):
+        super().__init__()
+        self.every = every
+        self.pause = pause
+        self.steps = 0
+
+    def step(self, parser=None):
+        super().step(parser)
+        self.steps += 1
+
+        if self.steps % self.every == 0:
+            self.pause()
+
+
+class AsyncExecutor(Executor):
+    # Палочка на каждый цикл событий: общая для всех исполнителей этого цикла
+    _batons: Dict[asyncio.AbstractEventLoop, asyncio.Lock] = WeakKeyDictionary()
+
+    def __init__(self, *args, every: int = 1000, **kwargs):
+        """
+        :param every: через сколько шагов разбора отдавать управление циклу
+        """
+        super().__init__(*args, **kwargs)
+        self.every = every
+
+    @classmethod
+    def _baton(cls, loop: asyncio.AbstractEventLoop) -> asyncio.Lock:
+        if loop not in cls._batons:
+            cls._batons[loop] = asyncio.Lock()
+        return cls._batons[loop]
+
+    async def aexecute(self, line: Line) -> Any:
+        loop = asyncio.get_running_loop()
+        context = copy_context()
+
+        return await loop.run_in_executor(None, context.run, self._execute_sliced, line, loop)
+
+    async def run(self, source: AsyncBaseSource) -> Optional[Any]:
+        """ Выполняет все строки источника, возвращает результат последней """
+        result = None
+        async for line in source():
+            result = await self.aexecute(line)
+        return result
+
+    def _execute_sliced(self, line: Line, loop: asyncio.AbstractEventLoop):
+        baton = self._baton(loop)
+
+        self._on_loop(loop, baton.acquire())
+        try:
+            with _Slicer(self.every, lambda: self._on_loop(loop, self._switch(baton))):
+                # Вложенные execute (сгенерированные функции) идут синхронно, но тоже по кускам
+                return self.execute(line)
+        finally:
+            loop.call_soon_threadsafe(baton.release)
+
+    @staticmethod
+    def _on_loop(loop: asyncio.AbstractEventLoop, coroutine):
+        """ Выполнить корутину на цикле и дождаться её в этом потоке """
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    @staticmethod
+    async def _switch(baton: asyncio.Lock):
+        baton.release()
+        await asyncio.sleep(0)
+        await baton.acquire()
@@ -0,0 +1,136 @@
+"""
+Пакетное исполнение на нескольких процессах.
+
+Грамматика прогревается один раз в родителе, воркеры получают её через
+fork (копирование при записи). Строки раздаются воркерам кусками,
+результаты собираются в порядке строк.
+
+Строки, которые меняют грамматику или переменные (присваивание, `|=`, import),
+-- барьеры: всё, что до них, уже посчитано, сам барьер выполняется
+в родителе, а следующие строки считает новый пул, форкнутый уже
+с изменённым состоянием.
+
+По началу строки видно не всё (присваивание -- выражение: `2 * (x = 3)`),
+поэтому воркер ещё и сообщает, поменяла ли строка переменные или грамматику.
+Такая строка выполняется заново в родителе как барьер, а строки после
+неё -- заново, уже с её изменениями.
+
+Результат, который нельзя передать между процессами (pickle), заменяется
+на его repr. Без fork (Windows, macOS по умолчанию) всё выполняется в одном процессе.
+"""
+import io
+import multiprocessing
+import pickle
+from contextlib import redirect_stdout
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from context_dict import current_context
+from executor import Executor
+from line import Line
+from parser import CharParser, OrParser
+from parser.base import BaseParser, ParseError
+from source import BaseSource
+from std_parsers.common import space, spaces, var_name
+
+# Начало строки, которая что-то присваивает (`name = ...`, `name |= ...`) или импортирует модуль
+_mutation = (spaces & var_name & spaces & (CharParser('=') | CharParser.line('|='))
+             | spaces & CharParser.line('import') & space)
+
+# Исполнитель воркера: задаётся перед fork, воркеры получают его копию
+_worker_executor: Optional[Executor] = None
+
+
+def is_mutation(line: Line) -> bool:
+    try:
+        return next(iter(_mutation.parse(line)), None) is not None
+    except ParseError:
+        return False
+
+
+class BatchExecutor:
+    def __init__(self, parser: Union[BaseParser, Callable], processes: Optional[int] = None,
+                 chunksize: int = 64, barrier: Callable[[Line], bool] = is_mutation, **executor_kwargs):
+        """
+        :param processes: число воркеров, None -- по числу ядер
+        :param chunksize: сколько строк воркер получает за раз
+        :param barrier: какие строки выполнять по порядку в родителе
+        :param executor_kwargs: параметры Executor (engine, budget, policy)
+        """
+        self.executor = Executor(parser, **executor_kwargs)
+        self.processes = processes
+        self.chunksize = chunksize
+        self.barrier = barrier
+
+    def execute(self, source: BaseSource) -> List[Any]:
+        lines = list(source())
+        results: List[Any] = []
+
+        # Переменные воркеров -- область, из которой запущен пакет
+        self.executor.variables = current_context.get()
+
+        i = 0
+        while i < len(lines):
+            if self.barrier(lines[i]):
+                results.append(_execute(self.executor, lines[i]))
+                i += 1
+                continue
+
+            end = i
+            while end < len(lines) and not self.barrier(lines[end]):
+                end += 1
+
+            done, is_mutated = self._execute_parallel(lines[i:end])
+            results.extend(done)
+            i += len(done)
+
+            if is_mutated:
+                # Строка поменяла состояние в воркере: там изменения пропадут -- выполняем её в родителе
+                results.append(_execute(self.executor, lines[i]))
+                i += 1
+
+        return results
+
+    def _execute_parallel(self, lines: List[Line]) -> Tuple[List[Any], bool]:
+        """ Результаты до первой строки, которая поменяла состояние (и была ли такая) """
+        if self.processes == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            return [_execute(self.executor, line) for line in lines], False
+
+        global _worker_executor
+        _worker_executor = self.executor
+        try:
+            with multiprocessing.get_context('fork').Pool(self.processes) as pool:
+                done = pool.map(_execute_in_worker, [(line.line, line.number) for line in lines], self.chunksize)
+        finally:
+            _worker_executor = None
+
+        for index, (result, is_mutated) in enumerate(done):
+            if is_mutated:
+                return [result for result, _ in done[:index]], True
+
+        return [result for result, _ in done], False
+
+
+def _execute(executor: Executor, line: Line) -> Any:
+    # Вывод исполнителя не нужен: результаты возвращаются списком
+    with redirect_stdout(io.StringIO()):
+        return executor.execute(line)
+
+
+def _state(executor: Executor):
+    """ Меняется, если строка поменяла переменные или грамматику """
+    variables = executor.variables if executor.variables is not None else current_context.get()
+    return variables.version, OrParser.generation
+
+
+def _execute_in_worker(item) -> Tuple[Any, bool]:
+    text, number = item
+    before = _state(_worker_executor)
+    result = _execute(_worker_executor, Line(text, number))
+    is_mutated = _state(_worker_executor) != before
+
+    try:
+        pickle.dumps(result)
+    except Exception:
+        return repr(result), is_mutated
+
+    return result, is_mutated
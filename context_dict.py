@@ -0,0 +1,155 @@
+"""
+ContextDict -- область видимости переменных.
+
+Области вкладываются цепочкой: чтение идёт от текущей области к корню,
+запись -- только в текущую. fork() создаёт дочернюю область за O(1)
+(вызов функции, сессия), родитель при этом не меняется.
+
+version меняется при любом изменении привязок в цепочке, поэтому кэши,
+построенные по именам (например, DictParser), живут, пока имена не поменялись.
+
+Значение Lazy строится при первом чтении (так std-грамматики
+собираются, только когда к ним обращаются) -- в глобальной области
+и без расширений грамматики сессии (use_global_context).
+"""
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# Помечает удалённое имя, которое есть у родителя
+_DELETED = object()
+
+_stamps = count(1)
+
+
+class Lazy:
+    """ Значение, которое строится при первом чтении; строится в глобальной области """
+
+    def __init__(self, build: Callable[[], Any]):
+        self.build = build
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.build}>"
+
+
+class ContextDict(MutableMapping):
+    def __init__(self, data: Optional[Dict[str, Any]] = None, parent: Optional['ContextDict'] = None):
+        self.parent = parent
+        self.local: Dict[str, Any] = dict(data or {})
+        self._stamp = next(_stamps)
+
+    def fork(self, **bindings) -> 'ContextDict':
+        return ContextDict(bindings, self)
+
+    def _changed(self):
+        self._stamp = next(_stamps)
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """ Разный у разных областей и после любого изменения в цепочке """
+        stamp, context = self._stamp, self.parent
+        while context is not None:
+            stamp = max(stamp, context._stamp)
+            context = context.parent
+        return id(self), stamp
+
+    def __getitem__(self, key: str) -> Any:
+        context = self
+        while context is not None:
+            if key in context.local:
+                value = context.local[key]
+                if value is _DELETED:
+                    break
+                if isinstance(value, Lazy):
+                    value = context._build(key, value)
+                return value
+            context = context.parent
+        raise KeyError(key)
+
+    def _build(self, key: str, lazy: Lazy) -> Any:
+        # Построение может само записать имена (std-модули регистрируют свои переменные)
+        with use_global_context():
+            value = lazy.build()
+
+        if self.local.get(key) is lazy:
+            self[key] = value
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.local[key] = value
+        self._changed()
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+
+        if self.parent is not None and key in self.parent:
+            self.local[key] = _DELETED
+        else:
+            del self.local[key]
+        self._changed()
+
+    def __contains__(self, key) -> bool:
+        # Без чтения значения: Lazy при этом не строится
+        context = self
+        while context is not None:
+            if key in context.local:
+                return context.local[key] is not _DELETED
+            context = context.parent
+        return False
+
+    def __iter__(self) -> Iterator[str]:
+        # Порядок -- как у dict: сначала имена корня
+        chain = []
+        context = self
+        while context is not None:
+            chain.append(context)
+            context = context.parent
+
+        keys = {}
+        for context in reversed(chain):
+            for key, value in context.local.items():
+                if value is _DELETED:
+                    keys.pop(key, None)
+                else:
+                    keys[key] = None
+
+        return iter(keys)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        depth, context = 0, self.parent
+        while context is not None:
+            depth, context = depth + 1, context.parent
+        return f"<{self.__class__.__name__}: {len(self.local)} local, depth {depth}>"
+
+
+# Глобальная область (std-переменные) и текущая область исполнения
+global_context = ContextDict()
+current_context: ContextVar[ContextDict] = ContextVar('current_context', default=global_context)
+
+
+@contextmanager
+def use_context(context: ContextDict):
+    token = current_context.set(context)
+    try:
+        yield context
+    finally:
+        current_context.reset(token)
+
+
+@contextmanager
+def use_global_context():
+    """ Глобальная область и общая грамматика: `|=` не уходит в расширения текущей сессии """
+    from parser.logic.or_parser import grammar_extensions
+
+    token = grammar_extensions.set(None)
+    try:
+        with use_context(global_context):
+            yield global_context
+    finally:
+        grammar_extensions.reset(token)
@@ -1,13 +1,49 @@
 from traceback import print_exc
-from typing import Union, Callable
+from typing import Union, Callable, Optional, Iterable
 
+from context_dict import ContextDict, current_context, use_context
 from line import Line
-from parser.base import BaseParser
+from parser.base import BaseParser, ParseError
+from parser.budget import ParseBudget, ParseBudgetError
+from parser.engine import BaseEngine, get_engine
+from parser.parse_variant import ParseVariant
+from parser.priority_parser import tree_priority
+from parser.state import new_parse_memo
+
+# all -- вычислить все варианты (результат последнего), остальные вычисляют один:
+# first -- первый найденный, priority -- с самой сильной внешней операцией,
+# longest -- съевший больше всего строки, unique -- единственный, иначе ошибка
+POLICIES = ('all', 'first', 'priority', 'longest', 'unique')
+
+
+class AmbiguousParseError(ParseError):
+    pass
 
 
 class Executor:
-    def __init__(self, parser: Union[BaseParser, Callable]):
+    def __init__(self, parser: Union[BaseParser, Callable], engine: Union[str, BaseEngine] = 'host',
+                 budget: Optional[ParseBudget] = None, policy: str = 'all',
+                 variables: Optional[ContextDict] = None):
+        """
+        :param engine: 'host' -- обычный разбор, 'forest' -- разбор в общий лес (parser.forest),
+                       'vm' -- скомпилированная программа (parser.vm),
+                       'compiled' -- сгенерированный код на Python (parser.codegen)
+        :param budget: ограничения на разбор одной строки (parser.budget)
+        :param policy: какой вариант вычислять, см. POLICIES
+        :param variables: область переменных для строк, None -- текущая область
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {repr(policy)}, use one of: {', '.join(POLICIES)}")
+
         self._parser = parser
+        self.engine = get_engine(engine)
+        self.budget = budget
+        # Статистика последнего разбора с бюджетом (ParseStats)
+        self.stats = None
+        # Исключение, которым закончилась последняя строка (None -- без ошибок)
+        self.error = None
+        self.policy = policy
+        self.variables = variables
         self.debug = False
 
     def change_debug(self, _to: bool):
@@ -19,16 +55,57 @@ class Executor:
             return self._parser()
         return self._parser
 
-    def execute(self, line: Line):
+    def execute(self, line: Line, variables: Optional[ContextDict] = None):
+        """
+        :param variables: область для этой строки (например, вызов функции)
+        """
+        context = variables if variables is not None else self.variables
+        if context is None:
+            context = current_context.get()
+
+        with use_context(context):
+            return self._execute_safe(line)
+
+    def _execute_safe(self, line: Line):
+        self.error = None
         try:
             return self._execute(line)
+        except (ParseBudgetError, AmbiguousParseError) as e:
+            self.error = e
+            # Не глушим: вызывающий должен узнать, что строка слишком дорогая
+            # или неоднозначная (policy='unique')
+            print(f"| ⛔ {e}")
+            raise
         except Exception as e:
+            self.error = e
             print_exc()
             if self.debug:
                 raise
 
+    def _parse(self, line: Line):
+        # У каждой строки своё мемо разбора (parser.state)
+        with new_parse_memo():
+            if self.budget is None:
+                return self.engine.parse(self.parser, line)
+
+            with self.budget.start() as self.stats:
+                return self.engine.parse(self.parser, line)
+
+    def _iter_parse(self, line: Line) -> Iterable[ParseVariant]:
+        """ Варианты по одному: разбор идёт, только пока их просят """
+        with new_parse_memo():
+            if self.budget is None:
+                yield from self.engine.iter_parse(self.parser, line)
+                return
+
+            with self.budget.start() as self.stats:
+                yield from self.engine.iter_parse(self.parser, line)
+
     def _execute(self, line: Line):
-        results = list(self.parser.parse(line))
+        if self.policy != 'all':
+            return self._calculate(self._select(line))
+
+        results = self._parse(line)
 
         assert len(results) != 0, "Please catch this"
 
@@ -38,23 +115,64 @@ class Executor:
         exec_result = None
 
         for result in results:
-            if self.debug:
-                print("|- Parsed:")
-                print(f"|  - {result}")
-
-                if result.line:
-                    print(f"|- Line:")
-                    print(f"|  `{result.line}`")
+            exec_result = self._calculate(result)
 
-                print(f"|- Execute:")
-                print(f"|")
+        return exec_result
 
-            exec_result = result.parser.calculate(self)
+    def _select(self, line: Line) -> ParseVariant:
+        """ Выбирает один вариант по self.policy, не вычисляя остальные """
+        variants = self._iter_parse(line)
 
-            if self.debug:
-                print(f"|- Finished. Result:")
-                print(f"   `{exec_result}`")
+        try:
+            if self.policy == 'first':
+                selected = next(variants, None)
+            elif self.policy == 'unique':
+                selected = next(variants, None)
+                if next(variants, None) is not None:
+                    raise AmbiguousParseError("More than one result", line=line)
+            elif self.policy == 'longest':
+                selected = None
+                for variant in variants:
+                    if selected is None or len(variant.line) < len(selected.line):
+                        selected = variant
             else:
-                print(f"`-> {exec_result}")
+                selected, selected_priority = None, None
+                for variant in variants:
+                    priority = tree_priority(variant.parser)
+                    if selected is None or _higher(priority, selected_priority):
+                        selected, selected_priority = variant, priority
+        finally:
+            variants.close()
+
+        assert selected is not None, "Please catch this"
+
+        return selected
+
+    def _calculate(self, result: ParseVariant):
+        if self.debug:
+            print("|- Parsed:")
+            print(f"|  - {result}")
+
+            if result.line:
+                print(f"|- Line:")
+                print(f"|  `{result.line}`")
+
+            print(f"|- Execute:")
+            print(f"|")
+
+        exec_result = self.engine.calculate(result.parser, self)
+
+        if self.debug:
+            print(f"|- Finished. Result:")
+            print(f"   `{exec_result}`")
+        else:
+            print(f"`-> {exec_result}")
 
         return exec_result
+
+
+def _higher(priority: Optional[int], other: Optional[int]) -> bool:
+    """ Без приоритета -- как самый высокий """
+    if priority is None:
+        return other is not None
+    return other is not None and priority > other
@@ -15,6 +15,9 @@ class Line:
         # При взятии подстроки
         self.pos = pos
         self.parent = parent
+        # Начало в самой первой строке (от которой взяты все подстроки)
+        self.offset = pos + (parent.offset if parent is not None else 0)
+        self.root: Line = parent.root if parent is not None else self
 
     def __getitem__(self, item) -> "Line":
         if isinstance(item, slice):
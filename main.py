@@ -1,16 +1,21 @@
+import os
 from time import time
 
 from _help import abs_help
 from executor import Executor
 from live_source import LiveSource
+from modules import ModuleLoader
 from parser import EndLineParser, KeyArgument, FuncParser
+from snapshot import StdGrammar, SnapshotError, cache_dir, load_snapshot, save_snapshot, snapshots_enabled
 from std_parsers import number_expressions, comment_parser
 from std_parsers import system_expressions
 from std_parsers import parser_parser
 from std_parsers.common import spaces
 from std_parsers.variable import variables
 
-_core_parser = number_expressions | system_expressions | parser_parser
+module_loader = ModuleLoader()
+
+_core_parser = number_expressions | system_expressions | parser_parser | module_loader.use_import()
 
 live_parser = EndLineParser(FuncParser(
     KeyArgument("calc_result", _core_parser)
@@ -23,10 +28,24 @@ variables['@'] = _core_parser
 variables['@spaces'] = variables['__'] = spaces
 variables['help'] = abs_help
 
+# Std-грамматика до изменений пользователя: на неё ссылаются снимки
+std_grammar = StdGrammar()
+module_loader.std = std_grammar
+
 if __name__ == '__main__':
     source = LiveSource()
     executor = Executor(lambda: variables['@@'])
 
+    # Снимок сессии -- только по ABSTRACTLY_SNAPSHOT=1 и только из каталога пользователя
+    SNAPSHOT_PATH = os.path.join(cache_dir(), 'session.snapshot') if snapshots_enabled() else None
+
+    if SNAPSHOT_PATH is not None and os.path.exists(SNAPSHOT_PATH):
+        try:
+            load_snapshot(SNAPSHOT_PATH, std_grammar)
+            print(f"Snapshot loaded: {SNAPSHOT_PATH}")
+        except SnapshotError as e:
+            print(f"⚠️ Snapshot skipped: {e}")
+
     variables['_debug'] = executor.change_debug
 
     print("Hello from Abstractly[iter0]!")
@@ -35,8 +54,13 @@ if __name__ == '__main__':
     print("* Online help:  https://github.com/KorovinViktor/abstractly_lang/blob/master/Readme.md")
     print("* Just type help()")
 
-    for line in source():
-        st = time()
-        executor.execute(line)
-        tm = time() - st
-        print(f"Time: {tm * 1000:.2f}ms")
+    try:
+        for line in source():
+            st = time()
+            executor.execute(line)
+            tm = time() - st
+            print(f"Time: {tm * 1000:.2f}ms")
+    except (EOFError, KeyboardInterrupt):
+        # Обычный выход из REPL; при падении снимок не пишем
+        if SNAPSHOT_PATH is not None:
+            print(f"\nSnapshot saved: {save_snapshot(SNAPSHOT_PATH, std_grammar)}")
@@ -0,0 +1,159 @@
+"""
+Модули: `import name`.
+
+Модуль -- файл `name.abs` с обычными строками языка. Он выполняется
+в своей области (поверх глобальной), потом все его переменные
+(парсеры, функции, значения) копируются в область, откуда был import,
+а альтернативы, которые он дописал через `|=`, остаются в грамматике.
+
+Если снимки включены (ABSTRACTLY_SNAPSHOT=1), результат разбора кэшируется
+в каталоге пользователя (snapshot.cache_dir), как __pycache__:
+`modules/name.<хэш пути>.<хэш содержимого>.snapshot` (формат snapshot.py).
+Повторный import неизменённого модуля не разбирает его строки,
+а только загружает готовые парсеры. Рядом с модулями кэш не хранится:
+чужой файл снимка выполнил бы при загрузке произвольный код.
+"""
+import hashlib
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from context_dict import current_context, global_context
+from line import Line
+from parser import CharParser, FuncParser, KeyArgument
+from parser.base import BaseParser
+from snapshot import (StdGrammar, SnapshotError, alternatives_count, apply_snapshot, cache_dir, grammar_additions,
+                      read_snapshot, snapshots_enabled, write_snapshot)
+from source import BaseSource
+from std_parsers.common import space, var_name
+
+MODULE_SUFFIX = '.abs'
+# Подкаталог кэша модулей в snapshot.cache_dir()
+CACHE_DIR = 'modules'
+
+# Где искать модули
+module_path: List[str] = ['.', *filter(None, os.environ.get('ABSTRACTLY_PATH', '').split(os.pathsep))]
+
+
+class ImportModuleError(Exception):
+    pass
+
+
+class Module:
+    def __init__(self, name: str, path: str, variables: Dict[str, Any], grammar: Dict[Tuple, Tuple], cached: bool):
+        self.name = name
+        self.path = path
+        self.variables = variables
+        self.grammar = grammar
+        # Загружен из кэша, а не разобран заново
+        self.cached = cached
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.name} ({len(self.variables)} names)>"
+
+
+class ModuleSource(BaseSource):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.path = path
+
+    def __call__(self):
+        with open(self.path, encoding='utf-8') as f:
+            for i, line in enumerate(f.read().split("\n")):
+                # Пустые строки и комментарии модуля не исполняем
+                if line.strip() and not line.strip().startswith('#'):
+                    yield Line(line, i, self)
+
+
+class ModuleLoader:
+    def __init__(self, std: Optional[StdGrammar] = None):
+        """
+        :param std: std-грамматика, на которую ссылается кэш (задаётся после её построения, см. main.py)
+        """
+        self.std = std
+
+    def find(self, name: str) -> str:
+        for directory in module_path:
+            path = os.path.join(directory, name + MODULE_SUFFIX)
+            if os.path.isfile(path):
+                return path
+
+        raise ImportModuleError(f"Module {name} not found in {module_path}")
+
+    @staticmethod
+    def cache_path(path: str, source_hash: str) -> str:
+        name = os.path.basename(path)[:-len(MODULE_SUFFIX)]
+        path_hash = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()
+        return os.path.join(cache_dir(CACHE_DIR), f"{name}.{path_hash[:8]}.{source_hash[:16]}.snapshot")
+
+    def load(self, name: str, executor: 'Executor') -> Module:
+        """ Повторный import в той же области ничего не делает """
+        context = current_context.get()
+        key = f"@module:{name}"
+        if key in context:
+            return context[key]
+
+        module = self._load(name, executor)
+        context[key] = module
+        return module
+
+    def _load(self, name: str, executor: 'Executor') -> Module:
+        path = self.find(name)
+
+        if not snapshots_enabled():
+            return self._execute(name, path, executor)
+
+        with open(path, 'rb') as f:
+            source_hash = hashlib.sha256(f.read()).hexdigest()
+        try:
+            cache_path = self.cache_path(path, source_hash)
+        except OSError:
+            # Каталог кэша не создать -- работаем без кэша
+            return self._execute(name, path, executor)
+
+        if os.path.exists(cache_path):
+            try:
+                variables, grammar = read_snapshot(cache_path, self.std)
+            except SnapshotError:
+                pass
+            else:
+                apply_snapshot(self.std, variables, grammar)
+                return Module(name, path, variables, grammar, cached=True)
+
+        module = self._execute(name, path, executor)
+
+        try:
+            write_snapshot(cache_path, self.std, module.variables, module.grammar)
+        except OSError:
+            # Нет прав на запись -- работаем без кэша
+            pass
+
+        return module
+
+    def _execute(self, name: str, path: str, executor: 'Executor') -> Module:
+        before = alternatives_count(self.std)
+        scope = global_context.fork()
+
+        for line in ModuleSource(path)():
+            executor.execute(line, scope)
+            if executor.error is not None:
+                raise ImportModuleError(f"{path}:{line.number + 1}: {executor.error}")
+
+        # `@number |= ...` перезаписывает имя тем же std-парсером -- это не переменная модуля
+        module_variables = {
+            key: value for key, value in scope.local.items()
+            if key not in global_context or global_context[key] is not value
+        }
+        current_context.get().update(module_variables)
+
+        return Module(name, path, module_variables, grammar_additions(self.std, before), cached=False)
+
+    def use_import(self) -> BaseParser:
+        """ Строка `import name` """
+
+        def _import(*result, name: str, _executor=None):
+            return self.load(name, _executor)
+
+        return FuncParser(
+            CharParser.line("import") & space[1:] & KeyArgument('name', var_name),
+            _import
+        )
@@ -4,11 +4,16 @@ from .common.end_line_parser import EndLineParser, NotFoundEndLineError
 
 from .func.func_parser import FuncParser
 from .func.key_argument import KeyArgument
+from .func.text_parser import Text, TextParser
 
 from .logic.and_parser import AndParser, AndParserError
 from .logic.char_parser import CharParser, CharParserInitError
 from .logic.empty_parser import EmptyParser
 from .logic.or_parser import OrParser, OrParserError
+from .logic.ordered_parser import OrderedParser, OrderedParserError
+from .logic.cut_parser import CutParser
+from .logic.factored_parser import FactoredParser, FactoredParserError
+from .logic.lookahead_parser import LookaheadParser, LookaheadParserError
 from .logic.repeat_parser import RepeatParser, RepeatParserError, RepeatParserValuesError
 from .logic.dict_parser import DictParser
-from .priority_parser import BasePriority, PriorityParser
+from .priority_parser import BasePriority, PriorityParser, GroupParser
@@ -1,7 +1,8 @@
-from typing import Iterable, Dict, Any, Tuple
+from typing import Iterable, Dict, Any, Optional, Tuple, Set, Union
 
 from line import Line
 from parser.parse_variant import ParseVariant
+from parser.state import parse_state
 
 
 class MetaParser(type):
@@ -12,8 +13,22 @@ class MetaParser(type):
         #     for an, a in attributes.items():
         #         if callable(a):
         #             attributes[an] = mcls._catcher(mcls, a)
+        if 'parse' in attributes:
+            attributes['parse'] = mcls._tracked(mcls, attributes['parse'])
         return super().__new__(mcls, name, bases, attributes)
 
+    def _tracked(mcls, f):
+        """ Если разбор идёт с состоянием -- оно видит каждый вызов parse и каждый вариант """
+        def _(self, line):
+            state = parse_state.get()
+            if state is None:
+                return f(self, line)
+            return state.track(self, f(self, line))
+
+        _.__name__ = f.__name__
+        _.__doc__ = f.__doc__
+        return _
+
     def _memo(mcls, f):
         def _(self, line):
             if (self, line) not in mcls.__memo__:
@@ -55,6 +70,16 @@ class BaseParser(metaclass=MetaParser):
         """
         raise NotImplementedError()
 
+    def match(self, line: Union[str, Line]) -> bool:
+        """ Разбирается ли строка целиком (без деревьев результата, см. parser.recognize) """
+        from parser.recognize import match
+        return match(self, line)
+
+    def match_length(self, line: Union[str, Line]) -> Optional[int]:
+        """ Длина самого длинного разобранного начала строки, None -- не разбирается """
+        from parser.recognize import match_length
+        return match_length(self, line)
+
     def __repr__(self):
         return f"<{self.__class__.__name__}>"
 
@@ -86,6 +111,14 @@ class BaseParser(metaclass=MetaParser):
         from parser.logic.and_parser import AndParser
         return AndParser(self, other)
 
+    def __truediv__(self, other: 'BaseParser'):
+        from parser.logic.ordered_parser import OrderedParser
+        return OrderedParser(self, other)
+
+    def __invert__(self):
+        from parser.logic.cut_parser import CutParser
+        return CutParser(self)
+
     def __hash__(self):
         raise NotImplementedError()
 
@@ -109,15 +142,25 @@ class BaseParser(metaclass=MetaParser):
         """ Список парсеров внутри """
         raise NotImplementedError()
 
+    def children(self) -> Tuple['BaseParser', ...]:
+        """ Непосредственные дочерние парсеры (без рекурсии) """
+        return ()
+
+    def _continue_from(self, target: 'BaseParser', variant: ParseVariant,
+                       path: Set[int]) -> Iterable[ParseVariant]:
+        """
+        Дорабатывает разбор, если самый левый target уже разобран как variant.
+        path -- id парсеров, из которых target достижим слева (см. parser.lrec)
+        """
+        if self is target:
+            yield variant
+
     def __ior__(self, other):
         raise NotImplementedError("Only for OrParser")
 
     def __iand__(self, other):
         raise NotImplementedError("Only for AndParser")
 
-    def clear_cache(self):
-        pass
-
 
 class BaseParserError(Exception):
     def __init__(self, msg: str, parser: BaseParser = None):
@@ -0,0 +1,110 @@
+"""
+Бюджет разбора.
+
+Грамматику можно задать так (например, вложенные повторы `x:(a|b)[:]`),
+что одна строка будет перебирать миллионы вариантов. Бюджет ограничивает
+один разбор: число вызовов parse (шагов), число вариантов от одного
+вызова и время. При превышении разбор прерывается ParseBudgetError
+со статистикой того, что успели сделать.
+
+ParseBudgetError -- не ParseError: парсеры ловят ParseError, чтобы
+попробовать другую ветку, а бюджет должен останавливать разбор целиком.
+"""
+from time import perf_counter
+from typing import Optional
+
+from parser.base import BaseParser, BaseParserError
+from parser.state import ParseState
+
+
+class ParseBudgetError(BaseParserError):
+    def __init__(self, msg: str, stats: 'ParseStats', parser: BaseParser = None):
+        super().__init__(msg, parser)
+        self.stats = stats
+
+    def __str__(self):
+        return f"{self.msg} ({self.stats})"
+
+
+class ParseBudget:
+    def __init__(self,
+                 max_steps: Optional[int] = None,
+                 max_variants: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        """
+        :param max_steps: сколько всего раз можно вызвать parse
+        :param max_variants: сколько вариантов может отдать один вызов parse
+        :param timeout: секунд на весь разбор
+        """
+        self.max_steps = max_steps
+        self.max_variants = max_variants
+        self.timeout = timeout
+
+    def start(self) -> 'ParseStats':
+        return ParseStats(self)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: steps={self.max_steps} " \
+               f"variants={self.max_variants} timeout={self.timeout}>"
+
+
+class ParseStats(ParseState):
+    """
+    Счётчики одного разбора. Пока открыто (with), его видят все парсеры
+    """
+
+    def __init__(self, budget: ParseBudget):
+        super().__init__()
+        self.budget = budget
+        self.steps = 0
+        self.variants = 0
+        self.max_node_variants = 0
+        self.started = perf_counter()
+        self.finished: Optional[float] = None
+        self._deadline = None if budget.timeout is None else self.started + budget.timeout
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or perf_counter()) - self.started
+
+    def __enter__(self):
+        self.started = perf_counter()
+        if self.budget.timeout is not None:
+            self._deadline = self.started + self.budget.timeout
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.finished = perf_counter()
+        super().__exit__(exc_type, exc_val, exc_tb)
+
+    def step(self, parser: BaseParser = None):
+        super().step(parser)
+        self.steps += 1
+
+        if self.budget.max_steps is not None and self.steps > self.budget.max_steps:
+            raise ParseBudgetError("Too many parse steps", self, parser)
+
+        self._check_time(parser)
+
+    def node_variants(self, count: int, parser: BaseParser = None):
+        super().node_variants(count, parser)
+        self.variants += 1
+        if count > self.max_node_variants:
+            self.max_node_variants = count
+
+        if self.budget.max_variants is not None and count > self.budget.max_variants:
+            raise ParseBudgetError("Too many variants in one parser", self, parser)
+
+        self._check_time(parser)
+
+    def _check_time(self, parser: BaseParser = None):
+        if self._deadline is not None and perf_counter() > self._deadline:
+            raise ParseBudgetError("Parse timeout", self, parser)
+
+    def __str__(self):
+        return f"steps: {self.steps}, variants: {self.variants}, " \
+               f"max variants per parser: {self.max_node_variants}, " \
+               f"time: {self.elapsed * 1000:.2f}ms"
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self}>"
@@ -0,0 +1,369 @@
+"""
+Генератор парсера: грамматика -> исходник на Python.
+
+Для грамматики с корнем в любом парсере (например, variables['@@'])
+пишется модуль из специализированных функций разбора: по функции
+на правило (правила -- как у parser.vm), внутри которых проверки
+символов и наборов символов вписаны прямо в код, а And и повторы
+развёрнуты в циклы по спискам вариантов, как у AndParser и RepeatParser.
+Регулярные куски разбираются одним вызовом RegularMatcher.match (parser.regular)
+или читаются из TokenStream (tokenize=True, parser.tokens), TextParser -- срезом строки.
+Исходник компилируется (compile / exec) и хранится, пока грамматика
+не поменялась (`|=`), см. CompilingEngine.
+
+Мемо вызовов правил и левая рекурсия -- общие с parser.vm (Machine):
+сгенерированная функция правила вызывает другие правила через rt.call.
+Деревья и порядок вариантов -- как у обычного разбора.
+"""
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional
+
+from line import Line
+from parser.base import BaseParser, ParseError
+from parser.common.end_line_parser import EndLineParser
+from parser.engine import CompilingEngine
+from parser.func.func_parser import FuncParser
+from parser.func.key_argument import KeyArgument
+from parser.func.text_parser import TextParser
+from parser.graph import char_set, cycle_heads, plain_wrapper
+from parser.logic.and_parser import AndParser
+from parser.logic.char_parser import CharParser
+from parser.logic.empty_parser import EmptyParser
+from parser.logic.or_parser import OrParser
+from parser.logic.repeat_parser import RepeatParser
+from parser.parse_variant import ParseVariant
+from parser.priority_parser import GroupParser
+from parser.regular import RegularAnalysis
+from parser.tokens import Lexer, TokenParser
+from parser.vm import Machine, Program, Rule
+
+# Глубже -- выносим узел в отдельную функцию (у Python ограничена вложенность блоков)
+MAX_INDENT = 12
+
+# Обёртки, которые ничего не отбрасывают: _wrap вызывается напрямую
+_SIMPLE_WRAPPERS = (FuncParser, KeyArgument, GroupParser, EndLineParser)
+
+_HEADER = '''\
+# Сгенерировано parser.codegen для {root}
+# R -- правила, N -- узлы грамматики и RegularMatcher, S -- наборы символов
+from parser.logic.and_parser import AndParser
+from parser.logic.char_parser import CharParser
+from parser.logic.empty_parser import EmptyParser
+from parser.func.text_parser import Text
+'''
+
+
+def wrap(parser: BaseParser, tree: BaseParser):
+    """ Обёртка над деревом ребёнка; None -- обёртка вариант отбросила (PriorityParser) """
+    wrapped = next(iter(parser._wrap_variants([ParseVariant(tree, None)])), None)
+    return None if wrapped is None else wrapped.parser
+
+
+class _Function:
+    def __init__(self, name: str, doc: str):
+        self.name = name
+        self.lines = [
+            f"def {name}(rt, pos):",
+            f"    # {doc}",
+            "    s = rt.text",
+            "    size = len(s)",
+            "    out = []",
+        ]
+
+    def add(self, indent: int, text: str):
+        self.lines.append("    " * indent + text)
+
+    def source(self) -> str:
+        return "\n".join(self.lines + ["    return out"])
+
+
+# Продолжение: что делать с очередным вариантом (функция, конец, дерево, отступ)
+_Cont = Callable[[_Function, str, str, int], None]
+
+
+class _Generator:
+    def __init__(self, root: BaseParser, lexer: Optional[Lexer] = None):
+        self.root = root
+        self.cyclic = cycle_heads(root)
+        self.regular = RegularAnalysis() if lexer is None else lexer.analysis
+        self.rules: Dict[int, Rule] = {}
+        self.order: List[Rule] = []
+        self.pending: List[Rule] = []
+
+        self.nodes: List[BaseParser] = []
+        self._node_index: Dict[int, int] = {}
+        self.sets: List[frozenset] = []
+        self._set_index: Dict[frozenset, int] = {}
+
+        self.functions: List[_Function] = []
+        self._names = count()
+
+        self.rule(root)
+
+    def generate(self) -> str:
+        while self.pending:
+            self._rule_function(self.pending.pop())
+
+        return "\n\n\n".join(
+            [_HEADER.format(root=_describe(self.root))] +
+            [function.source() for function in self.functions]
+        ) + "\n"
+
+    def rule(self, parser: BaseParser) -> Rule:
+        if id(parser) not in self.rules:
+            rule = Rule(len(self.order), parser)
+            self.rules[id(parser)] = rule
+            self.order.append(rule)
+            self.pending.append(rule)
+        return self.rules[id(parser)]
+
+    def _node(self, parser: BaseParser) -> str:
+        if id(parser) not in self._node_index:
+            self._node_index[id(parser)] = len(self.nodes)
+            self.nodes.append(parser)
+        return f"N[{self._node_index[id(parser)]}]"
+
+    def _set(self, chars: frozenset) -> str:
+        if chars not in self._set_index:
+            self._set_index[chars] = len(self.sets)
+            self.sets.append(chars)
+        return f"S[{self._set_index[chars]}]"
+
+    def _var(self, prefix: str) -> str:
+        return f"{prefix}{next(self._names)}"
+
+    def _is_rule(self, parser: BaseParser) -> bool:
+        if id(parser) in self.rules or id(parser) in self.cyclic:
+            return True
+        return type(parser) is OrParser and char_set(parser) is None
+
+    @staticmethod
+    def _collect(fn: _Function, end: str, tree: str, indent: int):
+        fn.add(indent, f"out.append(({end}, {tree}))")
+
+    def _rule_function(self, rule: Rule):
+        fn = _Function(f"rule_{rule.index}", _describe(rule.parser))
+        self.functions.append(fn)
+
+        parser = rule.parser
+        if type(parser) is OrParser and char_set(parser) is None:
+            # Тело правила -- сам выбор: альтернативы по порядку
+            for alternative in parser.parsers:
+                self.emit(fn, alternative, "pos", 1, self._collect)
+        else:
+            self.emit_node(fn, parser, "pos", 1, self._collect)
+
+    def emit(self, fn: _Function, parser: BaseParser, pos: str, indent: int, cont: _Cont):
+        if self._is_rule(parser):
+            end, tree = self._var("p"), self._var("t")
+            fn.add(indent, f"for {end}, {tree} in rt.call(R[{self.rule(parser).index}], {pos}):")
+            cont(fn, end, tree, indent + 1)
+        elif indent > MAX_INDENT:
+            self._split(fn, parser, pos, indent, cont)
+        else:
+            self.emit_node(fn, parser, pos, indent, cont)
+
+    def _split(self, fn: _Function, parser: BaseParser, pos: str, indent: int, cont: _Cont):
+        """ Узел -- отдельной функцией """
+        helper = _Function(self._var("node_"), _describe(parser))
+        self.functions.append(helper)
+        self.emit_node(helper, parser, "pos", 1, self._collect)
+
+        end, tree = self._var("p"), self._var("t")
+        fn.add(indent, f"for {end}, {tree} in {helper.name}(rt, {pos}):")
+        cont(fn, end, tree, indent + 1)
+
+    def emit_node(self, fn: _Function, parser: BaseParser, pos: str, indent: int, cont: _Cont):
+        kind = type(parser)
+        end, tree = self._var("p"), self._var("t")
+        matcher = self.regular.matcher(parser)
+
+        if kind is TokenParser:
+            matcher = parser.matcher
+
+        if matcher is not None:
+            fn.add(indent, f"for {end}, {tree} in rt.regular({self._node(matcher)}, {pos}):")
+            cont(fn, end, tree, indent + 1)
+        elif kind is CharParser:
+            fn.add(indent, f"if {pos} < size and s[{pos}] == {parser.ch!r}:")
+            fn.add(indent + 1, f"{end} = {pos} + 1")
+            fn.add(indent + 1, f"{tree} = CharParser({parser.ch!r})")
+            cont(fn, end, tree, indent + 1)
+        elif kind is OrParser:
+            fn.add(indent, f"if {pos} < size and s[{pos}] in {self._set(char_set(parser))}:")
+            fn.add(indent + 1, f"{end} = {pos} + 1")
+            fn.add(indent + 1, f"{tree} = CharParser(s[{pos}])")
+            cont(fn, end, tree, indent + 1)
+        elif kind is EmptyParser:
+            fn.add(indent, f"{tree} = EmptyParser()")
+            cont(fn, pos, tree, indent)
+        elif kind is AndParser:
+            self._emit_and(fn, parser, pos, indent, cont)
+        elif kind is RepeatParser:
+            self._emit_repeat(fn, parser, pos, indent, cont)
+        elif kind is TextParser:
+            self._emit_text(fn, parser, pos, indent, cont)
+        elif kind is EndLineParser or plain_wrapper(parser):
+            self._emit_wrapper(fn, parser, pos, indent, cont)
+        else:
+            fn.add(indent, f"for {end}, {tree} in rt.host({self._node(parser)}, {pos}):")
+            cont(fn, end, tree, indent + 1)
+
+    def _emit_and(self, fn: _Function, parser: AndParser, pos: str, indent: int, cont: _Cont):
+        """ Как AndParser.parse: варианты начала -- списком, к каждому дописывается следующий парсер """
+        if not parser.parsers:
+            return
+
+        first, *rest = parser.parsers
+        variants = self._var("v")
+        fn.add(indent, f"{variants} = []")
+        self.emit(fn, first, pos, indent, lambda f, e, t, i: f.add(i, f"{variants}.append(({e}, {t}))"))
+
+        for child in rest:
+            prefix_end, prefix_tree, following = self._var("p"), self._var("t"), self._var("v")
+            fn.add(indent, f"{following} = []")
+            fn.add(indent, f"for {prefix_end}, {prefix_tree} in {variants}:")
+            self.emit(
+                fn, child, prefix_end, indent + 1,
+                lambda f, e, t, i, _prefix=prefix_tree, _following=following:
+                f.add(i, f"{_following}.append(({e}, AndParser({_prefix}, {t})))")
+            )
+            variants = following
+
+        end, tree = self._var("p"), self._var("t")
+        fn.add(indent, f"for {end}, {tree} in {variants}:")
+        cont(fn, end, tree, indent + 1)
+
+    def _emit_repeat(self, fn: _Function, parser: RepeatParser, pos: str, indent: int, cont: _Cont):
+        """ Как RepeatParser._repeat: по уровням, сначала меньше повторений """
+        level, following, repeats = self._var("l"), self._var("v"), self._var("n")
+        start, start_tree = self._var("p"), self._var("t")
+        end, tree = self._var("p"), self._var("t")
+        infinite = parser._to == float("+inf")
+
+        fn.add(indent, f"{level} = [({pos}, EmptyParser())]")
+        fn.add(indent, f"{repeats} = 0")
+        fn.add(indent, f"while {level}:")
+
+        conditions = []
+        if parser._from > 0:
+            conditions.append(f"{repeats} >= {parser._from}")
+        if not infinite:
+            conditions.append(f"{repeats} < {parser._to}")
+        body = indent + 1
+        if conditions:
+            fn.add(body, f"if {' and '.join(conditions)}:")
+            body += 1
+        fn.add(body, f"for {end}, {tree} in {level}:")
+        cont(fn, end, tree, body + 1)
+
+        if not infinite:
+            fn.add(indent + 1, f"if {repeats} + 1 >= {parser._to}:")
+            fn.add(indent + 2, "break")
+        fn.add(indent + 1, f"{following} = []")
+        fn.add(indent + 1, f"for {start}, {start_tree} in {level}:")
+
+        def _next(f: _Function, e: str, t: str, i: int):
+            # Повтор, который ничего не съел, дальше не крутим
+            f.add(i, f"if {e} != {start}:")
+            f.add(i + 1, f"{following}.append(({e}, AndParser({start_tree}, {t})))")
+
+        self.emit(fn, parser.p, start, indent + 2, _next)
+        fn.add(indent + 1, f"{level} = {following}")
+        fn.add(indent + 1, f"{repeats} += 1")
+
+    def _emit_text(self, fn: _Function, parser: TextParser, pos: str, indent: int, cont: _Cont):
+        """ Как TextParser.parse: по варианту на конец, дерево -- срез строки """
+        ends = self._var("e")
+        fn.add(indent, f"{ends} = set()")
+
+        def _text(f: _Function, e: str, t: str, i: int):
+            tree = self._var("t")
+            f.add(i, f"if {e} not in {ends}:")
+            f.add(i + 1, f"{ends}.add({e})")
+            f.add(i + 1, f"{tree} = Text(s[{pos}:{e}], rt.offset + {pos})")
+            cont(f, e, tree, i + 1)
+
+        self.emit(fn, parser.parser, pos, indent, _text)
+
+    def _emit_wrapper(self, fn: _Function, parser: BaseParser, pos: str, indent: int, cont: _Cont):
+        node = self._node(parser)
+
+        def _wrapped(f: _Function, e: str, t: str, i: int):
+            if type(parser) is EndLineParser:
+                f.add(i, f"if {e} == size:")
+                i += 1
+
+            tree = self._var("t")
+            if type(parser) in _SIMPLE_WRAPPERS:
+                f.add(i, f"{tree} = {node}._wrap({t})")
+                cont(f, e, tree, i)
+            else:
+                f.add(i, f"{tree} = wrap({node}, {t})")
+                f.add(i, f"if {tree} is not None:")
+                cont(f, e, tree, i + 1)
+
+        self.emit(fn, parser.parser, pos, indent, _wrapped)
+
+
+def _describe(parser: BaseParser) -> str:
+    # repr всей грамматики огромный (и рекурсивный) -- только тип узла
+    if isinstance(parser, KeyArgument):
+        return f"{parser.__class__.__name__} {parser.key}"
+    return parser.__class__.__name__
+
+
+class _Runtime(Machine):
+    """ Мемо и левая рекурсия -- от Machine, тела правил -- сгенерированные функции """
+
+    def __init__(self, grammar: 'CompiledGrammar', line: Line):
+        tokens = None if grammar.program.lexer is None else grammar.program.lexer.tokenize(line)
+        super().__init__(grammar.program, line, tokens)
+        self.functions = grammar.functions
+
+    def _run(self, rule: Rule, pos: int, results: List):
+        for end, tree in self.functions[rule.index](self, pos):
+            self._add(rule, results, end, tree)
+
+
+class CompiledGrammar:
+    def __init__(self, root: BaseParser, lexer: Optional[Lexer] = None):
+        generator = _Generator(root, lexer)
+
+        self.root = root
+        self.source = generator.generate()
+        self.program = Program(generator.order, lexer)
+
+        namespace: Dict[str, Any] = {
+            'R': self.program.rules,
+            'N': generator.nodes,
+            'S': generator.sets,
+            'wrap': wrap,
+        }
+        exec(compile(self.source, f"<grammar {id(root):x}>", 'exec'), namespace)
+
+        self.functions = [namespace[f"rule_{rule.index}"] for rule in self.program.rules]
+
+    def parse(self, line: Line) -> List[ParseVariant]:
+        return _Runtime(self, line).run()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self.functions)} rules, {len(self.source.splitlines())} lines>"
+
+
+class CompiledEngine(CompilingEngine):
+    """ Разбор сгенерированным кодом (см. начало модуля) """
+
+    def grammar(self, parser: BaseParser) -> CompiledGrammar:
+        return self.compiled(parser)
+
+    def _compile(self, parser: BaseParser) -> CompiledGrammar:
+        return CompiledGrammar(parser, self.lexer(parser))
+
+    def parse(self, parser: BaseParser, line: Line) -> List[ParseVariant]:
+        variants = self.grammar(parser).parse(line)
+
+        if not variants:
+            raise ParseError("Not found anything", line=line, parser=parser)
+
+        return variants
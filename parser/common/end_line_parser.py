@@ -4,6 +4,7 @@ from line import Line
 from parser.base import BaseParser, ParseError
 from parser.parse_variant import ParseVariant
 from parser.parser_wrapper import WrapperParser
+from parser.state import parse_diagnostics, parse_goal
 
 
 class NotFoundEndLineError(ParseError):
@@ -11,10 +12,49 @@ class NotFoundEndLineError(ParseError):
 
 
 class EndLineParser(WrapperParser):
+    """
+    Разбор до конца строки. Сначала распознавание (parser.recognize) решает,
+    дойдёт ли ребёнок до конца: если нет, деревья не строятся вовсе.
+    Пока ребёнок разбирается, его AndParser отбрасывают начала, которые
+    остаток не продолжит (parse_goal). Отброшенные варианты попадают
+    в ошибку, только если разбор идёт with_diagnostics()
+    """
+
     def _wrap(self, parser: BaseParser):
         return EndLineParser(parser)
 
     def parse(self, line: Line) -> Iterable[ParseVariant]:
+        if parse_diagnostics.get():
+            yield from self._parse_all(line)
+            return
+
+        from parser.recognize import recognizer
+
+        goal = recognizer(line)
+        if not goal.viable((self.parser, ), line, len(goal.s)):
+            raise NotFoundEndLineError("Not found variant with end line", line=line, parser=self)
+
+        is_found = False
+        variants = iter(super().parse(line))
+
+        while True:
+            # Только пока работает ребёнок: между вариантами цель видел бы тот, кто их читает
+            token = parse_goal.set(goal)
+            try:
+                variant = next(variants, None)
+            finally:
+                parse_goal.reset(token)
+
+            if variant is None:
+                break
+            if variant.line == '':
+                is_found = True
+                yield variant
+
+        if not is_found:
+            raise NotFoundEndLineError("Not found variant with end line", line=line, parser=self)
+
+    def _parse_all(self, line: Line) -> Iterable[ParseVariant]:
         is_found = False
         wrong_variants = []
 
@@ -33,6 +73,11 @@ class EndLineParser(WrapperParser):
                 wrong_variants=wrong_variants
             )
 
+    def _continue_from(self, target: BaseParser, variant: ParseVariant, path) -> Iterable[ParseVariant]:
+        for result in super()._continue_from(target, variant, path):
+            if result.line == '':
+                yield result
+
     def __eq__(self, other):
         _result = super().__eq__(other)
         if _result is not None:
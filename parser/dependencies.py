@@ -0,0 +1,95 @@
+"""
+Граф зависимостей грамматики: точечный сброс кэшей после `|=`.
+
+У каждого узла -- поколение. `|=` увеличивает поколение изменённого
+OrParser и всех парсеров, из которых он достижим (по обратным рёбрам);
+поколения остальных не меняются. Кэши -- мемо разбора, таблицы
+распознавания, планы левой рекурсии, оптимизированные и скомпилированные
+грамматики -- помнят поколение своего узла и сверяют его с текущим,
+поэтому `|=` в одной подграмматике не сбрасывает кэши тех, кто от неё
+не зависит.
+
+Рёбра записываются, когда узел впервые спрашивают о поколении (обход
+останавливается на уже известных узлах), и при каждом `|=` -- к новым
+альтернативам, в том числе дописанным в сессии. Узел забывается, когда
+его больше никто не держит.
+"""
+import threading
+import weakref
+from typing import Dict, List, Set
+
+from parser.base import BaseParser
+
+
+class GrammarGraph:
+    def __init__(self):
+        # id ребёнка -> id родителей
+        self._parents: Dict[int, Set[int]] = {}
+        self._generations: Dict[int, int] = {}
+        self._refs: Dict[int, weakref.ref] = {}
+        # Узлы, которые умерли (колбэк weakref может прийти посреди обхода)
+        self._dead: List[int] = []
+        self._lock = threading.RLock()
+
+    def generation(self, parser: BaseParser) -> int:
+        """ Поколение узла: растёт после `|=` в любом парсере, достижимом из него """
+        ref = self._refs.get(id(parser))
+        if ref is None or ref() is not parser:
+            self.track(parser)
+        return self._generations[id(parser)]
+
+    def track(self, root: BaseParser):
+        """ Записывает рёбра подграфа root (кроме уже известных узлов) """
+        with self._lock:
+            self._purge()
+            stack = [root] if id(root) not in self._refs else []
+
+            while stack:
+                parser = stack.pop()
+                if id(parser) in self._refs:
+                    continue
+
+                self._add_node(parser)
+                for child in parser.children():
+                    self._parents.setdefault(id(child), set()).add(id(parser))
+                    if id(child) not in self._refs:
+                        stack.append(child)
+
+    def mutated(self, parser: BaseParser, added=()):
+        """ У parser появились дети added: новые рёбра и новые поколения всем, кто его достигает """
+        with self._lock:
+            self.track(parser)
+            for child in added:
+                self.track(child)
+                self._parents.setdefault(id(child), set()).add(id(parser))
+
+            seen = {id(parser)}
+            stack = [id(parser)]
+            while stack:
+                key = stack.pop()
+                if key in self._generations:
+                    self._generations[key] += 1
+                for parent in self._parents.get(key, ()):
+                    if parent not in seen:
+                        seen.add(parent)
+                        stack.append(parent)
+
+    def _add_node(self, parser: BaseParser):
+        key = id(parser)
+        self._generations[key] = 0
+        self._refs[key] = weakref.ref(parser, lambda _, _key=key: self._dead.append(_key))
+
+    def _purge(self):
+        while self._dead:
+            key = self._dead.pop()
+            ref = self._refs.get(key)
+            if ref is not None and ref() is None:
+                del self._refs[key]
+                del self._generations[key]
+                self._parents.pop(key, None)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self._refs)} nodes>"
+
+
+grammar_graph = GrammarGraph()
@@ -0,0 +1,126 @@
+"""
+Движки разбора.
+
+Движок получает парсер (корень грамматики) и строку и отдаёт варианты
+разбора (ParseVariant). Executor не знает, как именно они получены.
+"""
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+from line import Line
+from parser.base import BaseParser
+from parser.parse_variant import ParseVariant
+
+
+class BaseEngine:
+    # Проходы оптимизатора, None -- все
+    OPTIMIZE_PASSES: Optional[Tuple[str, ...]] = None
+
+    def __init__(self, optimize: bool = False):
+        """ :param optimize: разбирать оптимизированной копией грамматики (parser.optimize) """
+        self.optimizer = None
+        if optimize:
+            from parser.optimize import Optimizer
+            self.optimizer = Optimizer(self.OPTIMIZE_PASSES)
+
+    def grammar_root(self, parser: BaseParser) -> BaseParser:
+        """ Корень, который движок разбирает на самом деле """
+        if self.optimizer is None:
+            return parser
+        return self.optimizer.optimized(parser)
+
+    def parse(self, parser: BaseParser, line: Line) -> Sequence[ParseVariant]:
+        """
+        Результат должен поддерживать len() (число вариантов)
+        и итерацию по вариантам
+        """
+        raise NotImplementedError()
+
+    def iter_parse(self, parser: BaseParser, line: Line) -> Iterable[ParseVariant]:
+        """ Лениво: следующий вариант ищется, только когда его просят """
+        return iter(self.parse(parser, line))
+
+    def calculate(self, tree: BaseParser, executor: 'Executor') -> Any:
+        """ Вычисление дерева разбора """
+        return tree.calculate(executor)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}>"
+
+
+class HostEngine(BaseEngine):
+    """ Обычный разбор: генераторы самих парсеров, все варианты по отдельности """
+
+    def parse(self, parser: BaseParser, line: Line) -> Sequence[ParseVariant]:
+        return list(self.grammar_root(parser).parse(line))
+
+    def iter_parse(self, parser: BaseParser, line: Line) -> Iterable[ParseVariant]:
+        return self.grammar_root(parser).parse(line)
+
+
+class CompilingEngine(BaseEngine):
+    """
+    Движок, который сначала компилирует грамматику (parser.vm, parser.codegen).
+    Скомпилированное хранится по корню и собирается заново после `|=`
+    и для каждой сессии со своими расширениями грамматики
+    """
+    # Общее начало альтернатив и так разбирается один раз (мемо по позиции),
+    # а FactoredParser такие движки разбирали бы обычным способом
+    OPTIMIZE_PASSES = ('dead', 'empty', 'repeat', 'flatten', 'identity')
+
+    def __init__(self, tokenize: bool = False, optimize: bool = False):
+        """ :param tokenize: разбирать через лексер из регулярных кусков грамматики (parser.tokens) """
+        super().__init__(optimize)
+        self.tokenize = tokenize
+        # id(корень) -> (корень, (поколение корня, расширения сессии), скомпилированное)
+        self._compiled: Dict[int, Tuple[BaseParser, Tuple[int, int], Any]] = {}
+
+    def compiled(self, parser: BaseParser) -> Any:
+        from parser.dependencies import grammar_graph
+        from parser.logic.or_parser import grammar_extensions
+
+        generation = (grammar_graph.generation(parser), id(grammar_extensions.get()))
+        cached = self._compiled.get(id(parser))
+
+        if cached is not None and cached[0] is parser and cached[1] == generation:
+            return cached[2]
+
+        compiled = self._compile(self.grammar_root(parser))
+        self._compiled[id(parser)] = (parser, generation, compiled)
+        return compiled
+
+    def _compile(self, parser: BaseParser) -> Any:
+        raise NotImplementedError()
+
+    def lexer(self, parser: BaseParser) -> Optional['Lexer']:
+        if not self.tokenize:
+            return None
+
+        from parser.tokens import Lexer
+        return Lexer.from_grammar(parser)
+
+    def calculate(self, tree: BaseParser, executor: 'Executor') -> Any:
+        # Без рекурсии: такие движки разбирают строки любой вложенности
+        from parser.evaluate import calculate
+
+        return calculate(tree, executor)
+
+
+def get_engine(engine: Union[str, BaseEngine]) -> BaseEngine:
+    if isinstance(engine, BaseEngine):
+        return engine
+
+    from parser.codegen import CompiledEngine
+    from parser.forest import ForestEngine
+    from parser.vm import VMEngine
+
+    engines = {
+        'host': HostEngine,
+        'forest': ForestEngine,
+        'vm': VMEngine,
+        'compiled': CompiledEngine,
+    }
+
+    if engine not in engines:
+        raise ValueError(f"Unknown engine {repr(engine)}, use one of: {', '.join(engines)}")
+
+    return engines[engine]()
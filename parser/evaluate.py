@@ -0,0 +1,56 @@
+"""
+Вычисление дерева разбора без рекурсии.
+
+calculate у FuncParser, обёрток и MultiParser вызывает calculate детей,
+поэтому глубокое дерево (тысячи вложенных скобок) упирается в предел
+рекурсии Python. Здесь то же вычисление идёт по явному стеку:
+порядок вычисления аргументов и результат -- как у calculate.
+Узлы со своим calculate (не из parser) вычисляются им самим.
+"""
+from typing import Any, List, Optional, Tuple
+
+from parser.base import BaseParser
+from parser.func.func_parser import FuncParser
+from parser.logic._multi_parser import MultiParser
+from parser.parser_wrapper import WrapperParser
+
+
+def calculate(tree: BaseParser, executor: 'Executor') -> Any:
+    # (узел, имена аргументов FuncParser / число детей MultiParser; None -- дети ещё не вычислены)
+    stack: List[Tuple[BaseParser, Optional[Any]]] = [(tree, None)]
+    values: List[Any] = []
+
+    while stack:
+        node, pending = stack.pop()
+        method = type(node).calculate
+
+        if method is BaseParser.calculate:
+            values.append(node)
+        elif method is WrapperParser.calculate:
+            stack.append((node.parser, None))
+        elif method is FuncParser.calculate:
+            if pending is None:
+                arguments = node.parser.key_args()
+                stack.append((node, tuple(arguments)))
+                stack.extend((parser, None) for parser in reversed(tuple(arguments.values())))
+            else:
+                kwargs = dict(zip(pending, _pop(values, len(pending))))
+                values.append(node.apply(kwargs, executor))
+        elif method is MultiParser.calculate:
+            if pending is None:
+                stack.append((node, len(node.parsers)))
+                stack.extend((parser, None) for parser in reversed(node.parsers))
+            else:
+                values.append(_pop(values, pending))
+        else:
+            values.append(node.calculate(executor))
+
+    return values[-1]
+
+
+def _pop(values: List[Any], count: int) -> List[Any]:
+    if not count:
+        return []
+    popped = values[-count:]
+    del values[-count:]
+    return popped
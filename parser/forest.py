@@ -0,0 +1,492 @@
+"""
+Разбор в общий упакованный лес (SPPF).
+
+Обычный разбор перечисляет каждое дерево отдельно: k независимых
+неоднозначностей в строке дают 2^k вариантов. Здесь строится таблица
+(парсер, начало) -> {конец: узел леса}, а у узла хранится список
+"семейств" -- способов собрать его из дочерних узлов. Общие поддеревья
+разделяются, поэтому лес полиномиального размера.
+
+Деревья из леса не строятся заранее: Forest умеет их посчитать (count),
+достать k-е (select) и лениво перечислить (trees / variants).
+
+Левая рекурсия разбирается наращиванием: ключ, который читает сам себя,
+пересчитывается до неподвижной точки.
+PriorityParser -- ограничение на всё дерево, а не на отрезок строки,
+поэтому оно применяется при подсчёте и выборе деревьев.
+Парсеры, которые движок не знает (DictParser, OrderedParser, CutParser, LookaheadParser
+и пользовательские), разбираются обычным способом и попадают в лес листьями.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from line import Line
+from parser.base import BaseParser, ParseError
+from parser.common.end_line_parser import EndLineParser
+from parser.engine import BaseEngine, CompilingEngine
+from parser.func.text_parser import Text, TextParser
+from parser.graph import walk
+from parser.logic.and_parser import AndParser
+from parser.logic.char_parser import CharParser
+from parser.logic.cut_parser import CutParser
+from parser.logic.empty_parser import EmptyParser
+from parser.logic.lookahead_parser import LookaheadParser
+from parser.logic.or_parser import OrParser
+from parser.logic.repeat_parser import RepeatParser
+from parser.parse_variant import ParseVariant
+from parser.parser_wrapper import WrapperParser
+from parser.priority_parser import GroupParser, PriorityParser, tree_priority
+from parser.state import parse_state
+
+# Граница "ничего не подходит" для приоритетов
+_INVALID = object()
+
+
+class ForestNode:
+    """
+    Отрезок [start, end) строки, разобранный парсером parser.
+    families -- способы собрать узел: кортежи из дочерних ForestNode
+    или уже готовых деревьев (для листьев).
+    """
+
+    def __init__(self, parser: BaseParser, start: int, end: int):
+        self.parser = parser
+        self.start = start
+        self.end = end
+        self.families: List[Tuple[Any, ...]] = []
+        self._family_ids: Set[Tuple[int, ...]] = set()
+
+        # Обёртка, которую надо надеть на дерево ребёнка (FuncParser, KeyArgument, ...)
+        self.wrapper: Optional[WrapperParser] = None
+        self.priority: Optional[int] = None
+        self.group: bool = False
+
+        # Заполняются при подсчёте
+        self.counts: Optional[Dict[Optional[int], int]] = None
+        self.cyclic: Set[int] = set()
+
+    def add(self, family: Tuple[Any, ...]) -> bool:
+        if all(isinstance(item, ForestNode) for item in family):
+            key = tuple(map(id, family))
+            if key in self._family_ids:
+                return False
+            self._family_ids.add(key)
+        elif family in self.families:
+            return False
+
+        self.families.append(family)
+        return True
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.parser!r} [{self.start}:{self.end}] " \
+               f"({len(self.families)} families)>"
+
+
+def _ge(key: Optional[int], bound: Optional[int]) -> bool:
+    return key is None or bound is None or key >= bound
+
+
+def _merge(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+class Forest:
+    """
+    Результат разбора: корни -- узлы с началом в 0, по одному на каждый конец.
+    """
+
+    def __init__(self, line: Line, roots: List[ForestNode]):
+        self.line = line
+        self.roots = roots
+        self._counted = False
+
+    # Подсчёт
+
+    def _count_all(self):
+        """ Считает деревья для всех узлов (без рекурсии). Циклы отбрасываются """
+        if self._counted:
+            return
+        self._counted = True
+
+        # 0 -- не начат, 1 -- в стеке, 2 -- посчитан
+        state: Dict[int, int] = {}
+
+        for root in self.roots:
+            stack: List[ForestNode] = [root]
+
+            while stack:
+                node = stack[-1]
+
+                if state.get(id(node), 0) == 0:
+                    state[id(node)] = 1
+                    for family in node.families:
+                        for item in family:
+                            if isinstance(item, ForestNode) and state.get(id(item), 0) == 0:
+                                stack.append(item)
+                    continue
+
+                stack.pop()
+                if state[id(node)] == 2:
+                    continue
+
+                # Все дети посчитаны, кроме тех, что ещё в стеке (это цикл)
+                for index, family in enumerate(node.families):
+                    if any(isinstance(item, ForestNode) and state.get(id(item)) == 1 for item in family):
+                        node.cyclic.add(index)
+
+                node.counts = self._node_counts(node)
+                state[id(node)] = 2
+
+    def _node_counts(self, node: ForestNode) -> Dict[Optional[int], int]:
+        counts: Dict[Optional[int], int] = {}
+
+        for index, family in enumerate(node.families):
+            if index in node.cyclic:
+                continue
+
+            family_counts: Dict[Optional[int], int] = {None: 1}
+            for item in family:
+                if isinstance(item, ForestNode):
+                    item_counts = item.counts or {}
+                else:
+                    item_counts = {tree_priority(item): 1}
+
+                new_counts: Dict[Optional[int], int] = {}
+                for key_a, count_a in family_counts.items():
+                    for key_b, count_b in item_counts.items():
+                        key = _merge(key_a, key_b)
+                        new_counts[key] = new_counts.get(key, 0) + count_a * count_b
+                family_counts = new_counts
+
+            for key, count in family_counts.items():
+                if node.priority is not None:
+                    if not _ge(key, node.priority):
+                        continue
+                    key = node.priority
+                elif node.group:
+                    key = None
+
+                counts[key] = counts.get(key, 0) + count
+
+        return counts
+
+    def _count_ge(self, item: Any, bound) -> int:
+        if bound is _INVALID:
+            return 0
+
+        if not isinstance(item, ForestNode):
+            return 1 if _ge(tree_priority(item), bound) else 0
+
+        return sum(count for key, count in (item.counts or {}).items() if _ge(key, bound))
+
+    @staticmethod
+    def _child_bound(node: ForestNode, bound):
+        if node.group:
+            return None
+        if node.priority is not None:
+            return node.priority if _ge(node.priority, bound) else _INVALID
+        return bound
+
+    def count(self) -> int:
+        """ Число деревьев разбора (без их построения) """
+        self._count_all()
+        return sum(self._count_ge(root, None) for root in self.roots)
+
+    def __len__(self):
+        return self.count()
+
+    def __bool__(self):
+        return self.count() > 0
+
+    # Выбор
+
+    def select(self, index: int) -> ParseVariant:
+        """ index-й вариант разбора (в порядке trees / variants) """
+        self._count_all()
+
+        if index < 0:
+            index += self.count()
+
+        for root in self.roots:
+            root_count = self._count_ge(root, None)
+            if index < root_count:
+                return ParseVariant(self._build(root, None, index), self.line[root.end:])
+            index -= root_count
+
+        raise IndexError("Forest index out of range")
+
+    def _build(self, node: ForestNode, bound, index: int) -> BaseParser:
+        child_bound = self._child_bound(node, bound)
+
+        for family_index, family in enumerate(node.families):
+            if family_index in node.cyclic:
+                continue
+
+            sizes = [self._count_ge(item, child_bound) for item in family]
+            family_count = 1
+            for size in sizes:
+                family_count *= size
+
+            if index >= family_count:
+                index -= family_count
+                continue
+
+            # Смешанная система счисления: первый ребёнок -- старший разряд
+            indexes = []
+            for size in reversed(sizes):
+                indexes.append(index % size)
+                index //= size
+            indexes.reverse()
+
+            trees = [
+                self._build(item, child_bound, item_index) if isinstance(item, ForestNode) else item
+                for item, item_index in zip(family, indexes)
+            ]
+
+            return self._combine(node, trees)
+
+        raise IndexError("Forest node index out of range")
+
+    @staticmethod
+    def _combine(node: ForestNode, trees: List[BaseParser]) -> BaseParser:
+        if node.wrapper is not None:
+            return node.wrapper._wrap(trees[0])
+        if len(trees) == 1:
+            return trees[0]
+        return AndParser(*trees)
+
+    # Перечисление
+
+    def variants(self) -> Iterable[ParseVariant]:
+        """ Лениво: строится только то дерево, которое запросили """
+        for index in range(self.count()):
+            yield self.select(index)
+
+    def trees(self) -> Iterable[BaseParser]:
+        for variant in self.variants():
+            yield variant.parser
+
+    def __iter__(self):
+        return iter(self.variants())
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self.roots)} roots>"
+
+
+class _Chart:
+    """ Таблица разбора одной строки """
+
+    def __init__(self, line: Line):
+        self.line = line
+        self.s = line.line
+        self.n = len(self.s)
+
+        self.table: Dict[Tuple[Any, int], Dict[int, ForestNode]] = {}
+        self.done: Set[Tuple[Any, int]] = set()
+        self.active: Set[Tuple[Any, int]] = set()
+        # Какие незаконченные ключи прочитаны при вычислении (стек)
+        self.reads: List[Set[Tuple[Any, int]]] = [set()]
+        self.changes = 0
+        # Есть ли PriorityParser под TextParser (по id TextParser)
+        self.filtered: Dict[int, bool] = {}
+        # Состояние разбора (бюджет и т.п., parser.state), если задано
+        self.state = parse_state.get()
+
+    def forest(self, parser: BaseParser) -> Forest:
+        ends = self.visit(parser, 0)
+        return Forest(self.line, [ends[j] for j in sorted(ends)])
+
+    def visit(self, parser: BaseParser, i: int) -> Dict[int, ForestNode]:
+        return self._visit(id(parser), i, lambda out: self._compute(parser, i, out))
+
+    def _visit(self, tag: Any, i: int, compute) -> Dict[int, ForestNode]:
+        key = (tag, i)
+
+        if key in self.done:
+            return self.table[key]
+
+        if key in self.active:
+            self.reads[-1].add(key)
+            return self.table[key]
+
+        self.active.add(key)
+        out = self.table.setdefault(key, {})
+
+        while True:
+            if self.state is not None:
+                self.state.step()
+
+            self.reads.append(set())
+            changes = self.changes
+            compute(out)
+            reads = self.reads.pop()
+
+            is_head = key in reads
+            reads.discard(key)
+
+            if is_head and changes != self.changes:
+                continue
+            break
+
+        self.active.discard(key)
+
+        if reads:
+            # Зависит от незаконченного внешнего ключа -- пересчитаем позже
+            self.reads[-1].update(reads)
+        else:
+            self.done.add(key)
+
+        return out
+
+    def _add(self, out: Dict[int, ForestNode], parser: BaseParser, i: int, j: int,
+             family: Tuple[Any, ...]) -> ForestNode:
+        node = out.get(j)
+        if node is None:
+            node = out[j] = ForestNode(parser, i, j)
+            self.changes += 1
+
+        if node.add(family):
+            self.changes += 1
+            if self.state is not None:
+                self.state.node_variants(len(node.families), parser)
+
+        return node
+
+    def _compute(self, parser: BaseParser, i: int, out: Dict[int, ForestNode]):
+        if isinstance(parser, (CutParser, LookaheadParser)):
+            self._compute_host(parser, i, out)
+        elif isinstance(parser, EndLineParser):
+            for j, child in list(self.visit(parser.parser, i).items()):
+                if j == self.n:
+                    self._add(out, parser, i, j, (child,)).wrapper = parser
+        elif isinstance(parser, TextParser):
+            if self._filtered(parser):
+                # PriorityParser внутри решает по всему дереву -- разбираем обычным способом
+                self._compute_host(parser, i, out)
+                return
+            # Дерево ребёнка не нужно: подстрока -- лист
+            for j in list(self.visit(parser.parser, i)):
+                self._add(out, parser, i, j, (Text(self.s[i:j], self.line.offset + i),))
+        elif isinstance(parser, WrapperParser):
+            for j, child in list(self.visit(parser.parser, i).items()):
+                node = self._add(out, parser, i, j, (child,))
+                node.wrapper = parser
+                if isinstance(parser, PriorityParser):
+                    node.priority = parser.priority.priority
+                elif isinstance(parser, GroupParser):
+                    node.group = True
+        elif isinstance(parser, OrParser):
+            for alternative in parser.parsers:
+                for j, child in list(self.visit(alternative, i).items()):
+                    self._add(out, parser, i, j, (child,))
+        elif isinstance(parser, AndParser):
+            if parser.parsers:
+                for j, prefix in list(self._prefix(parser, len(parser.parsers), i).items()):
+                    self._add(out, parser, i, j, (prefix,))
+        elif isinstance(parser, RepeatParser):
+            self._compute_repeat(parser, i, out)
+        elif isinstance(parser, CharParser):
+            if self.s.startswith(parser.ch, i):
+                self._add(out, parser, i, i + 1, (CharParser(parser.ch),))
+        elif isinstance(parser, EmptyParser):
+            self._add(out, parser, i, i, (EmptyParser(),))
+        else:
+            self._compute_host(parser, i, out)
+
+    def _filtered(self, parser: TextParser) -> bool:
+        if id(parser) not in self.filtered:
+            self.filtered[id(parser)] = any(isinstance(p, PriorityParser) for p in walk(parser.parser))
+        return self.filtered[id(parser)]
+
+    def _compute_host(self, parser: BaseParser, i: int, out: Dict[int, ForestNode]):
+        """ Неизвестный движку парсер: обычный разбор, результаты -- листья """
+        try:
+            for variant in parser.parse(self.line[i:]):
+                self._add(out, parser, i, self.n - len(variant.line), (variant.parser,))
+        except ParseError:
+            pass
+
+    def _prefix(self, parser: AndParser, m: int, i: int) -> Dict[int, ForestNode]:
+        """ Первые m элементов AndParser (бинаризация: лес остаётся полиномиальным) """
+
+        def compute(out):
+            if m == 1:
+                for j, child in list(self.visit(parser.parsers[0], i).items()):
+                    self._add(out, parser, i, j, (child,))
+                return
+
+            for mid, left in list(self._prefix(parser, m - 1, i).items()):
+                for j, right in list(self.visit(parser.parsers[m - 1], mid).items()):
+                    self._add(out, parser, i, j, (left, right))
+
+        return self._visit((id(parser), 'prefix', m), i, compute)
+
+    def _compute_repeat(self, parser: RepeatParser, i: int, out: Dict[int, ForestNode]):
+        is_infinite = parser._to == float("+inf")
+        # Последнее различимое число повторов: дальше (для бесконечных) оно не меняется
+        cap = parser._from if is_infinite else int(parser._to) - 1
+
+        for level in range(parser._from, cap + 1):
+            for j, node in list(self._repeat_level(parser, level, cap, is_infinite, i).items()):
+                self._add(out, parser, i, j, (node,))
+
+    def _repeat_level(self, parser: RepeatParser, level: int, cap: int, is_infinite: bool,
+                      i: int) -> Dict[int, ForestNode]:
+        """ Ровно level повторов (для level == cap у бесконечных -- не меньше) """
+
+        def compute(out):
+            if level == 0:
+                self._add(out, parser, i, i, (EmptyParser(),))
+
+            previous_levels = []
+            if level > 0:
+                previous_levels.append(level - 1)
+            if is_infinite and level == cap:
+                previous_levels.append(level)
+
+            for previous in previous_levels:
+                for mid, prev in list(self._repeat_level(parser, previous, cap, is_infinite, i).items()):
+                    for j, child in list(self.visit(parser.p, mid).items()):
+                        self._add(out, parser, i, j, (prev, child))
+
+        return self._visit((id(parser), 'level', level), i, compute)
+
+
+class ForestEngine(BaseEngine):
+    """
+    Разбор в общий лес: неоднозначности не перемножаются.
+    Лес различает выводы, а Executor -- деревья: выводы, которые дают
+    равные деревья (например, разная расстановка скобок у AndParser),
+    отдаются один раз, как и при обычном разборе
+    """
+    OPTIMIZE_PASSES = CompilingEngine.OPTIMIZE_PASSES
+
+    def forest(self, parser: BaseParser, line: Line) -> Forest:
+        return _Chart(line).forest(self.grammar_root(parser))
+
+    def _forest(self, parser: BaseParser, line: Line) -> Forest:
+        forest = self.forest(parser, line)
+
+        if not forest:
+            raise ParseError("Not found anything", line=line, parser=parser)
+
+        return forest
+
+    def parse(self, parser: BaseParser, line: Line) -> List[ParseVariant]:
+        return list(self.iter_parse(parser, line))
+
+    def iter_parse(self, parser: BaseParser, line: Line) -> Iterable[ParseVariant]:
+        return _distinct(self._forest(parser, line).variants())
+
+
+def _distinct(variants: Iterable[ParseVariant]) -> Iterable[ParseVariant]:
+    """ Без повторов (сравнение, а не хэш: не все деревья хэшируются) """
+    seen: List[ParseVariant] = []
+
+    for variant in variants:
+        if variant not in seen:
+            seen.append(variant)
+            yield variant
@@ -1,6 +1,7 @@
 import inspect
-from typing import Callable, Any
+from typing import Any, Callable, Dict
 
+from context_dict import current_context
 from parser.base import BaseParser
 from parser.parser_wrapper import WrapperParser
 
@@ -15,9 +16,15 @@ class FuncParser(WrapperParser):
 
     def calculate(self, executor: 'Executor') -> Any:
         kwargs = {k: p.calculate(executor) for k, p in self.parser.key_args().items()}
+        return self.apply(kwargs, executor)
 
-        if "_executor" in inspect.signature(self.func).parameters:
+    def apply(self, kwargs: Dict[str, Any], executor: 'Executor') -> Any:
+        """ Вызов функции с уже вычисленными аргументами """
+        parameters = inspect.signature(self.func).parameters
+        if "_executor" in parameters:
             kwargs['_executor'] = executor
+        if "_variables" in parameters:
+            kwargs['_variables'] = current_context.get()
 
         return self.func(
             self.parser,
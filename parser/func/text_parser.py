@@ -0,0 +1,86 @@
+from typing import Any, Iterable
+
+from line import Line
+from parser.base import BaseParser, ParseError
+from parser.parse_variant import ParseVariant
+from parser.parser_wrapper import WrapperParser
+
+
+class Text(BaseParser):
+    """
+    Результат TextParser: разобранная подстрока и её место в исходной строке
+    (start -- Line.offset начала). При вычислении -- сама строка
+    """
+
+    def __init__(self, text: str, start: int = 0):
+        self.text = text
+        self.start = start
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+    def parse(self, line: Line) -> Iterable[ParseVariant]:
+        if line.startswith(self.text):
+            yield ParseVariant(Text(self.text, line.offset), line[len(self.text):])
+        else:
+            raise ParseError("")
+
+    def calculate(self, executor: 'Executor') -> Any:
+        return self.text
+
+    def __eq__(self, other: BaseParser):
+        _result = super().__eq__(other)
+        if _result is not None:
+            return _result
+
+        if not isinstance(other, Text):
+            return False
+
+        return self.text == other.text and self.start == other.start
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.text!r} [{self.start}:{self.end}]>"
+
+    def __str__(self):
+        return repr(self.text)
+
+    def __hash__(self):
+        return hash(self.__class__) * hash(self.text) * hash(self.start)
+
+    def __iter__(self):
+        yield self
+
+
+class TextParser(WrapperParser):
+    """
+    Подстрока, которую разобрал parser, одним куском (Text) вместо дерева
+    из CharParser на каждый символ. Варианты ребёнка с одним концом -- один вариант
+    """
+
+    def parse(self, line: Line) -> Iterable[ParseVariant]:
+        ends = set()
+
+        for variant in self.parser.parse(line):
+            size = len(line) - len(variant.line)
+            if size not in ends:
+                ends.add(size)
+                yield ParseVariant(Text(line.line[:size], line.offset), variant.line)
+
+    def _continue_from(self, target: BaseParser, variant: ParseVariant, path) -> Iterable[ParseVariant]:
+        # Начало подстроки здесь неизвестно, поэтому на левой рекурсии
+        # TextParser не наращивается (см. parser.lrec._left_edges)
+        return BaseParser._continue_from(self, target, variant, path)
+
+    def __eq__(self, other: BaseParser):
+        _result = super().__eq__(other)
+        if _result is not None:
+            return _result
+
+        if not isinstance(other, self.__class__):
+            return False
+
+        return self.parser == other.parser
+
+    def __hash__(self):
+        return hash(self.__class__) * hash(self.parser)
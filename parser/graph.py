@@ -0,0 +1,160 @@
+"""
+Обход графа парсеров.
+
+Граф может содержать циклы (левая и правая рекурсия через OrParser),
+поэтому узлы различаются по id, а не по __eq__ / __hash__.
+"""
+from typing import Dict, Iterable, Optional, Set
+
+from parser.base import BaseParser
+
+
+def walk(root: BaseParser) -> Iterable[BaseParser]:
+    """ Все парсеры, достижимые из root (каждый один раз) """
+    seen: Set[int] = set()
+    stack = [root]
+
+    while stack:
+        parser = stack.pop()
+        if id(parser) in seen:
+            continue
+        seen.add(id(parser))
+
+        yield parser
+        stack.extend(reversed(parser.children()))
+
+
+def nullable(root: BaseParser) -> Set[int]:
+    """
+    id парсеров, которые могут ничего не съесть.
+    Неизвестные листья считаем nullable -- так анализ остаётся консервативным.
+    """
+    from parser.logic.and_parser import AndParser
+    from parser.logic.char_parser import CharParser
+    from parser.logic.dict_parser import DictParser
+    from parser.logic.factored_parser import FactoredParser
+    from parser.logic.lookahead_parser import LookaheadParser
+    from parser.logic.or_parser import OrParser
+    from parser.logic.ordered_parser import OrderedParser
+    from parser.logic.repeat_parser import RepeatParser
+    from parser.parser_wrapper import WrapperParser
+
+    parsers = list(walk(root))
+    result: Set[int] = set()
+
+    changed = True
+    while changed:
+        changed = False
+        for parser in parsers:
+            if id(parser) in result:
+                continue
+
+            if isinstance(parser, (CharParser, DictParser)):
+                is_nullable = False
+            elif isinstance(parser, LookaheadParser):
+                is_nullable = True
+            elif isinstance(parser, (AndParser, FactoredParser)):
+                is_nullable = all(id(p) in result for p in parser.parsers)
+            elif isinstance(parser, (OrParser, OrderedParser)):
+                is_nullable = any(id(p) in result for p in parser.parsers)
+            elif isinstance(parser, RepeatParser):
+                is_nullable = parser._from == 0 or id(parser.p) in result
+            elif isinstance(parser, WrapperParser):
+                is_nullable = id(parser.parser) in result
+            else:
+                is_nullable = True
+
+            if is_nullable:
+                result.add(id(parser))
+                changed = True
+
+    return result
+
+
+def cycle_heads(root: BaseParser) -> Set[int]:
+    """ id парсеров, в которые ведут обратные рёбра обхода (на них замыкаются циклы) """
+    result: Set[int] = set()
+    done: Set[int] = set()
+    on_path: Set[int] = {id(root)}
+    stack = [(root, iter(root.children()))]
+
+    while stack:
+        parser, children = stack[-1]
+        child = next(children, None)
+
+        if child is None:
+            stack.pop()
+            on_path.discard(id(parser))
+            done.add(id(parser))
+        elif id(child) in on_path:
+            result.add(id(child))
+        elif id(child) not in done:
+            on_path.add(id(child))
+            stack.append((child, iter(child.children())))
+
+    return result
+
+
+def strong_components(root: BaseParser) -> Dict[int, int]:
+    """
+    id парсера -> номер компоненты сильной связности (Тарьян, без рекурсии).
+    Узлы одного цикла -- в одной компоненте
+    """
+    index: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    result: Dict[int, int] = {}
+    components = 0
+    path = []
+    on_path: Set[int] = set()
+    stack = [(root, iter(root.children()))]
+    index[id(root)] = low[id(root)] = 0
+    path.append(root)
+    on_path.add(id(root))
+
+    while stack:
+        parser, children = stack[-1]
+        child = next(children, None)
+
+        if child is not None:
+            if id(child) not in index:
+                index[id(child)] = low[id(child)] = len(index)
+                path.append(child)
+                on_path.add(id(child))
+                stack.append((child, iter(child.children())))
+            elif id(child) in on_path:
+                low[id(parser)] = min(low[id(parser)], index[id(child)])
+            continue
+
+        stack.pop()
+        if stack:
+            low[id(stack[-1][0])] = min(low[id(stack[-1][0])], low[id(parser)])
+
+        if low[id(parser)] == index[id(parser)]:
+            while True:
+                member = path.pop()
+                on_path.discard(id(member))
+                result[id(member)] = components
+                if member is parser:
+                    break
+            components += 1
+
+    return result
+
+
+def char_set(parser: BaseParser) -> Optional[frozenset]:
+    """ Символы, если парсер -- OrParser из одиночных символов """
+    from parser.logic.char_parser import CharParser
+    from parser.logic.or_parser import OrParser
+
+    if type(parser) is not OrParser or not parser.parsers:
+        return None
+    if not all(type(p) is CharParser for p in parser.parsers):
+        return None
+    return frozenset(p.ch for p in parser.parsers)
+
+
+def plain_wrapper(parser: BaseParser) -> bool:
+    """ Обёртка, которая только оборачивает (и, может быть, отбрасывает) варианты ребёнка """
+    from parser.parser_wrapper import WrapperParser
+
+    return isinstance(parser, WrapperParser) and type(parser).parse is WrapperParser.parse
@@ -1,4 +1,5 @@
-from typing import Dict, List, Any, Sequence
+import threading
+from typing import Dict, List, Any, Sequence, Set
 
 from parser.base import BaseParser
 from parser.func.key_argument import KeyArgument
@@ -16,6 +17,19 @@ def unique(f):
     return _
 
 
+# Кто сейчас внутри __hash__ / __str__ / __iter__ (защита от циклов в графе).
+# У каждого потока своё, общая грамматика ничего не хранит
+_visiting = threading.local()
+
+
+def _active(kind: str) -> Set[int]:
+    active = getattr(_visiting, kind, None)
+    if active is None:
+        active = set()
+        setattr(_visiting, kind, active)
+    return active
+
+
 class MultiParser(BaseParser):
     STR_SYM = None
 
@@ -29,9 +43,6 @@ class MultiParser(BaseParser):
                 _parsers.append(parser)
 
         self.parsers: Sequence[BaseParser] = tuple(p for p in _parsers if not isinstance(p, EmptyParser))
-        self._iter_deep = False
-        self._hash_deep = False
-        self._str_deep = 0
 
     def __eq__(self, other: BaseParser):
         _result = super().__eq__(other)
@@ -44,15 +55,17 @@ class MultiParser(BaseParser):
         return self.parsers == other.parsers
 
     def __hash__(self):
-        if self._hash_deep:
+        active = _active('hash')
+        if id(self) in active:
             return hash(-1)
 
-        self._hash_deep = True
-        raw_hashes = sorted(map(hash, self.parsers))
+        active.add(id(self))
+        try:
+            raw_hashes = sorted(map(hash, self.parsers))
+        finally:
+            active.discard(id(self))
         s_to_hash = self.STR_SYM + '-'.join(map(str, raw_hashes))
-        _calculated_hash = hash(s_to_hash)
-        self._hash_deep = False
-        return _calculated_hash
+        return hash(s_to_hash)
 
     def key_args(self) -> Dict[str, BaseParser]:
         _kas = {}
@@ -67,26 +80,32 @@ class MultiParser(BaseParser):
         return f"<{self.__class__.__name__}: {'; '.join(parsers_str)}>"
 
     def __str__(self):
-        if self._str_deep:
+        active = _active('str')
+        if id(self) in active:
             return "🔃"
-        self._str_deep = True
-        parsers_str = (str(parser) if not self._search(parser) else "..." for parser in self.parsers)
-        s = "(" + f" {self.STR_SYM} ".join(parsers_str) + ")"
-        self._str_deep = False
-        return s
+
+        active.add(id(self))
+        try:
+            parsers_str = (str(parser) if not self._search(parser) else "..." for parser in self.parsers)
+            return "(" + f" {self.STR_SYM} ".join(parsers_str) + ")"
+        finally:
+            active.discard(id(self))
 
     def calculate(self, executor: 'Executor') -> List[Any]:
         return list(p.calculate(executor) for p in self.parsers)
 
     def __iter__(self):
-        if not self._iter_deep:
-            self._iter_deep = True
-            yield self
-            yield from self.parsers
-            for parser in self.parsers:
-                yield from parser
-            self._iter_deep = False
-
-    def clear_cache(self):
-        for parser in self.parsers:
-            parser.clear_cache()
+        active = _active('iter')
+        if id(self) not in active:
+            active.add(id(self))
+            try:
+                yield self
+                yield from self.parsers
+                for parser in self.parsers:
+                    yield from parser
+            finally:
+                # Итерацию могут бросить на середине (break) -- флаг всё равно снимаем
+                active.discard(id(self))
+
+    def children(self):
+        return tuple(self.parsers)
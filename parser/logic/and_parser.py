@@ -1,9 +1,10 @@
-from typing import Iterable, List
+from typing import Iterable, List, Sequence
 
 from line import Line
-from parser.base import ParseError
+from parser.base import ParseError, BaseParser
 from parser.logic._multi_parser import MultiParser
 from parser.parse_variant import ParseVariant
+from parser.state import parse_goal
 
 
 class AndParserError(ParseError):
@@ -19,34 +20,58 @@ class AndParser(MultiParser):
         variants: List[ParseVariant] = []
         all_errors: List[List] = []
 
-        for i, parser in enumerate(self.parsers):
+        if self.parsers:
             errors = []
             all_errors.append(errors)
             try:
-                if i == 0:
-                    variants = list(parser.parse(line))
-                else:
-                    child_variants = []
-                    for variant in variants:
-                        p, cur_line = variant.parser, variant.line
-                        try:
-                            for sub_variant in parser.parse(cur_line):
-                                child_variants.append(ParseVariant(
-                                    AndParser(p, sub_variant.parser),
-                                    sub_variant.line
-                                ))
-                        except ParseError as e:
-                            # Dublicated code
-                            # TODO: Commond add context with or
-                            errors.append(e)
-
-                    variants = child_variants
-
+                variants = list(self.parsers[0].parse(line))
             except ParseError as e:
                 # TODO: Commond add context with or
                 errors.append(e)
 
+            variants = self._parse_rest(variants, self.parsers[1:], all_errors)
+
         if variants:
             yield from variants
         else:
             raise AndParserError("No variants :(", all_errors)
+
+    @staticmethod
+    def _parse_rest(variants: List[ParseVariant], parsers: Sequence[BaseParser],
+                    all_errors: List[List]) -> List[ParseVariant]:
+        """ Дописывает к уже разобранному началу оставшиеся парсеры """
+        goal = parse_goal.get()
+
+        for index, parser in enumerate(parsers):
+            if goal is not None and variants:
+                # Разбор до конца строки: начала, которые остаток не продолжит, дальше не несём
+                rest = parsers[index:]
+                variants = [variant for variant in variants if goal.viable(rest, variant.line)]
+
+            errors = []
+            all_errors.append(errors)
+
+            child_variants = []
+            for variant in variants:
+                p, cur_line = variant.parser, variant.line
+                try:
+                    for sub_variant in parser.parse(cur_line):
+                        child_variants.append(ParseVariant(
+                            AndParser(p, sub_variant.parser),
+                            sub_variant.line
+                        ))
+                except ParseError as e:
+                    # Dublicated code
+                    # TODO: Commond add context with or
+                    errors.append(e)
+
+            variants = child_variants
+
+        return variants
+
+    def _continue_from(self, target: BaseParser, variant: ParseVariant, path) -> Iterable[ParseVariant]:
+        if self is target:
+            yield variant
+        elif self.parsers and id(self.parsers[0]) in path:
+            firsts = list(self.parsers[0]._continue_from(target, variant, path))
+            yield from self._parse_rest(firsts, self.parsers[1:], [])
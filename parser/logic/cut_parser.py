@@ -0,0 +1,46 @@
+from typing import Iterable
+
+from line import Line
+from parser.base import BaseParser
+from parser.logic.ordered_parser import commit_choice, longest
+from parser.parse_variant import ParseVariant
+from parser.parser_wrapper import WrapperParser
+
+
+class CutParser(WrapperParser):
+    """
+    Отсечение (cut): от вложенного парсера остаётся самый длинный вариант
+    (повторы жадные, как в PEG), остальные точки возврата выбрасываются. Кроме того, если альтернатива
+    упорядоченного выбора дошла до отсечения, следующие альтернативы
+    этого выбора уже не пробуются.
+    """
+
+    def _wrap(self, parser: BaseParser):
+        return parser
+
+    def _wrap_variants(self, variants: Iterable[ParseVariant]) -> Iterable[ParseVariant]:
+        best = longest(variants)
+
+        if best is not None:
+            yield best
+
+    def parse(self, line: Line) -> Iterable[ParseVariant]:
+        for variant in self._wrap_variants(self.parser.parse(line)):
+            commit_choice()
+            yield variant
+
+    def __eq__(self, other):
+        _result = super().__eq__(other)
+        if _result is not None:
+            return _result
+
+        if not isinstance(other, self.__class__):
+            return False
+
+        return self.parser == other.parser
+
+    def __hash__(self):
+        return hash(self.__class__) * hash(self.parser)
+
+    def __str__(self):
+        return f"~{self.parser}"
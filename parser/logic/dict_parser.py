@@ -1,46 +1,58 @@
-from typing import Iterable, Union, List
+from typing import Iterable
 
 from line import Line
-from parser import FuncParser, OrParser, CharParser, KeyArgument
+from parser import FuncParser, OrParser, CharParser, KeyArgument, TextParser
 from parser.base import BaseParser
 from parser.parse_variant import ParseVariant
 
 
 class DictParser(BaseParser):
     """
-    Парсит всё из словаря
+    Парсит всё из словаря.
+    Если у словаря есть version (ContextDict), парсер слов строится заново,
+    только когда версия поменялась
     """
+    _cache = None
+
     def __init__(self, d, _return_keys=False, **kwargs,):
         self.d = {} if d is None else d
 
         self.d.update(**kwargs)
         self._return_keys = _return_keys
 
-    def _calc(self, *result, key: Union[CharParser, List[CharParser]]):
-        key = self._calc_key(key)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_cache', None)
+        return state
 
+    def _calc(self, *result, key: str):
         return self.d[key]
 
-    def _calc_key(self, key):
-        if isinstance(key, list):
-            key = "".join(p.ch for p in key)
-        else:
-            key = key.ch
+    @staticmethod
+    def _calc_key(*result, key: str):
         return key
 
     def _generate_parser(self) -> BaseParser:
-        """ Пока генерируем постоянно """
+        version = getattr(self.d, 'version', None)
+        if version is not None and self._cache is not None and self._cache[0] == version:
+            return self._cache[1]
+
         if self._return_keys:
             f = self._calc_key
         else:
             f = self._calc
 
         words = OrParser(*(CharParser.line(key) for key in self.d.keys()))
-        return FuncParser(
-            KeyArgument('key', words),
+        parser = FuncParser(
+            KeyArgument('key', TextParser(words)),
             f
         )
 
+        if version is not None:
+            self._cache = (version, parser)
+
+        return parser
+
     def parse(self, line: Line) -> Iterable[ParseVariant]:
         for variant in self._generate_parser().parse(line):
             yield variant
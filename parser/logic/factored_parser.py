@@ -0,0 +1,134 @@
+from typing import Iterable, List, Sequence, Tuple
+
+from line import Line
+from parser.base import BaseParser, ParseError
+from parser.dependencies import grammar_graph
+from parser.logic.and_parser import AndParser
+from parser.parse_variant import ParseVariant
+from parser.parser_wrapper import WrapperParser
+from parser.state import parse_memo
+
+
+class FactoredParserError(ParseError):
+    pass
+
+
+class SharedPrefix:
+    """
+    Общее начало нескольких альтернатив. Разбирается один раз на строку
+    (и один раз на вариант при наращивании левой рекурсии): результат
+    лежит в мемо разбора, как варианты OrParser
+    """
+
+    def __init__(self, parsers: Sequence[BaseParser]):
+        if not parsers:
+            raise ValueError("Prefix must not be empty")
+        self.parsers: Tuple[BaseParser, ...] = tuple(parsers)
+
+    def parse(self, line: Line) -> List[ParseVariant]:
+        return self._shared((id(self), line.line), lambda: self._parse(line))
+
+    def continue_from(self, target: BaseParser, variant: ParseVariant, path) -> List[ParseVariant]:
+        return self._shared(
+            (id(self), id(target), id(variant)),
+            lambda: AndParser._parse_rest(list(self.parsers[0]._continue_from(target, variant, path)),
+                                          self.parsers[1:], []),
+            variant
+        )
+
+    def _parse(self, line: Line) -> List[ParseVariant]:
+        try:
+            variants = list(self.parsers[0].parse(line))
+        except ParseError:
+            variants = []
+        return AndParser._parse_rest(variants, self.parsers[1:], [])
+
+    def _shared(self, key, compute, keep=None) -> List[ParseVariant]:
+        memo = parse_memo()
+        generations = tuple(map(grammar_graph.generation, self.parsers))
+        cached = memo.prefixes.get(key)
+        if cached is not None and (cached[2] is None or cached[2] == memo.grown) and cached[3] == generations:
+            return cached[1]
+
+        partial = memo.partial
+        variants = compute()
+        # Рекурсивный вызов OrParser отдал не все варианты: разбор верен,
+        # пока ни один OrParser не нашёл новых (иначе следующая ветка увидела бы больше)
+        stamp = None if memo.partial == partial else memo.grown
+        memo.prefixes[key] = (keep if keep is not None else self, variants, stamp, generations)
+        return variants
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {' & '.join(map(str, self.parsers))}>"
+
+
+class FactoredParser(BaseParser):
+    """
+    Альтернатива с вынесенным общим началом: `wrappers(prefix & rest)`.
+    Альтернативы с одним SharedPrefix разбирают начало один раз, а дерево
+    у каждой -- то же, что было до вынесения (те же обёртки и KeyArgument).
+    Обёртки берут только те, что меняют лишь дерево (_wrap_variants)
+    """
+
+    def __init__(self, prefix: SharedPrefix, wrappers: Sequence[WrapperParser], rest: Sequence[BaseParser]):
+        self.prefix = prefix
+        # Снаружи внутрь
+        self.wrappers: Tuple[WrapperParser, ...] = tuple(wrappers)
+        self.rest: Tuple[BaseParser, ...] = tuple(rest)
+
+    @property
+    def parsers(self) -> Tuple[BaseParser, ...]:
+        """ Вся последовательность, как у AndParser """
+        return self.prefix.parsers + self.rest
+
+    def parse(self, line: Line) -> Iterable[ParseVariant]:
+        variants = self._finish(self.prefix.parse(line))
+
+        if not variants:
+            raise FactoredParserError("No variants")
+
+        yield from variants
+
+    def _finish(self, variants: List[ParseVariant]) -> List[ParseVariant]:
+        found = AndParser._parse_rest(variants, self.rest, [])
+        for wrapper in reversed(self.wrappers):
+            found = wrapper._wrap_variants(found)
+        return list(found)
+
+    def _continue_from(self, target: BaseParser, variant: ParseVariant, path) -> Iterable[ParseVariant]:
+        if self is target:
+            yield variant
+        elif id(self.prefix.parsers[0]) in path:
+            yield from self._finish(self.prefix.continue_from(target, variant, path))
+
+    def children(self):
+        return self.parsers
+
+    def with_children(self, children: Sequence[BaseParser]):
+        """ Другие дети (в порядке children()); начало общее с остальными ветками """
+        size = len(self.prefix.parsers)
+        self.prefix.parsers, self.rest = tuple(children[:size]), tuple(children[size:])
+
+    def __eq__(self, other: BaseParser):
+        _result = super().__eq__(other)
+        if _result is not None:
+            return _result
+
+        if not isinstance(other, self.__class__):
+            return False
+
+        # Обёртки -- те же самые (их дети -- старые альтернативы, сравнивать их незачем)
+        return self.parsers == other.parsers and list(map(id, self.wrappers)) == list(map(id, other.wrappers))
+
+    def __hash__(self):
+        return hash(self.__class__) * hash(self.parsers)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self.prefix.parsers)} shared of {len(self.parsers)}>"
+
+    def __str__(self):
+        return f"({' & '.join(map(str, self.parsers))})"
+
+    def __iter__(self):
+        yield self
+        yield from self.parsers
@@ -0,0 +1,60 @@
+from typing import Iterable
+
+from line import Line
+from parser.base import BaseParser, ParseError
+from parser.logic.empty_parser import EmptyParser
+from parser.parse_variant import ParseVariant
+from parser.parser_wrapper import WrapperParser
+
+
+class LookaheadParserError(ParseError):
+    pass
+
+
+class LookaheadParser(WrapperParser):
+    """
+    Предпросмотр (как `&p` и `!p` в PEG): проверяет, разбирает ли parser
+    начало строки (negative -- что не разбирает), и ничего не съедает.
+    Проверка -- распознавание (parser.recognize): деревья parser
+    не строятся, таблица общая для всей строки на время разбора.
+    Дерево результата -- EmptyParser, в AndParser оно пропадает
+    """
+
+    def __init__(self, parser: BaseParser, negative: bool = False):
+        super().__init__(parser)
+        self.negative = negative
+
+    def parse(self, line: Line) -> Iterable[ParseVariant]:
+        if self.matches(line) == self.negative:
+            raise LookaheadParserError("Lookahead failed", line=line, parser=self)
+
+        yield ParseVariant(EmptyParser(), line[:])
+
+    def matches(self, line: Line) -> bool:
+        """ Разбирает ли parser хоть какое-то начало строки """
+        from parser.recognize import recognizer
+
+        return bool(recognizer(line).ends(self.parser, line.offset - line.root.offset))
+
+    def _continue_from(self, target: BaseParser, variant: ParseVariant, path) -> Iterable[ParseVariant]:
+        # Ребёнок разбирается не с этой строки, а распознаванием: наращивать нечего
+        return BaseParser._continue_from(self, target, variant, path)
+
+    def __eq__(self, other: BaseParser):
+        _result = super().__eq__(other)
+        if _result is not None:
+            return _result
+
+        if not isinstance(other, self.__class__):
+            return False
+
+        return self.negative == other.negative and self.parser == other.parser
+
+    def __hash__(self):
+        return hash(self.__class__) * hash(self.negative) * hash(self.parser)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self}>"
+
+    def __str__(self):
+        return f"{'!' if self.negative else '&'}{self.parser}"
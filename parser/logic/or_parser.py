@@ -1,10 +1,19 @@
-from collections import defaultdict
-from typing import Iterable, Sequence, Dict, List
+from contextvars import ContextVar
+from typing import Iterable, Sequence, Dict, List, Optional, Tuple
 
 from line import Line
 from parser.base import BaseParser, ParseError
+from parser.dependencies import grammar_graph
 from parser.logic._multi_parser import MultiParser
+from parser.lrec import left_recursion, LeftRecursion
 from parser.parse_variant import ParseVariant
+from parser.state import parse_memo
+
+
+# Расширения грамматики текущей сессии (см. session.py):
+# id(OrParser) -> (OrParser, дописанные в сессии альтернативы)
+grammar_extensions: ContextVar[Optional[Dict[int, Tuple[BaseParser, Tuple[BaseParser, ...]]]]] = \
+    ContextVar('grammar_extensions', default=None)
 
 
 class OrParserError(ParseError):
@@ -43,44 +52,148 @@ def _or_parser_error(f):
 class OrParser(MultiParser):
     STR_SYM = '|'
 
+    # Растёт при каждом `|=` где угодно; кэши сверяют поколения своих узлов (parser.dependencies)
+    generation = 0
+
     def __init__(self, *parsers: BaseParser):
         """
 
         :rtype:
         """
         super().__init__(*parsers)
-        self.results: Dict[Line, List[ParseVariant]] = defaultdict(list)
-        self.deep: Dict[Line, bool] = defaultdict(bool)
-        self.clear_deep: bool = False
+        # План левой рекурсии: ((поколение, расширения сессии), план), см. parser.lrec
+        self._lrec = None
+
+    def __getstate__(self):
+        # План левой рекурсии держит id парсеров -- в снимок не попадает
+        state = self.__dict__.copy()
+        state['_lrec'] = None
+        return state
+
+    @property
+    def parsers(self) -> Sequence[BaseParser]:
+        extensions = grammar_extensions.get()
+        if extensions and id(self) in extensions:
+            return self._parsers + extensions[id(self)][1]
+        return self._parsers
+
+    @parsers.setter
+    def parsers(self, parsers: Sequence[BaseParser]):
+        self._parsers = tuple(parsers)
 
     @_or_parser_error
     def parse(self, line: Line) -> Iterable[ParseVariant]:
-        yield from self.results[line]
+        # Мемо и флаг рекурсии -- в состоянии разбора, а не в самом парсере
+        memo = parse_memo()
+        results = memo.variants(self, line.line, grammar_graph.generation(self))
+        key = (id(self), line.line)
 
-        if self.deep[line]:
+        yield from results
+
+        if key in memo.deep:
+            memo.partial += 1
             return
 
-        self.deep[line] = True
+        memo.deep.add(key)
 
         try:
-            while True:
-                prev_results_count = len(self.results[line])
-
-                for parser in self.parsers:
-                    try:
-                        for item in parser.parse(line):
-                            if item not in self.results[line]:
-                                self.results[line].append(item)
-                                yield item
-                    except ParseError:
-                        pass
-
-                if prev_results_count == len(self.results[line]):
-                    break
+            plan = left_recursion(self)
+            if plan is None:
+                yield from self._parse_fixpoint(line, results)
+                return
+
+            # Сколько вариантов каждый хвост уже видел при первом проходе
+            fed: Dict[int, int] = {}
+
+            for parser in self.parsers:
+                fed[id(parser)] = len(results)
+                try:
+                    for item in parser.parse(line):
+                        if item not in results:
+                            results.append(item)
+                            memo.grown += 1
+                            yield item
+                except ParseError:
+                    pass
+
+            if plan:
+                yield from self._grow(plan, results, fed)
         except Exception:
             raise
         finally:
-            self.deep[line] = False
+            memo.deep.discard(key)
+
+    def _parse_fixpoint(self, line: Line, results: List[ParseVariant]) -> Iterable[ParseVariant]:
+        """ Перебор до неподвижной точки (для скрытой левой рекурсии) """
+        memo = parse_memo()
+        while True:
+            prev_results_count = len(results)
+
+            for parser in self.parsers:
+                try:
+                    for item in parser.parse(line):
+                        if item not in results:
+                            results.append(item)
+                            memo.grown += 1
+                            yield item
+                except ParseError:
+                    pass
+
+            if prev_results_count == len(results):
+                break
+
+    def _grow(self, plan: LeftRecursion, results: List[ParseVariant],
+              fed: Dict[int, int]) -> Iterable[ParseVariant]:
+        """
+        Наращивает варианты через леворекурсивные хвосты, пока растут.
+        Каждый хвост получает только те варианты, которые ещё не видел,
+        порядок результатов -- как у перебора до неподвижной точки.
+        """
+        memo = parse_memo()
+        is_growing = True
+        while is_growing:
+            is_growing = False
+
+            for tail in plan.tails:
+                start, end = fed.get(id(tail), 0), len(results)
+                fed[id(tail)] = end
+
+                for variant in results[start:end]:
+                    for item in tail._continue_from(self, variant, plan.path):
+                        if item not in results:
+                            results.append(item)
+                            memo.grown += 1
+                            is_growing = True
+                            yield item
+
+    def _continue_from(self, target: BaseParser, variant: ParseVariant, path) -> Iterable[ParseVariant]:
+        if self is target:
+            yield variant
+            return
+
+        memo = parse_memo()
+        continuing = memo.continuing
+        if id(self) in continuing:
+            # Цикл не через target -- его отработает _grow ниже
+            memo.partial += 1
+            return
+
+        continuing.add(id(self))
+        try:
+            results = []
+            for parser in self.parsers:
+                if id(parser) in path:
+                    for item in parser._continue_from(target, variant, path):
+                        if item not in results:
+                            results.append(item)
+
+            plan = left_recursion(self)
+            if plan:
+                list(self._grow(plan, results, {}))
+        finally:
+            continuing.discard(id(self))
+
+        yield from results
 
     @uniques
     def _parse(self, line: Line) -> Iterable[ParseVariant]:
@@ -107,26 +220,20 @@ class OrParser(MultiParser):
         return srt
 
     def __ior__(self, other: BaseParser):
-        if isinstance(other, OrParser):
-            self.parsers = (*self.parsers, *other.parsers)
+        added = tuple(other.parsers) if isinstance(other, OrParser) else (other, )
+
+        extensions = grammar_extensions.get()
+        if extensions is None:
+            self.parsers = (*self._parsers, *added)
         else:
-            self.parsers = (*self.parsers, other)
+            # В сессии общую грамматику не меняем: альтернативы видны только этой сессии
+            _, extra = extensions.get(id(self), (self, ()))
+            extensions[id(self)] = (self, extra + added)
 
-        self.clear_cache()
+        # Мемо разборов, планы левой рекурсии и собранные грамматики устаревают
+        # только у тех, кто достигает self
+        grammar_graph.mutated(self, added)
+        OrParser.generation += 1
 
         return self
 
-    def clear_cache(self):
-        if self.clear_deep:
-            return
-
-        self.clear_deep = True
-
-        self.results.clear()
-        self.deep.clear()
-
-        for parser in self.parsers:
-            parser.clear_cache()
-
-        self.clear_deep = False
-
@@ -0,0 +1,139 @@
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from line import Line
+from parser.base import BaseParser, ParseError
+from parser.logic._multi_parser import MultiParser
+from parser.parse_variant import ParseVariant
+
+
+class OrderedParserError(ParseError):
+    def __init__(self, msg, errors):
+        super().__init__(msg)
+        self.errors = errors
+
+
+class _Choice:
+    """ Попытка одной альтернативы; cut -- альтернатива прошла отсечение """
+
+    def __init__(self):
+        self.cut = False
+
+
+class _PegState:
+    """
+    Состояние самого внешнего упорядоченного выбора на время его разбора:
+    мемо (packrat), защита от левой рекурсии и стек попыток для cut
+    """
+
+    def __init__(self):
+        self.memo: Dict[Tuple[int, str], Union[ParseVariant, OrderedParserError]] = {}
+        self.active: Set[Tuple[int, str]] = set()
+        self.choices: List[_Choice] = []
+
+
+_peg_state: ContextVar[Optional[_PegState]] = ContextVar('peg_state', default=None)
+
+
+def longest(variants: Iterable[ParseVariant]) -> Optional[ParseVariant]:
+    """ Вариант, который съел больше всего (повторы жадные, как в PEG); при равной длине -- первый """
+    best = None
+
+    for variant in variants:
+        if best is None or len(variant.line) < len(best.line):
+            best = variant
+
+    return best
+
+
+def commit_choice():
+    """ Отсечение: ближайший упорядоченный выбор больше не пробует другие альтернативы """
+    state = _peg_state.get()
+    if state is not None and state.choices:
+        state.choices[-1].cut = True
+
+
+class OrderedParser(MultiParser):
+    """
+    Упорядоченный выбор (как `/` в PEG).
+    Альтернативы пробуются по порядку, у первой альтернативы, которая хоть
+    что-то разобрала, берётся самый длинный вариант; следующие не пробуются.
+    Результаты запоминаются (packrat), пока идёт разбор самого внешнего
+    упорядоченного выбора, так что детерминированная грамматика
+    разбирается за линейное время.
+
+    Повторный вход на той же строке (левая рекурсия) ничего не находит;
+    наращивание левой рекурсии через OrParser идёт через _continue_from.
+    """
+    STR_SYM = '|>'
+
+    def parse(self, line: Line) -> Iterable[ParseVariant]:
+        state = _peg_state.get()
+        token = None
+        if state is None:
+            state = _PegState()
+            token = _peg_state.set(state)
+
+        try:
+            result = self._parse_memo(state, line)
+        finally:
+            if token is not None:
+                _peg_state.reset(token)
+
+        if isinstance(result, OrderedParserError):
+            raise result
+
+        yield result
+
+    def _parse_memo(self, state: _PegState, line: Line) -> Union[ParseVariant, OrderedParserError]:
+        key = (id(self), line.line)
+
+        if key in state.memo:
+            return state.memo[key]
+
+        if key in state.active:
+            return OrderedParserError("Left recursion in ordered choice", [])
+
+        state.active.add(key)
+        try:
+            result = self._choose(state, line)
+        finally:
+            state.active.discard(key)
+
+        state.memo[key] = result
+        return result
+
+    def _choose(self, state: _PegState, line: Line) -> Union[ParseVariant, OrderedParserError]:
+        errors = []
+
+        for parser in self.parsers:
+            choice = _Choice()
+            state.choices.append(choice)
+            try:
+                variant = longest(parser.parse(line))
+            except ParseError as e:
+                errors.append(e)
+                variant = None
+            finally:
+                state.choices.pop()
+
+            if variant is not None:
+                return variant
+
+            if choice.cut:
+                break
+
+        return OrderedParserError("No one parser", errors)
+
+    def _continue_from(self, target: BaseParser, variant: ParseVariant, path) -> Iterable[ParseVariant]:
+        if self is target:
+            yield variant
+            return
+
+        # Первая альтернатива, которая смогла продолжить, и её самый длинный вариант
+        for parser in self.parsers:
+            if id(parser) in path:
+                item = longest(parser._continue_from(target, variant, path))
+                if item is not None:
+                    yield item
+                    return
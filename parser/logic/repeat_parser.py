@@ -1,4 +1,4 @@
-from typing import Iterable
+from typing import Iterable, List
 
 from line import Line
 from parser.base import BaseParser, ParseError
@@ -26,14 +26,20 @@ class RepeatParser(BaseParser):
             )
 
     def parse(self, line: Line) -> Iterable[ParseVariant]:
-        level = 0
-        variants = [ParseVariant(EmptyParser(), line)]
         is_found = False
 
+        for variant in self._repeat([ParseVariant(EmptyParser(), line)], 0):
+            yield variant
+            is_found = True
+
+        if not is_found:
+            raise RepeatParserError("Not found anything")
+
+    def _repeat(self, variants: List[ParseVariant], level: int) -> Iterable[ParseVariant]:
+        """ variants -- результаты после level повторений """
         while True:
             if self._from <= level < self._to:
                 yield from variants
-                is_found = True
 
             new_variants = []
 
@@ -52,8 +58,19 @@ class RepeatParser(BaseParser):
             variants = new_variants
             level += 1
 
-        if not is_found:
-            raise RepeatParserError("Not found anything")
+    def _continue_from(self, target: BaseParser, variant: ParseVariant, path) -> Iterable[ParseVariant]:
+        if self is target:
+            yield variant
+        elif id(self.p) in path:
+            firsts = [
+                ParseVariant(EmptyParser() & result.parser, result.line)
+                for result in self.p._continue_from(target, variant, path)
+            ]
+            if firsts:
+                yield from self._repeat(firsts, 1)
+
+    def children(self):
+        return self.p,
 
     def __repr__(self):
         return f"<RepeatParser {self._from}:{self._to} of {self.p}>"
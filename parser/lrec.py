@@ -0,0 +1,163 @@
+"""
+Левая рекурсия.
+
+Раньше OrParser разбирал левую рекурсию перебором: гонял все альтернативы
+по кругу, пока не переставали появляться новые варианты.
+Теперь для каждого OrParser при первом разборе (после каждого `|=`)
+строится план:
+
+* seeds -- обычный проход по всем альтернативам (рекурсивный вызов
+  на той же строке отдаёт только уже найденное);
+* tails -- альтернативы, из которых OrParser достижим слева.
+  Каждый новый вариант "наращивается" через tails (_continue_from),
+  поэтому один шаг роста -- один проход только по хвостам.
+
+Скрытую левую рекурсию (через парсер, который может ничего не съесть)
+так развернуть нельзя, для неё остаётся старый перебор.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+
+from parser.base import BaseParser
+from parser.graph import nullable, walk
+
+
+class LeftRecursion:
+    def __init__(self, tails: Tuple[BaseParser, ...], path: Set[int]):
+        self.tails = tails
+        # id парсеров, из которых OrParser достижим слева
+        self.path = path
+
+    def __bool__(self):
+        return bool(self.tails)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self.tails)} tails>"
+
+
+def _left_edges(parser: BaseParser, nullables: Set[int]) -> List[Tuple[BaseParser, bool]]:
+    """ (левый потомок, скрытый ли переход) """
+    from parser.func.text_parser import TextParser
+    from parser.logic.and_parser import AndParser
+    from parser.logic.factored_parser import FactoredParser
+    from parser.logic.lookahead_parser import LookaheadParser
+
+    if isinstance(parser, LookaheadParser):
+        # Ребёнок не разбирается через parse: левых рёбер нет
+        return []
+    if isinstance(parser, TextParser):
+        # Подстроку не нарастить через _continue_from: такой цикл разбирается перебором
+        return [(parser.parser, True)]
+    if isinstance(parser, (AndParser, FactoredParser)):
+        edges = []
+        for i, child in enumerate(parser.parsers):
+            edges.append((child, i > 0))
+            if id(child) not in nullables:
+                break
+        return edges
+
+    return [(child, False) for child in parser.children()]
+
+
+def analyze(or_parser: BaseParser) -> Optional[LeftRecursion]:
+    """
+    План разбора левой рекурсии для OrParser.
+    None -- есть скрытая левая рекурсия, развернуть нельзя.
+    """
+    nullables = nullable(or_parser)
+
+    edges: Dict[int, List[Tuple[BaseParser, bool]]] = {}
+    parents: Dict[int, List[BaseParser]] = {}
+    stack: List[BaseParser] = [or_parser]
+
+    while stack:
+        parser = stack.pop()
+        if id(parser) in edges:
+            continue
+        edges[id(parser)] = _left_edges(parser, nullables)
+        for child, _ in edges[id(parser)]:
+            parents.setdefault(id(child), []).append(parser)
+            stack.append(child)
+
+    # Все, из кого or_parser достижим слева
+    path: Set[int] = set()
+    stack = [or_parser]
+    while stack:
+        parser = stack.pop()
+        for parent in parents.get(id(parser), ()):
+            if id(parent) not in path:
+                path.add(id(parent))
+                stack.append(parent)
+
+    for parent_id, children in edges.items():
+        for child, hidden in children:
+            if hidden and _on_cycle(child, parent_id, edges):
+                return None
+
+    tails = tuple(parser for parser in or_parser.children() if id(parser) in path)
+
+    return LeftRecursion(tails, path)
+
+
+def _on_cycle(child: BaseParser, parent_id: int, edges) -> bool:
+    """ Лежит ли скрытый переход parent -> child на цикле """
+    seen: Set[int] = set()
+    stack = [child]
+
+    while stack:
+        parser = stack.pop()
+        if id(parser) == parent_id:
+            return True
+        if id(parser) in seen:
+            continue
+        seen.add(id(parser))
+        stack.extend(c for c, _ in edges.get(id(parser), ()))
+
+    return False
+
+
+def left_recursion(or_parser: BaseParser) -> Optional[LeftRecursion]:
+    """
+    План с кэшем: пересчитывается после `|=` в парсере, достижимом из or_parser,
+    и для каждой сессии со своими расширениями грамматики
+    """
+    from parser.dependencies import grammar_graph
+    from parser.logic.or_parser import grammar_extensions
+
+    extensions = grammar_extensions.get()
+    key = (grammar_graph.generation(or_parser), id(extensions) if extensions else None)
+
+    cached = or_parser._lrec
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    plan = analyze(or_parser)
+    # Одно присваивание: другой поток увидит либо старый, либо новый план целиком
+    or_parser._lrec = (key, plan)
+
+    return plan
+
+
+def find_left_recursion(root: BaseParser) -> List[BaseParser]:
+    """ Все леворекурсивные OrParser, достижимые из root """
+    from parser.logic.or_parser import OrParser
+
+    found = []
+    for parser in walk(root):
+        if isinstance(parser, OrParser):
+            plan = left_recursion(parser)
+            if plan is None or plan:
+                found.append(parser)
+
+    return found
+
+
+def plan_left_recursion(root: BaseParser) -> List[BaseParser]:
+    """
+    Заранее строит планы для всех OrParser грамматики (иначе они строятся
+    лениво при первом разборе).
+    Возвращает OrParser со скрытой левой рекурсией, которые остались на переборе.
+    """
+    return [
+        parser for parser in find_left_recursion(root)
+        if left_recursion(parser) is None
+    ]
@@ -0,0 +1,541 @@
+"""
+Оптимизатор грамматики.
+
+Проходы упрощают граф парсеров, не меняя того, что он разбирает:
+
+- dead -- убирает альтернативы OrParser, которые никогда ничего не разберут
+  (пустой AndParser / OrParser и всё, что из них состоит), и повторы
+  одного и того же парсера среди альтернатив;
+- empty -- убирает EmptyParser из AndParser (в дереве AndParser его всё равно нет);
+- repeat -- `p[:1]` -> EmptyParser, `p[n:n + 1]` (n >= 2) -> `p & ... & p`;
+- flatten -- вкладывает OrParser в OrParser и AndParser в AndParser (кроме узлов
+  одного цикла), заменяет AndParser / OrParser из одного парсера самим парсером;
+- identity -- убирает `FuncParser(KeyArgument(k, p), lambda *args, k: k)`;
+- factor -- альтернативы OrParser с общим началом становятся FactoredParser
+  с общим SharedPrefix: начало разбирается один раз, а альтернативы остаются
+  на своих местах и собирают те же деревья, с теми же KeyArgument.
+
+Деревья разбора остаются теми же, кроме identity: там из дерева пропадают
+FuncParser и KeyArgument, а значение (calculate) и приоритеты -- те же.
+Проход берётся, только если другим парсерам дерево без обёртки
+ничего не меняет (см. _removable).
+
+Оптимизируется копия графа: общую грамматику не трогаем, её дальше
+меняют `|=`, и её же сохраняют снимки. Optimizer хранит копию по корню
+и собирает заново после `|=` и для каждой сессии со своими расширениями
+грамматики, как CompilingEngine.
+"""
+import copy
+import dis
+import inspect
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from parser.base import BaseParser
+from parser.dependencies import grammar_graph
+from parser.func.func_parser import FuncParser
+from parser.func.key_argument import KeyArgument
+from parser.func.text_parser import Text, TextParser
+from parser.graph import plain_wrapper, strong_components, walk
+from parser.logic._multi_parser import MultiParser
+from parser.logic.and_parser import AndParser
+from parser.logic.char_parser import CharParser
+from parser.logic.cut_parser import CutParser
+from parser.logic.dict_parser import DictParser
+from parser.logic.empty_parser import EmptyParser
+from parser.logic.factored_parser import FactoredParser, SharedPrefix
+from parser.logic.lookahead_parser import LookaheadParser
+from parser.logic.or_parser import OrParser, grammar_extensions
+from parser.logic.ordered_parser import OrderedParser
+from parser.logic.repeat_parser import RepeatParser
+from parser.parser_wrapper import WrapperParser
+from parser.regular import RegularAnalysis
+
+
+class OptimizeReport:
+    def __init__(self, before: int, after: int, changes: Dict[str, int]):
+        """
+        :param before: узлов в графе до оптимизации
+        :param after: узлов после
+        :param changes: имя прохода -> сколько раз он что-то поменял
+        """
+        self.before = before
+        self.after = after
+        self.changes = changes
+
+    def __repr__(self):
+        changes = ", ".join(f"{name}: {count}" for name, count in self.changes.items())
+        return f"<{self.__class__.__name__}: {self.before} -> {self.after} nodes; {changes}>"
+
+
+def optimize(root: BaseParser, passes: Optional[Sequence[str]] = None) -> Tuple[BaseParser, OptimizeReport]:
+    """
+    Оптимизированная копия графа и отчёт.
+    :param passes: какие проходы запускать (по умолчанию все, см. PASSES)
+    """
+    names = tuple(PASSES) if passes is None else tuple(passes)
+    for name in names:
+        if name not in PASSES:
+            raise ValueError(f"Unknown pass {repr(name)}, use one of: {', '.join(PASSES)}")
+
+    before = _count(root)
+    optimized = _copy(root)
+    changes = {name: 0 for name in names}
+
+    # Проходы открывают работу друг другу (repeat -> empty -> flatten), поэтому по кругу
+    for _ in range(_ROUNDS):
+        changed = 0
+        for name in names:
+            optimized, count = PASSES[name](optimized)
+            changes[name] += count
+            changed += count
+        if not changed:
+            break
+
+    return optimized, OptimizeReport(before, _count(optimized), changes)
+
+
+class Optimizer:
+    """ Оптимизированные копии корней; собираются заново после `|=` под корнем """
+
+    def __init__(self, passes: Optional[Sequence[str]] = None):
+        self.passes = passes
+        # id(корень) -> (корень, (поколение корня, расширения сессии), оптимизированная копия)
+        self._optimized: Dict[int, Tuple[BaseParser, Tuple[int, int], BaseParser]] = {}
+        # Отчёт последней оптимизации
+        self.report: Optional[OptimizeReport] = None
+
+    def optimized(self, root: BaseParser) -> BaseParser:
+        generation = (grammar_graph.generation(root), id(grammar_extensions.get()))
+        cached = self._optimized.get(id(root))
+
+        if cached is not None and cached[0] is root and cached[1] == generation:
+            return cached[2]
+
+        optimized, self.report = optimize(root, self.passes)
+        self._optimized[id(root)] = (root, generation, optimized)
+        return optimized
+
+
+_ROUNDS = 8
+
+
+def _count(root: BaseParser) -> int:
+    return sum(1 for _ in walk(root))
+
+
+def _copy(root: BaseParser) -> BaseParser:
+    """ Копия узлов с детьми; листья (и узлы, о которых ничего не знаем) -- общие """
+    copies: Dict[int, BaseParser] = {}
+    originals = list(walk(root))
+
+    prefixes: Dict[int, SharedPrefix] = {}
+
+    for parser in originals:
+        if isinstance(parser, (MultiParser, RepeatParser, WrapperParser, FactoredParser)):
+            copies[id(parser)] = copy.copy(parser)
+        if isinstance(parser, FactoredParser):
+            # Общее начало -- одно на все копии веток
+            if id(parser.prefix) not in prefixes:
+                prefixes[id(parser.prefix)] = copy.copy(parser.prefix)
+            copies[id(parser)].prefix = prefixes[id(parser.prefix)]
+
+    for parser in originals:
+        if id(parser) in copies:
+            # У OrParser -- вместе с расширениями сессии (parsers, а не _parsers)
+            _set_children(copies[id(parser)], [copies.get(id(child), child) for child in parser.children()])
+
+    return copies.get(id(root), root)
+
+
+def _set_children(parser: BaseParser, children: List[BaseParser]):
+    if isinstance(parser, MultiParser):
+        parser.parsers = tuple(children)
+    elif isinstance(parser, RepeatParser):
+        parser.p, = children
+    elif isinstance(parser, FactoredParser):
+        parser.with_children(children)
+    else:
+        parser.parser, = children
+
+
+def _replace(root: BaseParser, replacements: Dict[int, BaseParser]) -> BaseParser:
+    """ Подставляет замены во всех родителей; возвращает новый корень """
+    def resolve(parser: BaseParser) -> BaseParser:
+        seen = set()
+        while id(parser) in replacements and id(parser) not in seen:
+            seen.add(id(parser))
+            parser = replacements[id(parser)]
+        return parser
+
+    if replacements:
+        for parser in list(walk(root)):
+            children = parser.children()
+            resolved = [resolve(child) for child in children]
+            if any(new is not old for new, old in zip(resolved, children)):
+                _set_children(parser, resolved)
+
+    return resolve(root)
+
+
+def _parents(root: BaseParser) -> Dict[int, List[BaseParser]]:
+    """ id парсера -> родители (по одному на каждое ребро) """
+    result: Dict[int, List[BaseParser]] = {}
+    for parser in walk(root):
+        for child in parser.children():
+            result.setdefault(id(child), []).append(parser)
+    return result
+
+
+# dead
+
+def _productive(root: BaseParser) -> Set[int]:
+    """ id парсеров, которые могут что-то разобрать (неизвестные -- могут) """
+    parsers = list(walk(root))
+    result: Set[int] = set()
+
+    changed = True
+    while changed:
+        changed = False
+        for parser in parsers:
+            if id(parser) in result:
+                continue
+
+            if isinstance(parser, (AndParser, FactoredParser)):
+                is_productive = bool(parser.parsers) and all(id(p) in result for p in parser.parsers)
+            elif isinstance(parser, (OrParser, OrderedParser)):
+                is_productive = any(id(p) in result for p in parser.parsers)
+            elif isinstance(parser, RepeatParser):
+                is_productive = parser._from == 0 or id(parser.p) in result
+            elif isinstance(parser, LookaheadParser):
+                is_productive = parser.negative or id(parser.parser) in result
+            elif isinstance(parser, WrapperParser):
+                is_productive = id(parser.parser) in result
+            else:
+                is_productive = True
+
+            if is_productive:
+                result.add(id(parser))
+                changed = True
+
+    return result
+
+
+def _dead(root: BaseParser) -> Tuple[BaseParser, int]:
+    productive = _productive(root)
+    count = 0
+
+    for parser in walk(root):
+        if not isinstance(parser, OrParser):
+            continue
+
+        alternatives = []
+        for alternative in parser.parsers:
+            if id(alternative) not in productive or any(alternative is p for p in alternatives):
+                continue
+            # Все EmptyParser дают одно и то же дерево
+            if isinstance(alternative, EmptyParser) and any(isinstance(p, EmptyParser) for p in alternatives):
+                continue
+            alternatives.append(alternative)
+
+        if len(alternatives) != len(parser.parsers):
+            count += len(parser.parsers) - len(alternatives)
+            parser.parsers = tuple(alternatives)
+
+    return root, count
+
+
+# empty
+
+def _empty(root: BaseParser) -> Tuple[BaseParser, int]:
+    replacements: Dict[int, BaseParser] = {}
+    count = 0
+
+    for parser in walk(root):
+        if not isinstance(parser, AndParser) or not any(isinstance(p, EmptyParser) for p in parser.parsers):
+            continue
+
+        rest = tuple(p for p in parser.parsers if not isinstance(p, EmptyParser))
+        count += 1
+        if rest:
+            parser.parsers = rest
+        else:
+            replacements[id(parser)] = EmptyParser()
+
+    return _replace(root, replacements), count
+
+
+# repeat
+
+def _repeat(root: BaseParser) -> Tuple[BaseParser, int]:
+    replacements: Dict[int, BaseParser] = {}
+
+    for parser in walk(root):
+        if not isinstance(parser, RepeatParser):
+            continue
+
+        if parser._from == 0 and parser._to == 1:
+            replacements[id(parser)] = EmptyParser()
+        elif parser._from >= 2 and parser._to == parser._from + 1:
+            # Дерево повтора -- `EmptyParser() & t1 & t2 ...`, то есть AndParser(t1, t2, ...)
+            sequence = AndParser()
+            sequence.parsers = (parser.p, ) * parser._from
+            replacements[id(parser)] = sequence
+
+    return _replace(root, replacements), len(replacements)
+
+
+# flatten
+
+def _flatten(root: BaseParser) -> Tuple[BaseParser, int]:
+    components = strong_components(root)
+    parents = _parents(root)
+    replacements: Dict[int, BaseParser] = {}
+    count = 0
+
+    def inlined(parser: MultiParser, child: BaseParser) -> bool:
+        # Свой цикл не раскрываем; OrParser -- только если больше им никто
+        # не пользуется, иначе пропало бы общее мемо его вариантов
+        if type(child) is not type(parser) or child is root or components[id(child)] == components[id(parser)]:
+            return False
+        return isinstance(child, AndParser) or len(parents[id(child)]) == 1
+
+    for parser in walk(root):
+        if type(parser) not in (AndParser, OrParser):
+            continue
+
+        children = []
+        for child in parser.parsers:
+            if inlined(parser, child):
+                children.extend(child.parsers)
+            else:
+                children.append(child)
+        if len(children) != len(parser.parsers):
+            count += 1
+            parser.parsers = tuple(children)
+
+    cyclic = _cyclic(root, components)
+    analysis = RegularAnalysis()
+    for parser in walk(root):
+        if type(parser) not in (AndParser, OrParser) or len(parser.parsers) != 1:
+            continue
+
+        child, = parser.parsers
+        if child is parser:
+            continue
+        # AndParser из одного парсера отдаёт его деревья как есть. OrParser ещё
+        # и убирает повторы, поэтому заменяется, только если повторов не бывает
+        if isinstance(parser, OrParser) and (id(parser) in cyclic or not _distinct(child, analysis)):
+            continue
+        replacements[id(parser)] = child
+
+    return _replace(root, replacements), count + len(replacements)
+
+
+def _cyclic(root: BaseParser, components: Dict[int, int]) -> Set[int]:
+    sizes: Dict[int, int] = {}
+    for component in components.values():
+        sizes[component] = sizes.get(component, 0) + 1
+
+    return {
+        id(parser) for parser in walk(root)
+        if sizes[components[id(parser)]] > 1 or any(child is parser for child in parser.children())
+    }
+
+
+def _distinct(parser: BaseParser, analysis: RegularAnalysis) -> bool:
+    """ Разные варианты парсера всегда различны """
+    if isinstance(parser, (CharParser, EmptyParser, OrParser, TextParser, DictParser)):
+        return True
+    return analysis.compile(parser) is not None
+
+
+# identity
+
+def identity_key(func: Callable) -> Optional[str]:
+    """ k, если func -- `lambda *args, k: k` (или такая же def) """
+    code = getattr(func, '__code__', None)
+    if code is None or code.co_argcount or code.co_kwonlyargcount != 1 or not code.co_flags & inspect.CO_VARARGS:
+        return None
+
+    key = code.co_varnames[0]
+    instructions = [
+        (instruction.opname, instruction.argval) for instruction in dis.get_instructions(func)
+        if instruction.opname not in ('RESUME', 'NOP', 'CACHE')
+    ]
+    if instructions != [('LOAD_FAST', key), ('RETURN_VALUE', None)]:
+        return None
+
+    return key
+
+
+def _tops(root: BaseParser) -> Dict[int, frozenset]:
+    """
+    id парсера -> классы, которые могут быть корнем его дерева.
+    BaseParser в наборе -- неизвестно, что угодно
+    """
+    parsers = list(walk(root))
+    result: Dict[int, frozenset] = {id(parser): frozenset() for parser in parsers}
+
+    changed = True
+    while changed:
+        changed = False
+        for parser in parsers:
+            if isinstance(parser, (CharParser, EmptyParser, Text)):
+                tops = {type(parser)}
+            elif isinstance(parser, DictParser):
+                tops = {FuncParser}
+            elif isinstance(parser, TextParser):
+                tops = {Text}
+            elif isinstance(parser, CutParser):
+                tops = result[id(parser.parser)]
+            elif isinstance(parser, LookaheadParser):
+                tops = {EmptyParser}
+            elif isinstance(parser, WrapperParser):
+                tops = {type(parser)}
+            elif isinstance(parser, (OrParser, OrderedParser)):
+                tops = set().union(*(result[id(p)] for p in parser.parsers))
+            elif isinstance(parser, AndParser):
+                tops = result[id(parser.parsers[0])] if len(parser.parsers) == 1 else {AndParser}
+            elif isinstance(parser, RepeatParser):
+                tops = {EmptyParser, AndParser}
+            elif isinstance(parser, FactoredParser):
+                tops = {type(parser.wrappers[0]) if parser.wrappers else AndParser}
+            else:
+                tops = {BaseParser}
+
+            tops = frozenset(tops)
+            if tops != result[id(parser)]:
+                result[id(parser)] = tops
+                changed = True
+
+    return result
+
+
+def _overlap(tops: frozenset, other: frozenset) -> bool:
+    return bool(tops & other) or BaseParser in tops or BaseParser in other
+
+
+def _identity(root: BaseParser) -> Tuple[BaseParser, int]:
+    count = 0
+
+    while True:
+        tops, parents = _tops(root), _parents(root)
+        found = next((parser for parser in walk(root) if _removable(parser, tops, parents)), None)
+        if found is None:
+            return root, count
+
+        root = _replace(root, {id(found): found.parser.parser})
+        count += 1
+
+
+def _removable(parser: BaseParser, tops: Dict[int, frozenset], parents: Dict[int, List[BaseParser]]) -> bool:
+    if type(parser) is not FuncParser or type(parser.parser) is not KeyArgument:
+        return False
+    if identity_key(parser.func) != parser.parser.key:
+        return False
+
+    inner = parser.parser.parser
+    inner_tops = tops[id(inner)]
+    # AndParser растворился бы в AndParser родителя, KeyArgument дал бы родителю
+    # лишний аргумент, а FuncParser над нами получает само дерево первым аргументом
+    if _overlap(inner_tops, frozenset((AndParser, KeyArgument))):
+        return False
+    if any(type(p) is FuncParser for p in parents.get(id(parser), ())):
+        return False
+
+    # OrParser убирает равные деревья: без обёртки дерево не должно совпасть
+    # с деревом другой альтернативы (в том числе через вложенные OrParser)
+    seen = {id(parser)}
+    stack = [parser]
+    while stack:
+        child = stack.pop()
+        for alternatives in parents.get(id(child), ()):
+            if not isinstance(alternatives, OrParser) or id(alternatives) in seen:
+                continue
+            for alternative in alternatives.parsers:
+                if alternative is not child and _overlap(tops[id(alternative)], inner_tops):
+                    return False
+            seen.add(id(alternatives))
+            stack.append(alternatives)
+
+    return True
+
+
+# factor
+
+def _factor(root: BaseParser) -> Tuple[BaseParser, int]:
+    count = 0
+
+    for parser in walk(root):
+        if type(parser) is not OrParser:
+            continue
+
+        # Подпись первого элемента -> номера альтернатив-последовательностей
+        groups: Dict[object, List[int]] = {}
+        sequences = [_sequence(alternative) for alternative in parser.parsers]
+        for i, sequence in enumerate(sequences):
+            if sequence is not None:
+                groups.setdefault(_signature(sequence[1][0]), []).append(i)
+
+        alternatives = list(parser.parsers)
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+
+            size = _common_prefix([sequences[i][1] for i in members])
+            prefix = sequences[members[0]][1][:size]
+            if any(isinstance(p, (CutParser, OrderedParser)) for element in prefix for p in walk(element)):
+                # Отсечение срабатывает при каждом разборе, общий разбор его бы потерял
+                continue
+
+            shared = SharedPrefix(prefix)
+            for i in members:
+                wrappers, elements = sequences[i]
+                alternatives[i] = FactoredParser(shared, wrappers, elements[size:])
+            count += 1
+
+        parser.parsers = tuple(alternatives)
+
+    return root, count
+
+
+def _sequence(parser: BaseParser) -> Optional[Tuple[Tuple[WrapperParser, ...], Tuple[BaseParser, ...]]]:
+    """ (обёртки снаружи внутрь, элементы AndParser) или None """
+    wrappers = []
+    while plain_wrapper(parser):
+        wrappers.append(parser)
+        parser = parser.parser
+
+    if type(parser) is not AndParser or len(parser.parsers) < 2:
+        return None
+    return tuple(wrappers), tuple(parser.parsers)
+
+
+def _signature(parser: BaseParser) -> object:
+    """ Равные подписи -- разбирают одно и то же в одинаковые деревья """
+    if type(parser) is CharParser:
+        return CharParser, parser.ch
+    if type(parser) is KeyArgument:
+        return KeyArgument, parser.key, _signature(parser.parser)
+    if type(parser) is RepeatParser:
+        return RepeatParser, parser._from, parser._to, _signature(parser.p)
+    return id(parser)
+
+
+def _common_prefix(sequences: List[Tuple[BaseParser, ...]]) -> int:
+    size = 0
+    while all(len(sequence) > size for sequence in sequences) and len(
+            {_signature(sequence[size]) for sequence in sequences}
+    ) == 1:
+        size += 1
+    return size
+
+
+PASSES = {
+    'dead': _dead,
+    'empty': _empty,
+    'repeat': _repeat,
+    'flatten': _flatten,
+    'identity': _identity,
+    'factor': _factor,
+}
@@ -12,20 +12,32 @@ class WrapperParser(BaseParser):
     def _wrap(self, parser: BaseParser):
         raise NotImplementedError()
 
-    def parse(self, line: Line) -> Iterable[ParseVariant]:
-        for variant in self.parser.parse(line):
+    def _wrap_variants(self, variants: Iterable[ParseVariant]) -> Iterable[ParseVariant]:
+        for variant in variants:
             yield ParseVariant(
                 self._wrap(variant.parser),
                 variant.line
             )
+
+    def parse(self, line: Line) -> Iterable[ParseVariant]:
+        yield from self._wrap_variants(self.parser.parse(line))
         # TODO: try + except + context
 
+    def _continue_from(self, target: BaseParser, variant: ParseVariant, path) -> Iterable[ParseVariant]:
+        if self is target:
+            yield variant
+        elif id(self.parser) in path:
+            yield from self._wrap_variants(self.parser._continue_from(target, variant, path))
+
     def calculate(self, executor: 'Executor') -> Any:
         return self.parser.calculate(executor)
 
     def __repr__(self):
         return f"<{self.__class__.__name__}: {self.parser}>"
 
+    def children(self):
+        return self.parser,
+
     def __iter__(self):
         yield self
         yield self.parser
@@ -1,6 +1,5 @@
-from typing import Iterable
+from typing import Iterable, Optional
 
-from line import Line
 from parser.base import BaseParser
 from parser.parse_variant import ParseVariant
 from parser.parser_wrapper import WrapperParser
@@ -42,14 +41,13 @@ class PriorityParser(WrapperParser):
     def _wrap(self, parser: BaseParser):
         return PriorityParser(parser, self.priority)
 
-    def parse(self, line: Line) -> Iterable[ParseVariant]:
-        for variant in self.parser.parse(line):
+    def _wrap_variants(self, variants: Iterable[ParseVariant]) -> Iterable[ParseVariant]:
+        for variant in variants:
             is_good = True
-            for sub in variant.parser:
-                if isinstance(sub, PriorityParser):
-                    if sub.priority.priority < self.priority.priority:
-                        is_good = False
-                        break
+            for sub in _inner_priorities(variant.parser):
+                if sub.priority.priority < self.priority.priority:
+                    is_good = False
+                    break
             if is_good:
                 yield ParseVariant(
                     self._wrap(variant.parser),
@@ -68,3 +66,50 @@ class PriorityParser(WrapperParser):
 
     def __repr__(self):
         return f"<PriorityParser({self.priority}) {self.parser}>"
+
+
+class GroupParser(WrapperParser):
+    """
+    Группировка (скобки, аргументы функции).
+    PriorityParser снаружи не смотрит на приоритеты внутри группы.
+    """
+
+    def _wrap(self, parser: BaseParser):
+        return GroupParser(parser)
+
+    def __eq__(self, other):
+        _result = super().__eq__(other)
+        if _result is not None:
+            return _result
+
+        if isinstance(other, self.__class__):
+            return self.parser == other.parser
+
+        return False
+
+    def __hash__(self):
+        return hash(self.__class__) * hash(self.parser)
+
+    def __str__(self):
+        return str(self.parser)
+
+
+def tree_priority(parser: BaseParser) -> Optional[int]:
+    """
+    Приоритет дерева разбора: самый слабый PriorityParser снаружи групп
+    (у корректного дерева это внешняя операция). None -- приоритетов нет
+    """
+    priorities = [sub.priority.priority for sub in _inner_priorities(parser)]
+    return min(priorities) if priorities else None
+
+
+def _inner_priorities(parser: BaseParser) -> Iterable[PriorityParser]:
+    """ Все PriorityParser в дереве результата, кроме спрятанных в группы """
+    stack = [parser]
+
+    while stack:
+        sub = stack.pop()
+        if isinstance(sub, PriorityParser):
+            yield sub
+        if not isinstance(sub, GroupParser):
+            stack.extend(sub.children())
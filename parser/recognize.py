@@ -0,0 +1,307 @@
+"""
+Распознавание: разбирает ли парсер строку, без деревьев результата.
+
+Обычный разбор строит каждый ParseVariant, каждый AndParser результата
+и каждую обёртку (FuncParser, KeyArgument, PriorityParser). Чтобы ответить
+"подходит ли строка", достаточно таблицы (парсер, начало) -> {конец: ключ},
+как у parser.forest, только без узлов леса.
+
+Ключ -- самый слабый PriorityParser дерева снаружи групп (tree_priority,
+None -- приоритетов нет). Больший ключ проходит через все PriorityParser,
+через которые проходит меньший, поэтому на каждый конец хватает лучшего.
+
+Левая рекурсия -- наращивание до неподвижной точки, как в parser.forest.
+Парсеры, которые управляют перебором сами (DictParser, OrderedParser,
+CutParser, пользовательские), разбираются обычным способом.
+
+Предпросмотр (LookaheadParser) берёт одну таблицу на всю строку на время
+разбора (recognizer): проверки на разных позициях её переиспользуют.
+Ей же EndLineParser проверяет, дойдёт ли разбор до конца строки, а
+AndParser под ним отбрасывает начала, которые остаток не продолжит (viable).
+После `|=` общая таблица забывает только парсеры, которые достигают
+изменённого (refresh).
+"""
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from line import Line
+from parser.base import BaseParser, ParseError
+from parser.common.end_line_parser import EndLineParser
+from parser.dependencies import grammar_graph
+from parser.func.text_parser import TextParser
+from parser.logic.and_parser import AndParser
+from parser.logic.char_parser import CharParser
+from parser.logic.cut_parser import CutParser
+from parser.logic.empty_parser import EmptyParser
+from parser.logic.factored_parser import FactoredParser
+from parser.logic.lookahead_parser import LookaheadParser
+from parser.logic.or_parser import OrParser
+from parser.logic.repeat_parser import RepeatParser
+from parser.parser_wrapper import WrapperParser
+from parser.priority_parser import GroupParser, PriorityParser, tree_priority
+from parser.state import parse_memo, parse_state
+
+# Конец -> ключ (лучший)
+Ends = Dict[int, Optional[int]]
+
+# Обёртка отбросила разбор
+_REJECTED = object()
+
+
+def _better(key: Optional[int], old: Optional[int]) -> bool:
+    """ key пропускает больше, чем old (None -- приоритетов нет, пропускает всё) """
+    if old is None:
+        return False
+    return key is None or key > old
+
+
+def _merge(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+class Recognizer:
+    """ Таблица распознавания одной строки """
+
+    def __init__(self, line: Line):
+        self.line = line
+        self.s = line.line
+        self.n = len(self.s)
+
+        self.table: Dict[Tuple[int, int], Ends] = {}
+        self.done: Set[Tuple[int, int]] = set()
+        self.active: Set[Tuple[int, int]] = set()
+        # Какие незаконченные ключи прочитаны при вычислении (стек)
+        self.reads: List[Set[Tuple[int, int]]] = [set()]
+        self.changes = 0
+        self.state = parse_state.get()
+        # (id парсеров подряд, начало) -> концы
+        self.sequences: Dict[Tuple[Tuple[int, ...], int], Ends] = {}
+        # id парсера с готовыми концами -> (парсер, его поколение), для refresh
+        self.parsers: Dict[int, Tuple[BaseParser, int]] = {}
+        self.generation = OrParser.generation
+
+    def ends(self, parser: BaseParser, i: int = 0) -> Ends:
+        """ Концы разборов parser с позиции i и ключи их деревьев """
+        key = (id(parser), i)
+
+        if key in self.done:
+            return self.table[key]
+
+        if key in self.active:
+            self.reads[-1].add(key)
+            return self.table[key]
+
+        self.active.add(key)
+        out = self.table.setdefault(key, {})
+
+        while True:
+            if self.state is not None:
+                self.state.step(parser)
+
+            self.reads.append(set())
+            changes = self.changes
+            self._compute(parser, i, out)
+            reads = self.reads.pop()
+
+            is_head = key in reads
+            reads.discard(key)
+
+            if is_head and changes != self.changes:
+                continue
+            break
+
+        self.active.discard(key)
+
+        if reads:
+            # Зависит от незаконченного внешнего ключа -- пересчитаем позже
+            self.reads[-1].update(reads)
+        else:
+            self.done.add(key)
+            if key[0] not in self.parsers:
+                self.parsers[key[0]] = (parser, grammar_graph.generation(parser))
+
+        return out
+
+    def refresh(self):
+        """ После `|=` забывает концы парсеров, которые достигают изменённого """
+        if self.active or self.generation == OrParser.generation:
+            return
+        self.generation = OrParser.generation
+
+        stale = {key for key, (parser, generation) in self.parsers.items()
+                 if grammar_graph.generation(parser) != generation}
+        if not stale:
+            return
+
+        for key in stale:
+            del self.parsers[key]
+        self.done = {key for key in self.done if key[0] not in stale}
+        self.table = {key: ends for key, ends in self.table.items() if key[0] not in stale}
+        self.sequences.clear()
+
+    def viable(self, parsers: Sequence[BaseParser], line: Line, end: Optional[int] = None) -> bool:
+        """
+        Могут ли parsers подряд разобрать начало line (хвоста строки таблицы),
+        а если задан end -- дойти ровно до него. Пока таблица считается
+        (разбор обычным способом изнутри неё), концы ещё не все -- тогда да
+        """
+        if self.active or line.root.line != self.s:
+            return True
+
+        key = (tuple(map(id, parsers)), line.offset - line.root.offset)
+        if key not in self.sequences:
+            self.sequences[key] = self._sequence(parsers, key[1])
+
+        ends = self.sequences[key]
+        return bool(ends) if end is None else end in ends
+
+    def _add(self, out: Ends, j: int, key: Optional[int]) -> bool:
+        if j in out and not _better(key, out[j]):
+            return False
+
+        out[j] = key
+        self.changes += 1
+        return True
+
+    def _compute(self, parser: BaseParser, i: int, out: Ends):
+        if isinstance(parser, CutParser):
+            self._compute_host(parser, i, out)
+        elif isinstance(parser, LookaheadParser):
+            if bool(self.ends(parser.parser, i)) != parser.negative:
+                self._add(out, i, None)
+        elif isinstance(parser, WrapperParser):
+            for j, key in list(self.ends(parser.parser, i).items()):
+                key = self._wrap(parser, j, key)
+                if key is not _REJECTED:
+                    self._add(out, j, key)
+        elif isinstance(parser, FactoredParser):
+            for j, key in self._sequence(parser.parsers, i).items():
+                for wrapper in reversed(parser.wrappers):
+                    key = self._wrap(wrapper, j, key)
+                    if key is _REJECTED:
+                        break
+                else:
+                    self._add(out, j, key)
+        elif isinstance(parser, OrParser):
+            for alternative in parser.parsers:
+                for j, key in list(self.ends(alternative, i).items()):
+                    self._add(out, j, key)
+        elif isinstance(parser, AndParser):
+            if parser.parsers:
+                for j, key in self._sequence(parser.parsers, i).items():
+                    self._add(out, j, key)
+        elif isinstance(parser, RepeatParser):
+            self._compute_repeat(parser, i, out)
+        elif isinstance(parser, CharParser):
+            if self.s.startswith(parser.ch, i):
+                self._add(out, i + len(parser.ch), None)
+        elif isinstance(parser, EmptyParser):
+            self._add(out, i, None)
+        else:
+            self._compute_host(parser, i, out)
+
+    def _wrap(self, wrapper: WrapperParser, j: int, key: Optional[int]):
+        """ Ключ разбора ребёнка (конец j, ключ key) после обёртки или _REJECTED """
+        if isinstance(wrapper, PriorityParser):
+            priority = wrapper.priority.priority
+            return priority if key is None or key >= priority else _REJECTED
+        if isinstance(wrapper, (GroupParser, TextParser)):
+            return None
+        if isinstance(wrapper, EndLineParser):
+            return key if j == self.n else _REJECTED
+        return key
+
+    def _sequence(self, parsers, i: int) -> Ends:
+        frontier: Ends = {i: None}
+
+        for parser in parsers:
+            frontier = self._step(parser, frontier)
+            if not frontier:
+                break
+
+        return frontier
+
+    def _compute_repeat(self, parser: RepeatParser, i: int, out: Ends):
+        frontier: Ends = {i: None}
+        level = 0
+
+        while frontier and level < parser._to:
+            if level >= parser._from:
+                for j, key in frontier.items():
+                    self._add(out, j, key)
+
+                if parser._to == float("+inf"):
+                    # Дальше число повторов не важно: достаём все концы сразу
+                    self._closure(parser.p, frontier, out)
+                    return
+
+            frontier = self._step(parser.p, frontier)
+            level += 1
+
+    def _step(self, parser: BaseParser, frontier: Ends) -> Ends:
+        """ Ещё один parser после каждого из концов frontier """
+        following: Ends = {}
+        for mid, left in frontier.items():
+            for j, right in list(self.ends(parser, mid).items()):
+                key = _merge(left, right)
+                if j not in following or _better(key, following[j]):
+                    following[j] = key
+        return following
+
+    def _closure(self, parser: BaseParser, frontier: Ends, out: Ends):
+        """ Сколько угодно повторов parser после концов frontier """
+        seen = dict(frontier)
+        todo = list(frontier)
+
+        while todo:
+            mid = todo.pop()
+            for j, right in list(self.ends(parser, mid).items()):
+                key = _merge(seen[mid], right)
+                if j not in seen or _better(key, seen[j]):
+                    seen[j] = key
+                    todo.append(j)
+                    self._add(out, j, key)
+
+    def _compute_host(self, parser: BaseParser, i: int, out: Ends):
+        """ Обычный разбор: дерево нужно только для ключа """
+        try:
+            for variant in parser.parse(self.line[i:]):
+                self._add(out, self.n - len(variant.line), tree_priority(variant.parser))
+        except ParseError:
+            pass
+
+
+def recognizer(line: Line) -> Recognizer:
+    """ Таблица корня строки line, общая на время разбора (лежит в мемо разбора) """
+    memo = parse_memo()
+    root = line.root
+    if root.line not in memo.recognizers:
+        memo.recognizers[root.line] = Recognizer(root)
+
+    table = memo.recognizers[root.line]
+    table.refresh()
+    return table
+
+
+def _line(line: Union[str, Line]) -> Line:
+    return Line(line) if isinstance(line, str) else line
+
+
+def match_ends(parser: BaseParser, line: Union[str, Line]) -> List[int]:
+    """ Длины всех начал строки, которые parser разбирает (по возрастанию) """
+    return sorted(Recognizer(_line(line)).ends(parser))
+
+
+def match_length(parser: BaseParser, line: Union[str, Line]) -> Optional[int]:
+    """ Длина самого длинного разобранного начала строки, None -- не разбирается """
+    ends = match_ends(parser, line)
+    return ends[-1] if ends else None
+
+
+def match(parser: BaseParser, line: Union[str, Line]) -> bool:
+    """ Разбирает ли parser строку целиком """
+    line = _line(line)
+    return len(line) in Recognizer(line).ends(parser)
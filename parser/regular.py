@@ -0,0 +1,260 @@
+"""
+Регулярные куски грамматики.
+
+Часть графа без рекурсии и выборов (кроме наборов символов) --
+последовательность символов, наборов и их повторов, возможно,
+в обёртках KeyArgument / FuncParser / GroupParser / TextParser --
+описывается регулярным выражением. Такие куски (число, пробелы, имя переменной,
+комментарий) parser.vm и parser.codegen разбирают одним вызовом
+RegularMatcher.match вместо инструкции на каждый символ.
+
+Разбор возвращает все варианты (все длины повторов), поэтому один
+жадный re.match не годится: выражение целиком только быстро отсекает
+строки без совпадения, а каждая серия повтора читается своим re.match,
+и дальше перебираются её длины. Кусок берётся, только если у каждого
+конца одно дерево: за повтором не может идти символ из его же набора
+(иначе `a[:] & a[:]` дал бы несколько деревьев на один конец).
+
+Деревья -- те же, что у обычного разбора: KeyArgument с теми же
+именами, поэтому FuncParser получает те же аргументы. TextParser
+дерева ребёнка не строит вовсе, а берёт срез строки.
+"""
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from parser.base import BaseParser
+from parser.func.func_parser import FuncParser
+from parser.func.key_argument import KeyArgument
+from parser.func.text_parser import Text, TextParser
+from parser.graph import char_set, walk
+from parser.logic.and_parser import AndParser
+from parser.logic.char_parser import CharParser
+from parser.logic.empty_parser import EmptyParser
+from parser.logic.repeat_parser import RepeatParser
+from parser.priority_parser import GroupParser
+
+# Обёртки, которые ничего не отбрасывают и не смотрят на строку
+_WRAPPERS = (FuncParser, KeyArgument, GroupParser)
+
+# Узлы формы дерева
+_CHAR, _RUN, _EMPTY, _AND, _WRAP, _TEXT = range(6)
+
+
+class _Atom:
+    """ Символ из набора chars, от low до high раз """
+
+    def __init__(self, chars: frozenset, low: int, high: float):
+        self.chars = chars
+        self.low = low
+        self.high = high
+
+        self.chars_class = f"[{''.join(map(re.escape, sorted(chars)))}]"
+        count = "*" if high == float("+inf") else f"{{0,{high}}}"
+        self.run = re.compile(self.chars_class + count).match
+
+    @property
+    def fixed(self) -> bool:
+        return self.low == self.high
+
+    def regex(self) -> str:
+        if self.fixed:
+            return f"{self.chars_class}{{{self.low}}}"
+        high = "" if self.high == float("+inf") else self.high
+        return f"{self.chars_class}{{{self.low},{high}}}"
+
+
+class RegularMatcher:
+    def __init__(self, parser: BaseParser, shape: Tuple, atoms: List[_Atom]):
+        self.parser = parser
+        self.shape = shape
+        self.atoms = atoms
+
+        self.pattern = _regex(shape, iter(atoms), set())
+        self.regex = re.compile(self.pattern)
+
+    def match(self, text: str, pos: int, offset: int = 0) -> List[Tuple[int, BaseParser]]:
+        """
+        [(конец, дерево)] -- в том же порядке, что у parser.parse
+        :param offset: Line.offset строки text (для мест Text)
+        """
+        if self.regex.match(text, pos) is None:
+            return []
+
+        # (позиция, длины серий)
+        paths: List[Tuple[int, Tuple]] = [(pos, ())]
+        for atom in self.atoms:
+            following = []
+            for start, runs in paths:
+                length = atom.run(text, start).end() - start
+                for count in range(atom.low, length + 1):
+                    following.append((start + count, runs + (count, )))
+            if not following:
+                return []
+            paths = following
+
+        return [(end, _tree(self.shape, text, iter(runs), pos, offset)[0]) for end, runs in paths]
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.pattern}>"
+
+
+def _regex(shape: Tuple, atoms, names: Set[str]) -> str:
+    """ Выражение куска; KeyArgument -- именованные группы (если имя подходит и не повторяется) """
+    kind = shape[0]
+
+    if kind == _CHAR or kind == _RUN:
+        return next(atoms).regex()
+    if kind == _EMPTY:
+        return ""
+    if kind == _AND:
+        return "".join(_regex(child, atoms, names) for child in shape[1])
+    if kind == _TEXT:
+        return f"(?:{_regex(shape[2], atoms, names)})"
+
+    wrapper, body = shape[1], _regex(shape[2], atoms, names)
+    if isinstance(wrapper, KeyArgument) and wrapper.key.isidentifier() and wrapper.key not in names:
+        names.add(wrapper.key)
+        return f"(?P<{wrapper.key}>{body})"
+    return f"(?:{body})"
+
+
+def _tree(shape: Tuple, text: str, runs, pos: int, offset: int) -> Tuple[BaseParser, int]:
+    """ (дерево, конец); runs -- длины серий по порядку """
+    kind = shape[0]
+
+    if kind == _CHAR:
+        next(runs)
+        return CharParser(text[pos]), pos + 1
+    if kind == _RUN:
+        # Как RepeatParser._repeat
+        end = pos + next(runs)
+        tree = EmptyParser()
+        for ch in text[pos:end]:
+            tree = tree & CharParser(ch)
+        return tree, end
+    if kind == _EMPTY:
+        return EmptyParser(), pos
+    if kind == _AND:
+        # Как AndParser.parse
+        children = shape[1]
+        tree, pos = _tree(children[0], text, runs, pos, offset)
+        for child in children[1:]:
+            child_tree, pos = _tree(child, text, runs, pos, offset)
+            tree = AndParser(tree, child_tree)
+        return tree, pos
+    if kind == _TEXT:
+        end = pos
+        for _ in range(shape[3]):
+            end += next(runs)
+        return Text(text[pos:end], offset + pos), end
+
+    tree, pos = _tree(shape[2], text, runs, pos, offset)
+    return shape[1]._wrap(tree), pos
+
+
+def _chars(parser: BaseParser) -> Optional[frozenset]:
+    if type(parser) is CharParser:
+        return frozenset(parser.ch)
+    return char_set(parser)
+
+
+class RegularAnalysis:
+    """ Какие узлы графа регулярны (результаты запоминаются по id узла) """
+
+    def __init__(self):
+        self._shapes: Dict[int, Optional[Tuple[Tuple, List[_Atom]]]] = {}
+        self._matchers: Dict[int, Optional[RegularMatcher]] = {}
+
+    def compile(self, parser: BaseParser) -> Optional[RegularMatcher]:
+        """ RegularMatcher, если узел регулярен """
+        if id(parser) not in self._matchers:
+            found = self._shape(parser, set())
+            matcher = None
+            if found is not None and _unambiguous(found[1]):
+                matcher = RegularMatcher(parser, *found)
+            self._matchers[id(parser)] = matcher
+
+        return self._matchers[id(parser)]
+
+    def matcher(self, parser: BaseParser) -> Optional[RegularMatcher]:
+        """ То же, но только если в куске есть повтор или TextParser (иначе разбирать его так же быстро) """
+        matcher = self.compile(parser)
+        if matcher is not None and (any(not atom.fixed for atom in matcher.atoms) or _captures(matcher.shape)):
+            return matcher
+        return None
+
+    def _shape(self, parser: BaseParser, visiting: Set[int]) -> Optional[Tuple[Tuple, List[_Atom]]]:
+        key = id(parser)
+        if key in self._shapes:
+            return self._shapes[key]
+        if key in visiting:
+            # Цикл -- не регулярно
+            return None
+        visiting.add(key)
+
+        kind = type(parser)
+        result = None
+        chars = _chars(parser)
+
+        if chars is not None:
+            result = (_CHAR, ), [_Atom(chars, 1, 1)]
+        elif kind is EmptyParser:
+            result = (_EMPTY, ), []
+        elif kind is RepeatParser:
+            chars = _chars(parser.p)
+            if chars is not None:
+                result = (_RUN, ), [_Atom(chars, parser._from, parser._to - 1)]
+        elif kind is AndParser and parser.parsers:
+            children = [self._shape(child, visiting) for child in parser.parsers]
+            if all(child is not None for child in children):
+                result = (_AND, tuple(shape for shape, _ in children)), [
+                    atom for _, atoms in children for atom in atoms
+                ]
+        elif kind is TextParser:
+            child = self._shape(parser.parser, visiting)
+            if child is not None:
+                result = (_TEXT, parser, child[0], len(child[1])), child[1]
+        elif kind in _WRAPPERS:
+            child = self._shape(parser.parser, visiting)
+            if child is not None:
+                result = (_WRAP, parser, child[0]), child[1]
+
+        visiting.discard(key)
+        self._shapes[key] = result
+        return result
+
+
+def _captures(shape: Tuple) -> bool:
+    kind = shape[0]
+    if kind == _TEXT:
+        return True
+    if kind == _AND:
+        return any(map(_captures, shape[1]))
+    if kind == _WRAP:
+        return _captures(shape[2])
+    return False
+
+
+def _unambiguous(atoms: List[_Atom]) -> bool:
+    """ Серия не должна уметь отдать свой символ следующим (до первого обязательного) """
+    for i, atom in enumerate(atoms):
+        if atom.fixed:
+            continue
+        for following in atoms[i + 1:]:
+            if atom.chars & following.chars:
+                return False
+            if following.low > 0:
+                break
+    return True
+
+
+def regular_subgraphs(root: BaseParser, analysis: Optional[RegularAnalysis] = None) -> List[RegularMatcher]:
+    """ Наибольшие регулярные куски грамматики root """
+    analysis = RegularAnalysis() if analysis is None else analysis
+    matchers = [matcher for matcher in map(analysis.matcher, walk(root)) if matcher is not None]
+
+    inner: Set[int] = set()
+    for matcher in matchers:
+        inner.update(id(parser) for parser in walk(matcher.parser) if parser is not matcher.parser)
+
+    return [matcher for matcher in matchers if id(matcher.parser) not in inner]
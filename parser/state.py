@@ -0,0 +1,133 @@
+"""
+Состояние текущего разбора.
+
+Пока состояние открыто (with), MetaParser показывает ему каждый вызов
+parse и каждый найденный вариант, движок леса -- каждый шаг таблицы.
+Состояния вкладываются: внутреннее передаёт всё внешнему
+(например, бюджет внутри асинхронного исполнителя).
+
+Изменяемые данные самого разбора (мемо OrParser, защита от рекурсии)
+тоже лежат не в грамматике, а в ParseMemo текущего контекста: у каждого
+потока (и у каждого разбора Executor) своё, поэтому одну грамматику
+можно разбирать из многих потоков сразу. После `|=` устаревают только
+записи парсеров, которые зависят от изменённого (parser.dependencies).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+parse_state: ContextVar[Optional['ParseState']] = ContextVar('parse_state', default=None)
+
+
+class ParseState:
+    def __init__(self):
+        self.parent: Optional[ParseState] = None
+        self._token = None
+
+    def __enter__(self):
+        self.parent = parse_state.get()
+        self._token = parse_state.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        parse_state.reset(self._token)
+        self._token = None
+        self.parent = None
+
+    def step(self, parser=None):
+        """ Очередной вызов parse (или шаг таблицы) """
+        if self.parent is not None:
+            self.parent.step(parser)
+
+    def node_variants(self, count: int, parser=None):
+        """ Вызов parse отдал count-й вариант """
+        if self.parent is not None:
+            self.parent.node_variants(count, parser)
+
+    def track(self, parser, variants: Iterable) -> Iterable:
+        """ Обёртка над parse (см. MetaParser) """
+        self.step(parser)
+        return self._track(parser, variants)
+
+    def _track(self, parser, variants: Iterable) -> Iterable:
+        count = 0
+        for variant in variants:
+            count += 1
+            self.node_variants(count, parser)
+            yield variant
+
+
+class ParseMemo:
+    """
+    Мемо одного разбора.
+    generation -- OrParser.generation при создании (число всех `|=`): parse_memo(generation)
+    заводит новое мемо, если оно другое. Записи сверяют поколения своих узлов сами
+    """
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        # (id(OrParser), строка) -> (OrParser, варианты, поколение OrParser);
+        # парсер держим, чтобы id не переиспользовался
+        self.results: Dict[Tuple[int, str], Tuple[Any, List, int]] = {}
+        self.deep: Set[Tuple[int, str]] = set()
+        self.continuing: Set[int] = set()
+        # Сколько раз рекурсивный вызов OrParser отдал не все варианты (по deep / continuing)
+        # и сколько всего вариантов OrParser нашли
+        self.partial = 0
+        self.grown = 0
+        # Общие начала альтернатив (parser.logic.factored_parser):
+        # ключ -> (кого держим, варианты, grown, если разбор видел не все варианты, поколения начала)
+        self.prefixes: Dict[Tuple[int, Any], Tuple[Any, List, Optional[int], Tuple[int, ...]]] = {}
+        # Таблицы распознавания для предпросмотра (parser.recognize): строка -> Recognizer
+        self.recognizers: Dict[str, Any] = {}
+
+    def variants(self, parser, line: str, generation: int = 0) -> List:
+        """ Варианты parser на строке; после `|=` под parser (другое поколение) -- заново """
+        key = (id(parser), line)
+        found = self.results.get(key)
+        if found is None or found[2] != generation:
+            found = self.results[key] = (parser, [], generation)
+        return found[1]
+
+
+_parse_memo: ContextVar[Optional[ParseMemo]] = ContextVar('parse_memo', default=None)
+
+# Разбор строки до конца (EndLineParser): таблица распознавания этой строки, см. parser.recognize
+parse_goal: ContextVar[Optional[Any]] = ContextVar('parse_goal', default=None)
+# Собирать ли в ошибки разбора отброшенные варианты (NotFoundEndLineError.wrong_variants)
+parse_diagnostics: ContextVar[bool] = ContextVar('parse_diagnostics', default=False)
+
+
+def parse_memo(generation: Optional[int] = None) -> ParseMemo:
+    """
+    Мемо текущего контекста; если его нет -- новое.
+    С generation -- новое и тогда, когда мемо заведено при другом OrParser.generation
+    """
+    memo = _parse_memo.get()
+    if memo is None or (generation is not None and memo.generation != generation):
+        if generation is None:
+            from parser.logic.or_parser import OrParser
+            generation = OrParser.generation
+        memo = ParseMemo(generation)
+        _parse_memo.set(memo)
+    return memo
+
+
+@contextmanager
+def with_diagnostics():
+    """ Ошибки разбора внутри сохраняют отброшенные варианты (дороже: перебираются все) """
+    token = parse_diagnostics.set(True)
+    try:
+        yield
+    finally:
+        parse_diagnostics.reset(token)
+
+
+@contextmanager
+def new_parse_memo():
+    """ Отдельное мемо на время разбора (например, одной строки Executor) """
+    token = _parse_memo.set(None)
+    try:
+        yield
+    finally:
+        _parse_memo.reset(token)
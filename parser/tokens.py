@@ -0,0 +1,180 @@
+"""
+Лексер: необязательный слой перед посимвольными парсерами.
+
+Токены -- регулярные куски грамматики (parser.regular): пробелы, число,
+имя, комментарий. Lexer.from_grammar находит их в самой грамматике,
+Lexer({...}) берёт явный словарь имя -> парсер.
+
+TokenStream -- токены одной строки: массив по позициям, в ячейке -- все
+варианты токена, который там начинается ([(конец, дерево)]). Строка
+токенизируется один раз: ячейка заполняется при первом чтении, и
+перебор с возвратами перечитывает готовые токены, а не символы.
+Ячейки заполняются лениво, а не проходом по всей строке: токен вроде
+"любые символы до конца строки" на каждой позиции стоил бы O(n^2).
+
+В ячейке -- все варианты (все длины повторов), а не только самый
+длинный, как у обычного лексера, поэтому результат разбора не меняется.
+
+Токены читают TokenParser (в обычном разборе, когда открыт use_tokens)
+и инструкции REGULAR движков vm / compiled, созданных с tokenize=True.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from line import Line
+from parser.base import BaseParser, BaseParserError, ParseError
+from parser.func.key_argument import KeyArgument
+from parser.parse_variant import ParseVariant
+from parser.parser_wrapper import WrapperParser
+from parser.regular import RegularAnalysis, RegularMatcher, regular_subgraphs
+
+token_stream: ContextVar[Optional['TokenStream']] = ContextVar('token_stream', default=None)
+
+
+class LexerError(BaseParserError):
+    pass
+
+
+class Lexer:
+    def __init__(self, definitions: Dict[str, BaseParser], analysis: Optional[RegularAnalysis] = None):
+        """
+        :param definitions: имя токена -> регулярный парсер (см. parser.regular)
+        :param analysis: чей разбор регулярных кусков переиспользовать (движки компилируют с ним же)
+        """
+        self.analysis = RegularAnalysis() if analysis is None else analysis
+        self.definitions: Dict[str, RegularMatcher] = {}
+
+        for name, parser in definitions.items():
+            matcher = self.analysis.compile(parser)
+            if matcher is None:
+                raise LexerError(f"Token {name} is not regular: {parser!r}", parser)
+            self.definitions[name] = matcher
+
+    @classmethod
+    def from_grammar(cls, root: BaseParser) -> 'Lexer':
+        """ Токены -- наибольшие регулярные куски грамматики """
+        analysis = RegularAnalysis()
+        definitions = {}
+
+        for index, matcher in enumerate(regular_subgraphs(root, analysis)):
+            name = _token_name(matcher.parser) or f"token{index}"
+            if name in definitions:
+                name = f"{name}{index}"
+            definitions[name] = matcher.parser
+
+        return cls(definitions, analysis)
+
+    def token(self, name: str) -> 'TokenParser':
+        return TokenParser(self, name)
+
+    def tokenize(self, line: Line) -> 'TokenStream':
+        return TokenStream(line, self)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {', '.join(self.definitions)}>"
+
+
+class TokenStream:
+    def __init__(self, line: Line, lexer: Optional[Lexer] = None):
+        self.line = line
+        self.text = line.line
+        self.lexer = lexer
+
+        # id(matcher) -> (matcher, ячейки по позициям); matcher держим, чтобы id не переиспользовался
+        self._cells: Dict[int, Tuple[RegularMatcher, List[Optional[List[Tuple[int, Any]]]]]] = {}
+        # Сколько ячеек заполнено (сколько раз строка действительно читалась)
+        self.scans = 0
+
+    def read(self, matcher: RegularMatcher, pos: int) -> List[Tuple[int, Any]]:
+        """ Варианты токена matcher на позиции pos (от начала self.line) """
+        if id(matcher) not in self._cells:
+            self._cells[id(matcher)] = (matcher, [None] * (len(self.text) + 1))
+        cells = self._cells[id(matcher)][1]
+
+        found = cells[pos]
+        if found is None:
+            found = cells[pos] = matcher.match(self.text, pos, self.line.offset)
+            self.scans += 1
+        return found
+
+    def token(self, name: str, pos: int) -> List[Tuple[int, Any]]:
+        return self.read(self.lexer.definitions[name], pos)
+
+    def covers(self, line: Line) -> bool:
+        """ line -- подстрока (хвост) строки потока """
+        return line.root is self.line.root and line.offset + len(line) == self.line.offset + len(self.text)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self.text)} chars, {self.scans} scans>"
+
+
+def _token_name(parser: BaseParser) -> Optional[str]:
+    """ Имя первого KeyArgument сверху, сквозь обёртки """
+    while isinstance(parser, WrapperParser):
+        if isinstance(parser, KeyArgument):
+            return parser.key
+        parser = parser.parser
+    return None
+
+
+@contextmanager
+def use_tokens(stream: TokenStream):
+    """ TokenParser внутри читает токены из stream """
+    token = token_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        token_stream.reset(token)
+
+
+class TokenParser(BaseParser):
+    """ Токен лексера по имени; дерево -- как у парсера, который токен задаёт """
+
+    def __init__(self, lexer: Lexer, name: str):
+        if name not in lexer.definitions:
+            raise LexerError(f"Unknown token {name}, use one of: {', '.join(lexer.definitions)}")
+
+        self.lexer = lexer
+        self.name = name
+
+    @property
+    def matcher(self) -> RegularMatcher:
+        return self.lexer.definitions[self.name]
+
+    def parse(self, line: Line) -> Iterable[ParseVariant]:
+        stream = token_stream.get()
+
+        if stream is not None and stream.covers(line):
+            pos = line.offset - stream.line.offset
+            found = [(end - pos, tree) for end, tree in stream.read(self.matcher, pos)]
+        else:
+            found = self.matcher.match(line.line, 0, line.offset)
+
+        if not found:
+            raise ParseError(f"No token {self.name}")
+
+        for end, tree in found:
+            yield ParseVariant(tree, line[end:])
+
+    def __eq__(self, other: BaseParser):
+        _result = super().__eq__(other)
+        if _result is not None:
+            return _result
+
+        if not isinstance(other, self.__class__):
+            return False
+
+        return self.lexer is other.lexer and self.name == other.name
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.name}>"
+
+    def __str__(self):
+        return f"<{self.name}>"
+
+    def __hash__(self):
+        return hash(self.__class__) * hash(self.name)
+
+    def __iter__(self):
+        yield self
@@ -0,0 +1,597 @@
+"""
+Разбор виртуальной машиной.
+
+Граф парсеров компилируется в плоские программы из инструкций
+(CHAR, SET, CHOICE, JUMP, CALL, ...), а разбирает их один цикл
+с явным стеком возвратов -- без цепочки генераторов на каждый символ.
+
+Программа делится на правила: корень, каждый OrParser (кроме набора
+символов -- он становится одной инструкцией SET) и парсеры на циклах
+графа. Вызов правила на позиции запоминается, левая рекурсия
+наращивается до неподвижной точки, как в OrParser._parse_fixpoint.
+
+Деревья результата не строятся по ходу разбора: ветка копит список
+событий (символ, начало And, обёртка, ...), и дерево собирается из него,
+только когда правило дошло до конца. Деревья те же, что у обычного
+разбора (те же KeyArgument и FuncParser), поэтому calculate не меняется.
+Порядок вариантов у неоднозначной строки может отличаться.
+
+Вызовы правил идут по явному стеку кадров (ProgramMachine), а не рекурсией
+Python, так что строки с очень глубокой вложенностью тоже разбираются.
+
+Регулярные куски (число, пробелы, имя) -- одна инструкция REGULAR,
+см. parser.regular. TextParser -- пара SPAN / TEXT: события ребёнка
+отбрасываются, в ветку идёт срез строки. С tokenize=True регулярные
+куски -- токены лексера (parser.tokens) и читаются из TokenStream строки.
+
+Парсеры, которые меняются на ходу или управляют перебором сами
+(DictParser, OrderedParser, CutParser, пользовательские), разбираются
+обычным способом (инструкция HOST).
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from line import Line
+from parser.base import BaseParser, ParseError
+from parser.common.end_line_parser import EndLineParser
+from parser.engine import CompilingEngine
+from parser.func.text_parser import Text, TextParser
+from parser.graph import char_set, cycle_heads, plain_wrapper
+from parser.logic.and_parser import AndParser
+from parser.logic.char_parser import CharParser
+from parser.logic.empty_parser import EmptyParser
+from parser.logic.or_parser import OrParser
+from parser.logic.repeat_parser import RepeatParser
+from parser.parse_variant import ParseVariant
+from parser.parser_wrapper import WrapperParser
+from parser.regular import RegularAnalysis, RegularMatcher
+from parser.state import parse_state
+from parser.tokens import Lexer, TokenParser, TokenStream
+
+# Инструкции
+CHAR, SET, CHOICE, JUMP, FAIL, CALL, HOST, EOL, EVENT, REP_START, REP_TEST, REP_NEXT, REP_END, END, REGULAR, SPAN, TEXT = range(17)
+
+# События для сборки дерева
+EV_CHAR, EV_TREE, EV_EMPTY, EV_MARK, EV_AND, EV_REPEAT, EV_WRAP = range(7)
+
+_NAMES = ('CHAR', 'SET', 'CHOICE', 'JUMP', 'FAIL', 'CALL', 'HOST', 'EOL', 'EVENT',
+          'REP_START', 'REP_TEST', 'REP_NEXT', 'REP_END', 'END', 'REGULAR', 'SPAN', 'TEXT')
+
+_MARK = object()
+# Обёртка отбросила вариант (PriorityParser)
+_INVALID = object()
+
+
+class Rule:
+    def __init__(self, index: int, parser: BaseParser):
+        self.index = index
+        self.parser = parser
+        self.code: List[Tuple[int, Any]] = []
+
+    def dump(self) -> str:
+        return "\n".join(
+            f"{pc:4} {_NAMES[op]} {arg if not isinstance(arg, Rule) else f'rule {arg.index}'}"
+            for pc, (op, arg) in enumerate(self.code)
+        )
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.index}: {len(self.code)} instructions>"
+
+
+class Program:
+    def __init__(self, rules: List[Rule], lexer: Optional[Lexer] = None):
+        self.rules = rules
+        self.root = rules[0]
+        # Лексер, чьи токены -- аргументы REGULAR (tokenize=True)
+        self.lexer = lexer
+
+    def dump(self) -> str:
+        return "\n\n".join(f"rule {rule.index} ({rule.parser!r}):\n{rule.dump()}" for rule in self.rules)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self.rules)} rules>"
+
+
+class _Compiler:
+    def __init__(self, root: BaseParser, lexer: Optional[Lexer] = None):
+        self.lexer = lexer
+        self.cyclic = cycle_heads(root)
+        self.regular = RegularAnalysis() if lexer is None else lexer.analysis
+        self.rules: Dict[int, Rule] = {}
+        self.order: List[Rule] = []
+        self.pending: List[Rule] = []
+
+        self.rule(root)
+
+    def compile(self) -> Program:
+        while self.pending:
+            rule = self.pending.pop()
+            self._emit_body(rule)
+        return Program(self.order, self.lexer)
+
+    def rule(self, parser: BaseParser) -> Rule:
+        if id(parser) not in self.rules:
+            rule = Rule(len(self.order), parser)
+            self.rules[id(parser)] = rule
+            self.order.append(rule)
+            self.pending.append(rule)
+        return self.rules[id(parser)]
+
+    def _is_rule(self, parser: BaseParser) -> bool:
+        if id(parser) in self.rules or id(parser) in self.cyclic:
+            return True
+        return type(parser) is OrParser and char_set(parser) is None
+
+    def _emit_body(self, rule: Rule):
+        parser, code = rule.parser, rule.code
+
+        if type(parser) is OrParser and char_set(parser) is None:
+            # Тело правила -- сам выбор, а не вызов самого себя
+            self._emit_choice(code, parser.parsers)
+        else:
+            self._emit_node(code, parser)
+
+        code.append((END, None))
+
+    def emit(self, code: List, parser: BaseParser):
+        if self._is_rule(parser):
+            code.append((CALL, self.rule(parser)))
+        else:
+            self._emit_node(code, parser)
+
+    def _emit_node(self, code: List, parser: BaseParser):
+        kind = type(parser)
+        matcher = self.regular.matcher(parser)
+
+        if matcher is not None:
+            code.append((REGULAR, matcher))
+        elif kind is CharParser:
+            code.append((CHAR, parser.ch))
+        elif kind is EmptyParser:
+            code.append((EVENT, (EV_EMPTY, None)))
+        elif kind is OrParser:
+            chars = char_set(parser)
+            if chars is not None:
+                code.append((SET, chars))
+            else:
+                self._emit_choice(code, parser.parsers)
+        elif kind is AndParser:
+            self._emit_and(code, parser)
+        elif kind is RepeatParser:
+            self._emit_repeat(code, parser)
+        elif kind is TextParser:
+            self._emit_text(code, parser)
+        elif kind is TokenParser:
+            code.append((REGULAR, parser.matcher))
+        elif kind is EndLineParser:
+            self.emit(code, parser.parser)
+            code.append((EOL, None))
+            code.append((EVENT, (EV_WRAP, parser)))
+        elif plain_wrapper(parser):
+            self.emit(code, parser.parser)
+            code.append((EVENT, (EV_WRAP, parser)))
+        else:
+            code.append((HOST, parser))
+
+    def _emit_choice(self, code: List, parsers):
+        if not parsers:
+            code.append((FAIL, None))
+            return
+
+        jumps = []
+        for parser in parsers[:-1]:
+            choice = len(code)
+            code.append((CHOICE, None))
+            self.emit(code, parser)
+            jumps.append(len(code))
+            code.append((JUMP, None))
+            code[choice] = (CHOICE, len(code))
+
+        self.emit(code, parsers[-1])
+        for jump in jumps:
+            code[jump] = (JUMP, len(code))
+
+    def _emit_and(self, code: List, parser: AndParser):
+        if not parser.parsers:
+            code.append((FAIL, None))
+            return
+
+        code.append((EVENT, (EV_MARK, None)))
+        for child in parser.parsers:
+            self.emit(code, child)
+        code.append((EVENT, (EV_AND, None)))
+
+    def _emit_repeat(self, code: List, parser: RepeatParser):
+        code.append((REP_START, None))
+        head = len(code)
+        code.append((REP_TEST, None))
+        self.emit(code, parser.p)
+        code.append((REP_NEXT, head))
+        code[head] = (REP_TEST, (parser._from, parser._to, len(code)))
+        code.append((REP_END, None))
+
+
+    def _emit_text(self, code: List, parser: TextParser):
+        start = len(code)
+        code.append((SPAN, None))
+        self.emit(code, parser.parser)
+
+        if any(op == EVENT and arg[0] == EV_WRAP and _filters(arg[1]) for op, arg in code[start:]):
+            # Такая обёртка отбрасывает варианты только при сборке дерева, а его здесь не собрать
+            del code[start:]
+            code.append((HOST, parser))
+        else:
+            code.append((TEXT, None))
+
+
+def _filters(wrapper: BaseParser) -> bool:
+    return type(wrapper)._wrap_variants is not WrapperParser._wrap_variants
+
+
+def compile_program(root: BaseParser, lexer: Optional[Lexer] = None) -> Program:
+    return _Compiler(root, lexer).compile()
+
+
+def _build(events) -> Any:
+    """ Дерево из событий ветки (список событий -- от последнего к первому) """
+    items = []
+    while events is not None:
+        items.append(events)
+        events = events[2]
+
+    stack = []
+    for kind, payload, _ in reversed(items):
+        if kind == EV_CHAR:
+            stack.append(CharParser(payload))
+        elif kind == EV_TREE:
+            stack.append(payload)
+        elif kind == EV_EMPTY:
+            stack.append(EmptyParser())
+        elif kind == EV_MARK:
+            stack.append(_MARK)
+        elif kind == EV_WRAP:
+            wrapped = next(iter(payload._wrap_variants([ParseVariant(stack.pop(), None)])), None)
+            if wrapped is None:
+                return _INVALID
+            stack.append(wrapped.parser)
+        else:
+            children = []
+            while stack[-1] is not _MARK:
+                children.append(stack.pop())
+            stack.pop()
+            children.reverse()
+
+            # Так же, как их собирают AndParser.parse и RepeatParser._repeat
+            if kind == EV_AND:
+                tree = children[0]
+                for child in children[1:]:
+                    tree = AndParser(tree, child)
+            else:
+                tree = EmptyParser()
+                for child in children:
+                    tree = tree & child
+            stack.append(tree)
+
+    return stack[-1]
+
+
+class Machine:
+    """
+    Один разбор одной строки: вызовы правил с мемо и левой рекурсией.
+    Тело правила выполняет _run (в подклассе); вызов правила из тела -- call
+    """
+
+    def __init__(self, program: Program, line: Line, tokens: Optional[TokenStream] = None):
+        self.program = program
+        self.line = line
+        self.text = line.line
+        self.offset = line.offset
+        self.tokens = tokens
+        self.state = parse_state.get()
+
+        # (правило, позиция) -> [(конец, дерево)]
+        self.memo: Dict[Tuple[int, int], List[Tuple[int, Any]]] = {}
+        self.host_memo: Dict[Tuple[int, int], List[Tuple[int, Any]]] = {}
+        # Левая рекурсия: вызовы в работе (и их место в стеке), их частичные результаты
+        self.calls: List[Tuple[int, int]] = []
+        self.call_depth: Dict[Tuple[int, int], int] = {}
+        self.partial: Dict[Tuple[int, int], List[Tuple[int, Any]]] = {}
+        self.recursed: Set[Tuple[int, int]] = set()
+        # Вызовы, которые видели чужие частичные результаты: их нельзя запоминать
+        self.involved: Set[Tuple[int, int]] = set()
+
+    def run(self) -> List[ParseVariant]:
+        line = self.line
+        return [ParseVariant(tree, line[end:]) for end, tree in self.call(self.program.root, 0)]
+
+    def call(self, rule: Rule, pos: int) -> List[Tuple[int, Any]]:
+        found = self._lookup(rule, pos)
+        if found is not None:
+            return found
+
+        results = self._open(rule, pos)
+        while True:
+            count = len(results)
+            self._run(rule, pos, results)
+            if not self._again(rule, pos, count):
+                break
+
+        return self._close(rule, pos)
+
+    def _lookup(self, rule: Rule, pos: int) -> Optional[List[Tuple[int, Any]]]:
+        """ Готовые результаты вызова или None, если правило надо разбирать """
+        key = (rule.index, pos)
+
+        if key in self.memo:
+            return self.memo[key]
+
+        if key in self.partial:
+            # Левая рекурсия: отдаём то, что уже найдено, и доращиваем снаружи
+            self.recursed.add(key)
+            self.involved.update(self.calls[self.call_depth[key] + 1:])
+            return list(self.partial[key])
+
+        return None
+
+    def _open(self, rule: Rule, pos: int) -> List[Tuple[int, Any]]:
+        key = (rule.index, pos)
+
+        if self.state is not None:
+            self.state.step(rule.parser)
+
+        results: List[Tuple[int, Any]] = []
+        self.partial[key] = results
+        self.call_depth[key] = len(self.calls)
+        self.calls.append(key)
+        return results
+
+    def _again(self, rule: Rule, pos: int, count: int) -> bool:
+        """ Ещё проход: правило читало само себя, и результатов стало больше """
+        key = (rule.index, pos)
+        return key in self.recursed and len(self.partial[key]) != count
+
+    def _close(self, rule: Rule, pos: int) -> List[Tuple[int, Any]]:
+        key = (rule.index, pos)
+
+        self.calls.pop()
+        del self.call_depth[key]
+        results = self.partial.pop(key)
+        self.recursed.discard(key)
+
+        if key in self.involved:
+            self.involved.discard(key)
+        else:
+            self.memo[key] = results
+
+        return results
+
+    def _add(self, rule: Rule, results: List[Tuple[int, Any]], end: int, tree: Any):
+        if not any(other_end == end and other == tree for other_end, other in results):
+            results.append((end, tree))
+            if self.state is not None:
+                self.state.node_variants(len(results), rule.parser)
+
+    def host(self, parser: BaseParser, pos: int) -> List[Tuple[int, Any]]:
+        key = (id(parser), pos)
+
+        if key not in self.host_memo:
+            size = len(self.text)
+            results = []
+            try:
+                for variant in parser.parse(self.line[pos:]):
+                    results.append((size - len(variant.line), variant.parser))
+            except ParseError:
+                pass
+            self.host_memo[key] = results
+
+        return self.host_memo[key]
+
+    def regular(self, matcher: RegularMatcher, pos: int) -> List[Tuple[int, Any]]:
+        if self.tokens is None:
+            return matcher.match(self.text, pos, self.offset)
+        return self.tokens.read(matcher, pos)
+
+    def _run(self, rule: Rule, pos: int, results: List[Tuple[int, Any]]):
+        """ Перебирает все ветки тела правила, новые результаты дописывает в results """
+        raise NotImplementedError()
+
+
+class _Frame:
+    """ Вызов правила в стеке машины: регистры ветки и точки возврата """
+
+    def __init__(self, rule: Rule, pos: int, results: List[Tuple[int, Any]]):
+        self.rule = rule
+        self.start = pos
+        self.results = results
+        self.restart()
+
+    def restart(self):
+        self.count = len(self.results)
+        self.pc = 0
+        self.pos = self.start
+        self.events = None
+        self.counters = None
+        self.backtrack = []
+
+
+class ProgramMachine(Machine):
+    """
+    Выполняет программу parser.vm. Вызовы правил -- не рекурсия Python,
+    а явный стек кадров, поэтому глубина вложенности строки
+    ограничена только памятью
+    """
+
+    def call(self, rule: Rule, pos: int) -> List[Tuple[int, Any]]:
+        found = self._lookup(rule, pos)
+        if found is not None:
+            return found
+
+        frames = [_Frame(rule, pos, self._open(rule, pos))]
+        found = None
+
+        while True:
+            frame = frames[-1]
+            request = self._step(frame, found)
+            found = None
+
+            if request is not None:
+                # Кадр ждёт результатов другого правила
+                callee, callee_pos = request
+                found = self._lookup(callee, callee_pos)
+                if found is None:
+                    frames.append(_Frame(callee, callee_pos, self._open(callee, callee_pos)))
+                continue
+
+            if self._again(frame.rule, frame.start, frame.count):
+                frame.restart()
+                continue
+
+            results = self._close(frame.rule, frame.start)
+            frames.pop()
+            if not frames:
+                return results
+            found = results
+
+    def _step(self, frame: _Frame, found: Optional[List[Tuple[int, Any]]]) -> Optional[Tuple[Rule, int]]:
+        """
+        Крутит ветки кадра, пока они не кончатся (None)
+        или не понадобится вызвать правило (правило, позиция).
+        found -- результаты вызова, на котором кадр остановился
+        """
+        code = frame.rule.code
+        text = self.text
+        size = len(text)
+
+        backtrack = frame.backtrack
+        pc, pos, events, counters = frame.pc, frame.pos, frame.events, frame.counters
+
+        if found is not None:
+            # Продолжаем с инструкции CALL
+            if found:
+                pc += 1
+                for end, tree in reversed(found[1:]):
+                    backtrack.append((pc, end, (EV_TREE, tree, events), counters))
+                pos, tree = found[0]
+                events = (EV_TREE, tree, events)
+            elif backtrack:
+                pc, pos, events, counters = backtrack.pop()
+            else:
+                return None
+
+        while True:
+            op, arg = code[pc]
+
+            if op == CHAR:
+                if pos < size and text[pos] == arg:
+                    events = (EV_CHAR, arg, events)
+                    pos += 1
+                    pc += 1
+                    continue
+            elif op == SET:
+                if pos < size and text[pos] in arg:
+                    events = (EV_CHAR, text[pos], events)
+                    pos += 1
+                    pc += 1
+                    continue
+            elif op == EVENT:
+                events = (arg[0], arg[1], events)
+                pc += 1
+                continue
+            elif op == CHOICE:
+                backtrack.append((arg, pos, events, counters))
+                pc += 1
+                continue
+            elif op == JUMP:
+                pc = arg
+                continue
+            elif op == CALL or op == HOST or op == REGULAR:
+                if op == CALL:
+                    found = self._lookup(arg, pos)
+                elif op == HOST:
+                    found = self.host(arg, pos)
+                else:
+                    found = self.regular(arg, pos)
+                if found is None:
+                    frame.pc, frame.pos, frame.events, frame.counters = pc, pos, events, counters
+                    return arg, pos
+                if found:
+                    pc += 1
+                    for end, tree in reversed(found[1:]):
+                        backtrack.append((pc, end, (EV_TREE, tree, events), counters))
+                    pos, tree = found[0]
+                    events = (EV_TREE, tree, events)
+                    continue
+            elif op == EOL:
+                if pos == size:
+                    pc += 1
+                    continue
+            elif op == SPAN:
+                # Начало подстроки и события до неё -- на стеке счётчиков, как у повторов
+                counters = ((pos, events), counters)
+                pc += 1
+                continue
+            elif op == TEXT:
+                (start, events), counters = counters
+                events = (EV_TREE, Text(text[start:pos], self.offset + start), events)
+                pc += 1
+                continue
+            elif op == REP_START:
+                counters = ((0, pos), counters)
+                events = (EV_MARK, None, events)
+                pc += 1
+                continue
+            elif op == REP_TEST:
+                low, high, exit_pc = arg
+                count = counters[0][0]
+                can_stop = low <= count < high
+                can_more = count + 1 < high
+
+                # Как RepeatParser: сначала меньше повторений
+                if can_stop:
+                    if can_more:
+                        backtrack.append((pc + 1, pos, events, counters))
+                    pc = exit_pc
+                    continue
+                if can_more:
+                    pc += 1
+                    continue
+            elif op == REP_NEXT:
+                (count, start), outer = counters
+                # Повтор, который ничего не съел, дальше не крутим
+                if pos != start:
+                    counters = ((count + 1, pos), outer)
+                    pc = arg
+                    continue
+            elif op == REP_END:
+                counters = counters[1]
+                events = (EV_REPEAT, None, events)
+                pc += 1
+                continue
+            elif op == END:
+                tree = _build(events)
+                if tree is not _INVALID:
+                    self._add(frame.rule, frame.results, pos, tree)
+
+            # Ветка кончилась (неудачей или результатом) -- возврат
+            if not backtrack:
+                return None
+            pc, pos, events, counters = backtrack.pop()
+
+
+class VMEngine(CompilingEngine):
+    """ Разбор скомпилированной программой (см. начало модуля) """
+
+    def program(self, parser: BaseParser) -> Program:
+        return self.compiled(parser)
+
+    def _compile(self, parser: BaseParser) -> Program:
+        return compile_program(parser, self.lexer(parser))
+
+    def parse(self, parser: BaseParser, line: Line) -> List[ParseVariant]:
+        program = self.program(parser)
+        tokens = None if program.lexer is None else program.lexer.tokenize(line)
+        variants = ProgramMachine(program, line, tokens).run()
+
+        if not variants:
+            raise ParseError("Not found anything", line=line, parser=parser)
+
+        return variants
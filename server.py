@@ -0,0 +1,97 @@
+"""
+Локальный сервер: один прогретый процесс, много сессий.
+
+Каждое подключение (Unix socket или TCP на localhost) -- своя сессия
+(session.py). Протокол построчный: строка на вход, строка с результатом
+на выход (`! ...` -- ошибка). `exit` закрывает сессию.
+
+Сессии исполняются одновременно: у каждой строки своё состояние разбора.
+Пока строки разбираются, цикл событий продолжает принимать подключения
+и читать сокеты (AsyncExecutor отдаёт ему управление каждые every шагов).
+"""
+import asyncio
+from typing import Optional
+
+import main  # noqa: F401 -- std-грамматика и `@@`
+from line import Line
+from session import Session
+from source import BaseSource
+
+ERROR_PREFIX = "! "
+
+
+class SessionServer:
+    def __init__(self, **session_kwargs):
+        """
+        :param session_kwargs: параметры каждой сессии (engine, budget, policy, every)
+        """
+        self.session_kwargs = session_kwargs
+        self.sessions = set()
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        return await asyncio.start_unix_server(self._handle, path=path)
+
+    async def start_tcp(self, host: str = '127.0.0.1', port: int = 0) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle, host=host, port=port)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername') or writer.get_extra_info('sockname')
+        session = Session(f"<session {peer}>", **self.session_kwargs)
+        source = BaseSource(session.name)
+        self.sessions.add(session)
+
+        try:
+            number = 0
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+
+                number += 1
+                line = Line(raw.decode().rstrip("\r\n"), number, source)
+
+                try:
+                    result = await session.aexecute(line)
+                except SystemExit:
+                    break
+                except Exception as e:
+                    answer = _error(e)
+                else:
+                    error = session.executor.error
+                    answer = str(result) if error is None else _error(error)
+
+                writer.write((answer.replace("\n", " ") + "\n").encode())
+                await writer.drain()
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+
+def _error(e: Exception) -> str:
+    return f"{ERROR_PREFIX}{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+
+
+async def serve(unix: Optional[str] = None, host: str = '127.0.0.1', port: int = 0, **session_kwargs):
+    server = SessionServer(**session_kwargs)
+
+    if unix is not None:
+        listener = await server.start_unix(unix)
+    else:
+        listener = await server.start_tcp(host, port)
+
+    print("Abstractly server on", ", ".join(map(str, (s.getsockname() for s in listener.sockets))))
+
+    async with listener:
+        await listener.serve_forever()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    args_parser = argparse.ArgumentParser(description="Abstractly multi-session server")
+    args_parser.add_argument('--unix', help="path to Unix socket")
+    args_parser.add_argument('--host', default='127.0.0.1')
+    args_parser.add_argument('--port', type=int, default=7077)
+    args = args_parser.parse_args()
+
+    asyncio.run(serve(args.unix, args.host, args.port))
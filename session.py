@@ -0,0 +1,65 @@
+"""
+Сессии.
+
+Один процесс обслуживает много пользователей: у каждой сессии своя
+область переменных (ContextDict поверх общей) и свои расширения
+грамматики (`@number |= ...`), а std-грамматика общая и не меняется. Внутри сессии `|=` не трогает
+OrParser, а дописывает альтернативы в расширения сессии
+(parser.logic.or_parser.grammar_extensions).
+
+Мемо разбора у каждой строки своё (parser.state), а планы левой рекурсии
+кэшируются отдельно для каждых расширений (parser.lrec), поэтому сессии
+можно исполнять одновременно.
+"""
+from typing import Any, Optional
+
+from async_executor import AsyncExecutor
+from context_dict import current_context, global_context
+from line import Line
+from parser.base import BaseParser
+from parser.logic.or_parser import grammar_extensions
+from std_parsers.variable import variables
+
+
+class Session:
+    def __init__(self, name: str = "<session>", parser: Optional[BaseParser] = None, **executor_kwargs):
+        """
+        :param parser: корень грамматики, по умолчанию -- `@@` сессии
+        :param executor_kwargs: параметры AsyncExecutor (engine, budget, policy, every)
+        """
+        self.name = name
+        # Своя область поверх общих std-переменных
+        self.variables = global_context.fork()
+        self.extensions = {}
+        self.executor = AsyncExecutor(
+            (lambda: variables['@@']) if parser is None else parser,
+            variables=self.variables,
+            **executor_kwargs
+        )
+        self._tokens = None
+
+    def __enter__(self):
+        self._tokens = (
+            current_context.set(self.variables),
+            grammar_extensions.set(self.extensions),
+        )
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        variables_token, extensions_token = self._tokens
+        self._tokens = None
+        grammar_extensions.reset(extensions_token)
+        current_context.reset(variables_token)
+
+    def execute(self, line: Line) -> Any:
+        with self:
+            return self.executor.execute(line)
+
+    async def aexecute(self, line: Line) -> Any:
+        with self:
+            # Поток исполнителя получает копию контекста -- вместе с сессией
+            return await self.executor.aexecute(line)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.name}>"
+
@@ -0,0 +1,233 @@
+"""
+Снимки состояния интерпретатора.
+
+Снимок сохраняет то, что пользователь добавил за сессию: переменные
+(в том числе свои парсеры и функции) и альтернативы, дописанные через `|=`
+в std-грамматику. Сама std-грамматика в снимок не копируется: она
+строится при запуске за миллисекунды, а её лямбды pickle не умеет.
+На её узлы снимок ссылается по месту в обходе графа (StdGrammar).
+
+Файл -- два pickle подряд: заголовок (версия формата и хэш исходников
+грамматики) и данные. Если исходники поменялись, места узлов в обходе
+уже другие, и такой снимок не загружается (SnapshotError).
+
+pickle из чужого файла выполняет произвольный код, поэтому снимки
+включаются явно (ABSTRACTLY_SNAPSHOT=1), лежат в каталоге пользователя
+(cache_dir) и читаются, только если файл его и другим не доступен на запись.
+"""
+import hashlib
+import io
+import os
+import pickle
+from typing import Any, Dict, Optional, Tuple
+
+from context_dict import ContextDict, current_context, global_context
+from parser.base import BaseParser
+from parser.graph import walk
+from parser.logic.or_parser import OrParser
+from std_parsers.variable import variables
+
+SNAPSHOT_VERSION = 1
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+# Откуда строится std-грамматика
+_GRAMMAR_SOURCES = ('parser', 'std_parsers', 'main.py')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshots_enabled() -> bool:
+    return os.environ.get('ABSTRACTLY_SNAPSHOT', '') not in ('', '0')
+
+
+def cache_dir(*parts: str) -> str:
+    """ Каталог снимков пользователя: ABSTRACTLY_CACHE_DIR, иначе ~/.cache/abstractly """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    path = os.path.join(os.environ.get('ABSTRACTLY_CACHE_DIR') or os.path.join(base, 'abstractly'), *parts)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def _check_owner(path: str):
+    if not hasattr(os, 'getuid'):
+        return
+
+    stat = os.stat(path)
+    if stat.st_uid != os.getuid() or stat.st_mode & 0o022:
+        raise SnapshotError(f"Snapshot {path} is not owned by the user or is writable by others")
+
+
+def grammar_hash() -> str:
+    digest = hashlib.sha256()
+
+    for source in _GRAMMAR_SOURCES:
+        path = os.path.join(_ROOT, source)
+        if os.path.isfile(path):
+            paths = [path]
+        else:
+            paths = sorted(
+                os.path.join(directory, name)
+                for directory, _, names in os.walk(path)
+                for name in names if name.endswith('.py')
+            )
+
+        for file_path in paths:
+            digest.update(os.path.relpath(file_path, _ROOT).encode())
+            with open(file_path, 'rb') as f:
+                digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+class StdGrammar:
+    """
+    Std-грамматика и переменные сразу после запуска (создаётся в main.py).
+    Ключ узла -- (имя переменной, номер в обходе от неё), он одинаков
+    в любом процессе с теми же исходниками.
+    """
+
+    def __init__(self, context: ContextDict = global_context):
+        self.variables: Dict[str, Any] = dict(context.items())
+        self.objects: Dict[Tuple, Any] = {('variables', ): variables, ('global_context', ): global_context}
+        # Сколько альтернатив было у каждого std OrParser
+        self.alternatives: Dict[Tuple, int] = {}
+
+        seen = set(map(id, self.objects.values()))
+        for name, value in self.variables.items():
+            nodes = walk(value) if isinstance(value, BaseParser) else (value, )
+
+            for index, obj in enumerate(nodes):
+                if id(obj) in seen or isinstance(obj, (type(None), bool, int, float, str)):
+                    continue
+                seen.add(id(obj))
+
+                self.objects[(name, index)] = obj
+                if isinstance(obj, OrParser):
+                    self.alternatives[(name, index)] = len(obj.parsers)
+
+        self.ids: Dict[int, Tuple] = {id(obj): key for key, obj in self.objects.items()}
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, std: StdGrammar):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.std = std
+
+    def persistent_id(self, obj):
+        return self.std.ids.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, std: StdGrammar):
+        super().__init__(file)
+        self.std = std
+
+    def persistent_load(self, key):
+        if key not in self.std.objects:
+            raise SnapshotError(f"Unknown std object {key}")
+        return self.std.objects[key]
+
+
+def _dumps(obj: Any, std: StdGrammar) -> bytes:
+    f = io.BytesIO()
+    _Pickler(f, std).dump(obj)
+    return f.getvalue()
+
+
+def grammar_additions(std: StdGrammar, since: Optional[Dict[Tuple, int]] = None) -> Dict[Tuple, Tuple]:
+    """
+    Альтернативы, дописанные к std OrParser (в сессии -- её расширения, см. session.py)
+    :param since: число альтернатив, от которого считать (по умолчанию -- как при запуске)
+    """
+    since = std.alternatives if since is None else since
+
+    additions = {}
+    for key, count in since.items():
+        added = tuple(std.objects[key].parsers[count:])
+        if added:
+            additions[key] = added
+    return additions
+
+
+def alternatives_count(std: StdGrammar) -> Dict[Tuple, int]:
+    return {key: len(std.objects[key].parsers) for key in std.alternatives}
+
+
+def write_snapshot(path: str, std: StdGrammar, user_variables: Dict[str, Any],
+                   grammar: Dict[Tuple, Tuple]) -> int:
+    """ Записывает снимок; возвращает, сколько переменных пропущено (их нельзя сохранить) """
+    saved = {}
+    for name, value in user_variables.items():
+        try:
+            _dumps(value, std)
+        except Exception:
+            continue
+        saved[name] = value
+
+    header = {'version': SNAPSHOT_VERSION, 'hash': grammar_hash()}
+    body = _dumps({'variables': saved, 'grammar': grammar}, std)
+
+    with open(path, 'wb') as f:
+        pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+        f.write(body)
+
+    return len(user_variables) - len(saved)
+
+
+def read_snapshot(path: str, std: StdGrammar) -> Tuple[Dict[str, Any], Dict[Tuple, Tuple]]:
+    """ (переменные, альтернативы); SnapshotError -- снимок другой версии, устарел или чужой """
+    _check_owner(path)
+
+    with open(path, 'rb') as f:
+        header = pickle.load(f)
+
+        version = header.get('version') if isinstance(header, dict) else None
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version: {version}")
+        if header.get('hash') != grammar_hash():
+            raise SnapshotError("Snapshot is stale: grammar sources changed")
+
+        data = _Unpickler(f, std).load()
+
+    return data['variables'], data['grammar']
+
+
+def apply_snapshot(std: StdGrammar, user_variables: Dict[str, Any], grammar: Dict[Tuple, Tuple],
+                   context: Optional[ContextDict] = None):
+    """ Переменные -- в context (по умолчанию текущая область), альтернативы -- через `|=` """
+    context = current_context.get() if context is None else context
+    context.update(user_variables)
+
+    for key, added in grammar.items():
+        or_parser = std.objects[key]
+        for parser in added:
+            or_parser |= parser
+
+
+def save_snapshot(path: str, std: StdGrammar, context: Optional[ContextDict] = None) -> Dict[str, int]:
+    """
+    :param context: чьи переменные сохранять, по умолчанию -- текущая область
+    :return: сколько переменных и альтернатив сохранено (и пропущено: их нельзя сохранить)
+    """
+    context = current_context.get() if context is None else context
+
+    user_variables = {
+        name: value for name, value in context.items()
+        if name not in std.variables or std.variables[name] is not value
+    }
+    grammar = grammar_additions(std)
+
+    skipped = write_snapshot(path, std, user_variables, grammar)
+
+    return {
+        'variables': len(user_variables) - skipped,
+        'alternatives': sum(map(len, grammar.values())),
+        'skipped': skipped,
+    }
+
+
+def load_snapshot(path: str, std: StdGrammar, context: Optional[ContextDict] = None):
+    user_variables, grammar = read_snapshot(path, std)
+    apply_snapshot(std, user_variables, grammar, context)
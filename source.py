@@ -1,4 +1,4 @@
-from typing import Iterable
+from typing import Iterable, AsyncIterable
 
 from line import Line
 
@@ -22,3 +22,34 @@ class StrSource(BaseSource):
     def __call__(self):
         for i, line in enumerate(self.data.split("\n")):
             yield Line(line, i, self)
+
+
+class AsyncBaseSource(BaseSource):
+    """ Источник для asyncio: __call__ отдаёт асинхронный итератор строк """
+
+    def __call__(self) -> AsyncIterable["Line"]:
+        raise NotImplementedError()
+
+
+class AsyncSource(AsyncBaseSource):
+    """
+    Асинхронная обёртка над обычным источником:
+    блокирующее чтение (например, input() в LiveSource) уходит в поток
+    """
+
+    def __init__(self, source: BaseSource):
+        super().__init__(source.name)
+        self.source = source
+
+    async def __call__(self):
+        # asyncio нужен только здесь: source импортируют REPL и пакетный режим, им он ни к чему
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        lines = iter(self.source())
+
+        while True:
+            line = await loop.run_in_executor(None, next, lines, None)
+            if line is None:
+                return
+            yield line
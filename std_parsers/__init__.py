@@ -1,8 +1,34 @@
+"""
+Std-грамматики строятся лениво: при первом обращении к атрибуту пакета
+(`from std_parsers import number_expressions`) или к переменной
+(`@number`, `@parser`), а не при импорте пакета.
+"""
+import importlib
 
-import std_parsers.common
-from .numbers import number_expressions
-from .system import system_expressions
-from .comment import comment_parser
-from .parser import parser_parser, use_priority_parser
+from context_dict import Lazy, global_context, use_global_context
 
-parser_parser |= use_priority_parser(number_expressions, parser_parser)
+# Имя -> модуль, который его строит
+_grammars = {
+    'number_expressions': 'std_parsers.numbers',
+    'system_expressions': 'std_parsers.system',
+    'comment_parser': 'std_parsers.comment',
+    'parser_parser': 'std_parsers.parser',
+    'use_priority_parser': 'std_parsers.parser.priority_parser',
+}
+
+
+def __getattr__(name: str):
+    if name not in _grammars:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Модули регистрируют свои переменные и альтернативы -- в глобальной области и общей грамматике,
+    # а не в текущей сессии
+    with use_global_context():
+        value = getattr(importlib.import_module(_grammars[name]), name)
+    globals()[name] = value
+    return value
+
+
+# Переменные грамматик: сами модули при построении запишут туда парсеры
+global_context.setdefault('@number', Lazy(lambda: __getattr__('number_expressions')))
+global_context.setdefault('@parser', Lazy(lambda: __getattr__('parser_parser')))
@@ -1,12 +1,12 @@
-from parser import FuncParser, CharParser, KeyArgument
+from parser import FuncParser, CharParser, KeyArgument, GroupParser
 from std_parsers.common import spaces
 
 
 def use_braces(base_expr):
-    return FuncParser(
+    return GroupParser(FuncParser(
         CharParser('(') & spaces
         & KeyArgument(
             'e', base_expr
         ) & spaces & CharParser(')'),
         lambda *args, e: e
-    )
\ No newline at end of file
+    ))
@@ -1,6 +1,4 @@
-from typing import Union, List
-
-from parser import OrParser, CharParser, FuncParser, KeyArgument
+from parser import OrParser, CharParser, TextParser
 
 digit = OrParser(*(CharParser(str(x)) for x in range(10)))
 
@@ -31,19 +29,9 @@ all_symbol = OrParser(*(CharParser(x) for x in _all_symbols))
 def raw_text(chars: str):
     assert isinstance(chars, str)
 
-    def _to_str(self, _key: Union[CharParser, List[CharParser]]):
-        if isinstance(_key, list):
-            _key = "".join(p.ch for p in _key)
-        else:
-            _key = _key.ch
-        return _key
-
     correct_char = OrParser(*(CharParser(x) for x in chars))
 
-    return FuncParser(
-        KeyArgument('_key', correct_char[1:]),
-        _to_str
-    )
+    return TextParser(correct_char[1:])
 
 
 var_name = raw_text(correct_var_symbol)
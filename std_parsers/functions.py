@@ -1,6 +1,6 @@
 import math
 
-from parser import FuncParser, KeyArgument, CharParser, PriorityParser, DictParser, EmptyParser, OrParser
+from parser import FuncParser, KeyArgument, CharParser, PriorityParser, DictParser, EmptyParser, OrParser, GroupParser
 from parser.base import BaseParser
 from std_parsers.common import spaces
 from std_parsers.variable import variables
@@ -26,13 +26,13 @@ def use_functions(base_expr: BaseParser, priority=None):
     _arg_p |= KeyArgument('arg', base_expr)
     _arg_p |= KeyArgument('arg_left', _arg_p) & spaces & CharParser(',') & spaces & KeyArgument('arg_right', _arg_p)
 
-    parser = FuncParser(
+    parser = GroupParser(FuncParser(
         KeyArgument('f', DictParser(variables)) & spaces
         & CharParser('(') & spaces
         & _arg_p & spaces
         & CharParser(')'),
         _f
-    )
+    ))
 
     if priority:
         parser = PriorityParser(parser, priority)
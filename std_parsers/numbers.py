@@ -1,8 +1,7 @@
 import math
 import operator
-from typing import Union
 
-from parser import CharParser, EmptyParser, AndParser, FuncParser, KeyArgument, OrParser, BasePriority, PriorityParser
+from parser import CharParser, FuncParser, KeyArgument, OrParser, BasePriority, PriorityParser, TextParser
 from .braces import use_braces
 from .common import digit, spaces
 from .op_generators import generate_operation_2
@@ -18,12 +17,10 @@ number_expressions = OrParser()
 
 
 def parsed_to_number(*args,
-                     sign: Union[CharParser, EmptyParser],
-                     digits: AndParser
+                     sign: str,
+                     digits: str
                      ):
-    num_str = "".join(p.ch for p in digits)
-
-    num = int(num_str)
+    num = int(digits)
 
     if sign:
         num = -num
@@ -34,11 +31,11 @@ def parsed_to_number(*args,
 number = FuncParser(
     KeyArgument(
         'sign',
-        CharParser('-')[:2]
+        TextParser(CharParser('-')[:2])
     )
     & KeyArgument(
         'digits',
-        digit[1:]
+        TextParser(digit[1:])
     ),
     parsed_to_number
 )
@@ -19,6 +19,19 @@ from .and_parser import and_parser
 
 parser_parser |= and_parser
 
+from .ordered_parser import ordered_parser
+
+parser_parser |= ordered_parser
+
+from .cut_parser import cut_parser
+
+parser_parser |= cut_parser
+
+from .lookahead_parser import lookahead_parser, not_lookahead_parser
+
+parser_parser |= lookahead_parser
+parser_parser |= not_lookahead_parser
+
 from .key_argument import use_key_argument
 
 parser_parser |= use_key_argument(parser_parser)
@@ -45,5 +58,8 @@ parser_parser |= add_variable_op(parser_parser, "|=", operator.ior)
 # priority
 
 from .priority_parser import use_priority_parser
+from ..numbers import number_expressions
+
+parser_parser |= use_priority_parser(number_expressions, parser_parser)
 
 __all__ = ("parser_parser", )
@@ -0,0 +1,10 @@
+import operator
+
+from parser import FuncParser, CharParser, KeyArgument, PriorityParser
+from .base import parser_parser, ParserPriority
+from ..common import spaces
+
+cut_parser = PriorityParser(FuncParser(
+    CharParser('~') & spaces & KeyArgument('parser', parser_parser),
+    lambda *result, parser: operator.invert(parser)
+), ParserPriority(30))
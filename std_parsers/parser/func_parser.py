@@ -2,7 +2,25 @@ from line import Line
 from parser import FuncParser, KeyArgument, CharParser
 from parser.base import BaseParser
 from std_parsers.common import spaces, any_str
-from std_parsers.variable import variables
+
+
+class GeneratedFunction:
+    """
+    Функция, заданная текстом (`парсер => текст`).
+    Класс, а не замыкание: такую функцию можно сохранить в снимок (snapshot.py)
+    """
+
+    def __init__(self, function_text: str):
+        self.function_text = function_text
+
+    def __call__(self, *_result, _executor=None, _variables=None, **kwargs):
+        print("Call generated function:", _result, kwargs)
+
+        # Аргументы видны только телу функции
+        return _executor.execute(Line(self.function_text), _variables.fork(**kwargs))
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.function_text}>"
 
 
 def use_func_parser(parser_expr: BaseParser):
@@ -26,17 +44,9 @@ def use_func_parser(parser_expr: BaseParser):
     def _f(*result, parser: BaseParser, function_text: str):
         print("FuncParser generator", result, parser, function_text)
 
-        def _generated_function(*_result, _executor=None, **kwargs):
-            print("Call generated function:", _result, kwargs)
-            print("Append variables")
-
-            variables.update(kwargs)
-
-            return _executor.execute(Line(function_text))
-
         return FuncParser(
             parser,
-            _generated_function
+            GeneratedFunction(function_text)
         )
 
     return FuncParser(
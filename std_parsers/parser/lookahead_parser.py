@@ -0,0 +1,13 @@
+from parser import FuncParser, CharParser, KeyArgument, LookaheadParser, PriorityParser
+from .base import parser_parser, ParserPriority
+from ..common import spaces
+
+lookahead_parser = PriorityParser(FuncParser(
+    CharParser('&') & spaces & KeyArgument('parser', parser_parser),
+    lambda *result, parser: LookaheadParser(parser)
+), ParserPriority(30))
+
+not_lookahead_parser = PriorityParser(FuncParser(
+    CharParser('!') & spaces & KeyArgument('parser', parser_parser),
+    lambda *result, parser: LookaheadParser(parser, negative=True)
+), ParserPriority(30))
@@ -0,0 +1,13 @@
+import operator
+
+from .base import parser_parser
+from ..op_generators import generate_operation_2
+from .base import ParserPriority
+
+ordered_parser = generate_operation_2(
+    parser_parser,
+    {
+        "|>": operator.truediv
+    },
+    ParserPriority(5)
+)
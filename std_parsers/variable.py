@@ -1,14 +1,60 @@
 import math
+from collections.abc import MutableMapping
 from typing import Any, Callable
 
+from context_dict import ContextDict, current_context, global_context
 from parser import DictParser, CharParser, FuncParser, KeyArgument
 from parser.base import BaseParser
 from std_parsers.common import spaces, var_name
 
-variables = {
+
+class Variables(MutableMapping):
+    """
+    Переменные языка: всегда текущая область (context_dict.current_context),
+    поэтому все DictParser(variables) видят переменные текущей сессии
+    и аргументы текущего вызова функции.
+    """
+
+    base = global_context
+
+    @property
+    def current(self) -> ContextDict:
+        return current_context.get()
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def fork(self, **bindings) -> ContextDict:
+        return self.current.fork(**bindings)
+
+    def __getitem__(self, key):
+        return self.current[key]
+
+    def __setitem__(self, key, value):
+        self.current[key] = value
+
+    def __delitem__(self, key):
+        del self.current[key]
+
+    def __contains__(self, key):
+        return key in self.current
+
+    def __iter__(self):
+        return iter(self.current)
+
+    def __len__(self):
+        return len(self.current)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.current!r}>"
+
+
+variables = Variables()
+variables.update({
     'hello': 'world!',
     'pi': math.pi,
-}
+})
 
 
 def use_variables(key: str, base_parser: BaseParser) -> BaseParser:
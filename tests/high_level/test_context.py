@@ -36,3 +36,13 @@ def test_func_zero_args(a):
 def test_func_two_args(a):
     assert a('@power(2, 3)') == 2 ** 3
     assert a('@power(2! + 1, 3! + 2)') == (2 + 1) ** (3 * 2 + 2)
+
+
+def test_func_args_not_leak(a):
+    from std_parsers.variable import variables
+
+    a("__leak_f = `$` & __leak_arg:@number => __leak_arg + 1")
+    a("@ |= __leak_f")
+
+    assert a("$4") == 5
+    assert '__leak_arg' not in variables
@@ -0,0 +1,25 @@
+import pytest
+
+from executor import Executor
+from main import live_parser
+from source import StrSource
+from tests.high_level._exec_ret import exec_ret
+
+
+def _forest_executor(raw_line: str):
+    executor = Executor(live_parser, engine='forest')
+
+    result = None
+    for line in StrSource("<test>", raw_line)():
+        result = executor.execute(line)
+    return result
+
+
+@pytest.mark.parametrize("expr", (
+    "1 + 2",
+    "2 * 3 + 4",
+    "1 + 2 * 3 - 1 + 3 * 4",
+    "2 ** (3 * (5 / 4 - 1) / 2)",
+))
+def test_forest_engine(a, expr):
+    assert _forest_executor(expr) == a(expr) == exec_ret(expr)
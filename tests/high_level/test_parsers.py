@@ -1,6 +1,9 @@
 import math
 
-from parser import CharParser, KeyArgument, FuncParser, AndParser, PriorityParser
+from line import Line
+from main import live_parser
+
+from parser import CharParser, KeyArgument, FuncParser, AndParser, PriorityParser, CutParser, LookaheadParser
 from std_parsers import number_expressions
 from std_parsers.common import spaces
 from std_parsers.numbers import NumberPriority
@@ -91,3 +94,31 @@ def test_priority_parser_generate(a):
     assert isinstance(p.priority, NumberPriority)
     assert p.priority.priority == 100
     assert p.parser == CharParser('x')
+
+
+def test_ordered_parser(a):
+    p = a("`x` |> `x` & `y`")
+    assert p == CharParser('x') / (CharParser('x') & CharParser('y'))
+
+
+def test_cut_parser(a):
+    p = a("~(`x` | `y`) & `z`")
+    assert p == CutParser(CharParser('x') | CharParser('y')) & CharParser('z')
+
+
+def test_lookahead_parser(a):
+    p = a("&`x` & `x` | `y`")
+    assert p == LookaheadParser(CharParser('x')) & CharParser('x') | CharParser('y')
+
+    p = a("`a` & !(`b` | `c`)")
+    assert p == CharParser('a') & LookaheadParser(CharParser('b') | CharParser('c'), negative=True)
+    assert p.match_length("ad") == 1
+    assert p.match_length("ab") is None
+
+
+def test_div_not_ordered(a):
+    # `/` -- деление чисел, упорядоченный выбор его не перехватывает
+    a("__test_num = 4")
+
+    assert len(list(live_parser.parse(Line("__test_num / __test_num")))) == 1
+    assert a("__test_num / __test_num") == 1
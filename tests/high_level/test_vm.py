@@ -0,0 +1,45 @@
+import pytest
+
+from executor import Executor
+from main import live_parser
+from source import StrSource
+from tests.high_level._exec_ret import exec_ret
+
+
+def _vm_executor(raw_line: str, engine: str = 'vm'):
+    executor = Executor(live_parser, engine=engine)
+
+    result = None
+    for line in StrSource("<test>", raw_line)():
+        result = executor.execute(line)
+    return result
+
+
+@pytest.mark.parametrize("expr", (
+    "1 + 2",
+    "2 * 3 + 4",
+    "1 + 2 * 3 - 1 + 3 * 4",
+    "2 ** (3 * (5 / 4 - 1) / 2)",
+))
+def test_vm_engine(a, expr):
+    assert _vm_executor(expr) == a(expr) == exec_ret(expr)
+
+
+@pytest.mark.parametrize("expr", (
+    "1 + 2",
+    "2 * 3 + 4",
+    "2 ** (3 * (5 / 4 - 1) / 2)",
+))
+def test_compiled_engine(a, expr):
+    assert _vm_executor(expr, 'compiled') == a(expr) == exec_ret(expr)
+
+
+def test_vm_engine_functions(a):
+    _vm_executor("__vm_x = 4")
+    assert _vm_executor("@power(__vm_x, 2) + @factorial(3)") == a("@power(__vm_x, 2) + @factorial(3)") == 22
+
+
+def test_vm_engine_deep_braces():
+    # Глубже предела рекурсии Python
+    depth = 1200
+    assert _vm_executor("(" * depth + "2 + 3" + ")" * depth) == 5
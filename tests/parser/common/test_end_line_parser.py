@@ -4,8 +4,9 @@ import pytest
 
 from line import Line
 from parser.base import ParseError
-from parser import EndLineParser
+from parser import CharParser, EndLineParser, KeyArgument, NotFoundEndLineError, OrParser
 from parser.parse_variant import ParseVariant
+from parser.state import ParseState, new_parse_memo, with_diagnostics
 from tests.parser.common.test_simple import items_good
 
 
@@ -36,3 +37,62 @@ def test_end_line(alpha, add):
     else:
         with pytest.raises(ParseError):
             list(p.parse(line))
+
+
+def test_end_line_not_reached():
+    p = EndLineParser(CharParser('x')[1:])
+
+    with new_parse_memo(), pytest.raises(NotFoundEndLineError) as error:
+        list(p.parse(Line('xxy')))
+
+    # Отброшенные варианты -- только по запросу
+    assert 'wrong_variants' not in error.value.contexts[0].kwargs
+
+    with new_parse_memo(), with_diagnostics(), pytest.raises(NotFoundEndLineError) as error:
+        list(p.parse(Line('xxy')))
+
+    assert len(error.value.contexts[0].kwargs['wrong_variants']) == 2
+
+
+class _Calls(ParseState):
+    def __init__(self, parser):
+        super().__init__()
+        self.parser = parser
+        self.calls = 0
+
+    def track(self, parser, variants):
+        if parser is self.parser:
+            self.calls += 1
+        return super().track(parser, variants)
+
+
+def test_end_line_prunes():
+    # x[:] разбирает 0..3 символа, но y и конец строки -- только после всех x
+    y = CharParser('y')
+    p = EndLineParser(CharParser('x')[:] & y)
+
+    with new_parse_memo(), _Calls(y) as state:
+        assert len(list(p.parse(Line('xxxy')))) == 1
+    assert state.calls == 1
+
+    with new_parse_memo(), with_diagnostics(), _Calls(y) as state:
+        assert len(list(p.parse(Line('xxxy')))) == 1
+    assert state.calls == 4
+
+
+@pytest.mark.parametrize('raw_line', ('x', 'x+x', 'x+x+x!', 'x+x!+x', 'x+', 'x+x!!!'))
+def test_end_line_same_variants(raw_line):
+    e = OrParser(CharParser('x'))
+    e |= KeyArgument('a', e) & CharParser('+') & KeyArgument('b', e) & CharParser('!')[:2]
+    p = EndLineParser(e)
+
+    def variants():
+        try:
+            with new_parse_memo():
+                return list(p.parse(Line(raw_line)))
+        except ParseError:
+            return None
+
+    expected = variants()
+    with with_diagnostics():
+        assert variants() == expected
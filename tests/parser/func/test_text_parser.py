@@ -0,0 +1,83 @@
+import pytest
+
+from line import Line
+from parser import (BasePriority, CharParser, EndLineParser, FuncParser, KeyArgument, OrParser, PriorityParser,
+                    Text, TextParser)
+from parser.engine import get_engine
+from parser.parse_variant import ParseVariant
+from parser.state import new_parse_memo
+
+digits = OrParser(*map(CharParser, '0123456789'))
+
+
+class _Priority(BasePriority):
+    pass
+
+
+def test_text():
+    p = TextParser(digits[1:])
+
+    assert list(p.parse(Line("12a"))) == [
+        ParseVariant(Text("1", 0), Line("2a")),
+        ParseVariant(Text("12", 0), Line("a")),
+    ]
+
+
+def test_text_offset():
+    p = CharParser('-') & KeyArgument('n', TextParser(digits[1:])) & CharParser('!')
+
+    variant, = p.parse(Line("-123!"))
+    text = variant.parser.key_args()['n']
+
+    assert text == Text("123", 1)
+    assert (text.start, text.end) == (1, 4)
+
+
+def test_text_one_variant_per_end():
+    # Две разбивки одной строки -- одна подстрока
+    p = TextParser(CharParser('a')[:] & CharParser('a')[:])
+
+    assert [variant.parser.text for variant in p.parse(Line("aa"))] == ["", "a", "aa"]
+
+
+def test_text_calculate():
+    p = FuncParser(KeyArgument('n', TextParser(digits[1:])), lambda *_, n: int(n) * 2)
+
+    assert p.parse(Line("21")).__next__().parser.calculate(None) == 4
+
+
+def test_text_lrec():
+    x = OrParser(CharParser('x'))
+    x |= TextParser(x & CharParser('y'))
+
+    with new_parse_memo():
+        assert [variant.parser for variant in x.parse(Line("xyy"))] == [CharParser('x'), Text("xy"), Text("xyy")]
+
+
+def _grammar():
+    e = OrParser(TextParser(digits[1:]))
+    e |= PriorityParser(
+        FuncParser(KeyArgument('a', e) & CharParser('+') & KeyArgument('b', e), lambda *_, a, b: a + b),
+        _Priority(1)
+    )
+    return EndLineParser(CharParser('=') & KeyArgument('all', TextParser(e)) & CharParser(';') & e)
+
+
+@pytest.mark.parametrize('engine', ('forest', 'vm', 'compiled'))
+@pytest.mark.parametrize('raw_line', ("=1+2;3", "=12+3+4;5+6", "=1;2+"))
+def test_text_engines(engine, raw_line):
+    p = _grammar()
+
+    try:
+        with new_parse_memo():
+            host = list(p.parse(Line(raw_line)))
+    except Exception:
+        host = []
+    try:
+        variants = list(get_engine(engine).parse(p, Line(raw_line)))
+    except Exception:
+        variants = []
+
+    assert len(variants) == len(host)
+    for variant in variants:
+        assert variant in host
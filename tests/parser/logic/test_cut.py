@@ -0,0 +1,33 @@
+import pytest
+
+from line import Line
+from parser import CharParser, CutParser, EndLineParser, ParseVariant
+from parser.base import ParseError
+
+
+def test_cut_first():
+    x = CharParser('x')
+    p = ~(x & x | x)
+
+    assert isinstance(p, CutParser)
+    assert list(p.parse(Line('xxy'))) == [ParseVariant(x & x, Line('y'))]
+
+
+def test_cut_no_backtrack():
+    x, y = CharParser('x'), CharParser('y')
+    p = ~(x & y | x) & y
+
+    assert list(p.parse(Line('xyy'))) == [ParseVariant(x & y & y, Line(''))]
+
+    with pytest.raises(ParseError):
+        list(p.parse(Line('xy')))
+
+
+def test_cut_repeat():
+    x, y = CharParser('x'), CharParser('y')
+
+    assert [variant.line for variant in EndLineParser(~x[1:]).parse(Line('xx'))] == [Line('')]
+
+    # Повтор съел все x -- на `x & y` не хватает
+    with pytest.raises(ParseError):
+        list((~x[1:] & x & y).parse(Line('xxy')))
@@ -0,0 +1,53 @@
+import pytest
+
+from line import Line
+from parser import CharParser, FactoredParser, FactoredParserError, FuncParser, KeyArgument, OrParser
+from parser.logic.factored_parser import SharedPrefix
+from parser.state import new_parse_memo, parse_memo
+
+digits = OrParser(*map(CharParser, '0123456789'))
+
+
+_a = KeyArgument('a', digits)
+alternatives = (
+    FuncParser(_a & CharParser('+') & KeyArgument('b', digits), lambda *_, a, b: a.ch + b.ch),
+    FuncParser(_a & CharParser('-'), lambda *_, a: a.ch),
+)
+
+
+def _factored():
+    shared = SharedPrefix((_a, ))
+    return OrParser(*(
+        FactoredParser(shared, (alternative, ), alternative.parser.parsers[1:])
+        for alternative in alternatives
+    ))
+
+
+@pytest.mark.parametrize('raw_line', ('1+2', '1-', '1*'))
+def test_factored_same_trees(raw_line):
+    with new_parse_memo():
+        try:
+            expected = list(OrParser(*alternatives).parse(Line(raw_line)))
+        except Exception:
+            expected = []
+    with new_parse_memo():
+        try:
+            variants = list(_factored().parse(Line(raw_line)))
+        except Exception:
+            variants = []
+
+    assert variants == expected
+
+
+def test_factored_prefix_once():
+    p = _factored()
+
+    with new_parse_memo():
+        list(p.parse(Line('1-')))
+        # Одно начало на обе ветки
+        assert len(parse_memo(OrParser.generation).prefixes) == 1
+
+
+def test_factored_not_found():
+    with new_parse_memo(), pytest.raises(FactoredParserError):
+        list(_factored().parsers[0].parse(Line('1-')))
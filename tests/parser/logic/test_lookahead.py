@@ -0,0 +1,80 @@
+import pytest
+
+from line import Line
+from parser import AndParser, CharParser, EndLineParser, FuncParser, KeyArgument, LookaheadParser, OrParser, ParseVariant
+from parser.base import ParseError
+from parser.codegen import CompiledEngine
+from parser.forest import ForestEngine
+from parser.state import new_parse_memo
+from parser.vm import VMEngine
+
+digits = OrParser(*map(CharParser, '0123456789'))
+
+
+def test_lookahead():
+    x, y = CharParser('x'), CharParser('y')
+    p = LookaheadParser(x & y) & x
+
+    with new_parse_memo():
+        # Дерево предпросмотра (EmptyParser) в AndParser пропадает
+        assert list(p.parse(Line('xy'))) == [ParseVariant(AndParser(x), Line('y'))]
+    with new_parse_memo(), pytest.raises(ParseError):
+        list(p.parse(Line('xx')))
+
+
+def test_not_lookahead():
+    x, y = CharParser('x'), CharParser('y')
+    p = x & LookaheadParser(y, negative=True)
+
+    with new_parse_memo():
+        assert list(p.parse(Line('xx'))) == [ParseVariant(AndParser(x), Line('x'))]
+    with new_parse_memo(), pytest.raises(ParseError):
+        list(p.parse(Line('xy')))
+
+
+def _numbers():
+    # Число -- все цифры подряд: после него не должно быть цифры
+    number = FuncParser(KeyArgument('n', digits[1:]) & LookaheadParser(digits, negative=True),
+                        lambda *_, n: int(''.join(d.ch for d in n)))
+    e = OrParser(number)
+    e |= FuncParser(KeyArgument('a', e) & CharParser('+') & KeyArgument('b', e), lambda *_, a, b: a + b)
+    return EndLineParser(e)
+
+
+def test_prunes_variants():
+    with new_parse_memo():
+        variants = list(_numbers().parse(Line('12+345')))
+
+    assert [variant.parser.calculate(None) for variant in variants] == [357]
+
+
+@pytest.mark.parametrize('engine', (VMEngine, CompiledEngine, ForestEngine))
+@pytest.mark.parametrize('raw_line', ('12', '1+23+4', '12+'))
+def test_engines(engine, raw_line):
+    p = _numbers()
+
+    try:
+        with new_parse_memo():
+            expected = [variant.parser.calculate(None) for variant in p.parse(Line(raw_line))]
+    except ParseError:
+        expected = []
+    try:
+        with new_parse_memo():
+            values = [variant.parser.calculate(None) for variant in engine().parse(p, Line(raw_line))]
+    except ParseError:
+        values = []
+
+    assert values == expected
+
+
+def test_recognizer():
+    p = _numbers()
+
+    assert p.match('1+23+4')
+    assert not p.match('1+')
+
+
+def test_str():
+    assert str(LookaheadParser(CharParser('x'))) == "&`x`"
+    assert str(LookaheadParser(CharParser('x'), negative=True)) == "!`x`"
+    assert LookaheadParser(CharParser('x')) != LookaheadParser(CharParser('x'), negative=True)
@@ -0,0 +1,102 @@
+import pytest
+
+from line import Line
+from parser import CharParser, EndLineParser, OrderedParser, OrderedParserError, ParseVariant, OrParser, CutParser
+
+
+def test_ordered_first():
+    x, y = CharParser('x'), CharParser('y')
+    p = x / (x & y)
+
+    assert isinstance(p, OrderedParser)
+    assert list(p.parse(Line('xy'))) == [ParseVariant(x, Line('y'))]
+
+
+def test_ordered_second():
+    x, y = CharParser('x'), CharParser('y')
+    p = y / (x & y)
+
+    assert list(p.parse(Line('xy'))) == [ParseVariant(x & y, Line(''))]
+
+
+def test_ordered_longest_variant():
+    x, y = CharParser('x'), CharParser('y')
+    p = (x | x & y) / y
+
+    assert list(p.parse(Line('xy'))) == [ParseVariant(x & y, Line(''))]
+
+
+def test_ordered_repeat():
+    # Повтор жадный: токен из нескольких символов разбирается целиком
+    x, y = CharParser('x'), CharParser('y')
+    p = EndLineParser(x[1:] / y)
+
+    assert [variant.line for variant in p.parse(Line('xx'))] == [Line('')]
+    assert [variant.line for variant in p.parse(Line('y'))] == [Line('')]
+
+
+def test_ordered_flatten():
+    x, y, z = CharParser('x'), CharParser('y'), CharParser('z')
+    p = x / y / z
+
+    assert p.parsers == (x, y, z)
+
+
+def test_ordered_not_found():
+    p = CharParser('x') / CharParser('y')
+
+    with pytest.raises(OrderedParserError):
+        list(p.parse(Line('z')))
+
+
+def test_ordered_lrec_direct():
+    x = OrParser()
+    p = (x & CharParser('y')) / CharParser('x')
+    x |= p
+
+    assert list(p.parse(Line('xy'))) == [ParseVariant(CharParser('x'), Line('y'))]
+
+
+def test_ordered_lrec_grow():
+    x, y, z = CharParser('x'), CharParser('y'), CharParser('z')
+    e = OrParser(x)
+    e |= (e & y) / z
+
+    assert list(e.parse(Line('xyy'))) == [
+        ParseVariant(x, Line('yy')),
+        ParseVariant(x & y, Line('y')),
+        ParseVariant(x & y & y, Line('')),
+    ]
+
+
+def test_ordered_memo():
+    calls = []
+
+    class _Counting(CharParser):
+        def parse(self, line):
+            calls.append(line.line)
+            yield from super().parse(line)
+
+    x = _Counting('x')
+    p = (x & CharParser('y')) / (x & CharParser('z'))
+
+    assert list(p.parse(Line('xz'))) == [ParseVariant(CharParser('x') & CharParser('z'), Line(''))]
+    assert len(calls) == 2
+
+    # Вложенный выбор на той же строке берётся из мемо
+    calls.clear()
+    inner = x / CharParser('q')
+    p = (inner & CharParser('y')) / (inner & CharParser('z'))
+    list(p.parse(Line('xz')))
+    assert len(calls) == 1
+
+
+def test_ordered_cut():
+    x, y, z = CharParser('x'), CharParser('y'), CharParser('z')
+
+    # Без отсечения вторая альтернатива находится
+    assert list(((x & y) / (x & z)).parse(Line('xz'))) == [ParseVariant(x & z, Line(''))]
+
+    # После отсечения (x уже разобран) вторая альтернатива не пробуется
+    with pytest.raises(OrderedParserError):
+        list(((CutParser(x) & y) / (x & z)).parse(Line('xz')))
@@ -0,0 +1,74 @@
+from typing import List
+
+from line import Line
+from parser import CharParser, OrParser, ParseVariant
+from parser.lrec import find_left_recursion, plan_left_recursion, left_recursion
+
+
+def test_no_lrec():
+    x = OrParser(CharParser('x'))
+    x |= CharParser('y') & x
+
+    assert find_left_recursion(x) == []
+    assert not left_recursion(x)
+
+
+def test_direct_lrec():
+    x = OrParser(CharParser('x'))
+    x |= x & CharParser('y')
+
+    found = find_left_recursion(x)
+    assert len(found) == 1 and found[0] is x
+
+    plan = left_recursion(x)
+    assert len(plan.tails) == 1
+    assert plan_left_recursion(x) == []
+
+
+def test_indirect_lrec():
+    x = OrParser(CharParser('x'))
+    b = (x & CharParser('y')) | CharParser('z')
+    x |= b
+
+    found = find_left_recursion(x)
+    assert any(p is x for p in found)
+    assert plan_left_recursion(x) == []
+
+
+def test_hidden_lrec():
+    x = OrParser(CharParser('x'))
+    x |= CharParser('z')[0:1] & x & CharParser('y')
+
+    assert left_recursion(x) is None
+    found = plan_left_recursion(x)
+    assert len(found) == 1 and found[0] is x
+
+
+def test_hidden_lrec_parse():
+    x = OrParser(CharParser('x'))
+    x |= CharParser('z')[0:1] & x & CharParser('y')
+
+    results = list(x.parse(Line('xyy')))
+    assert [r.line for r in results] == [Line('yy'), Line('y'), Line('')]
+
+
+def test_plan_invalidated():
+    x = OrParser(CharParser('x'))
+    assert not left_recursion(x)
+
+    x |= x & CharParser('y')
+    assert left_recursion(x)
+
+
+def test_two_tails_order():
+    x = OrParser(CharParser('x'))
+    x |= x & CharParser('y')
+    x |= x & CharParser('z')
+
+    results: List[ParseVariant] = list(x.parse(Line('xyz')))
+
+    assert results == [
+        ParseVariant(CharParser('x'), Line('yz')),
+        ParseVariant(CharParser('x') & CharParser('y'), Line('z')),
+        ParseVariant(CharParser('x') & CharParser('y') & CharParser('z'), Line('')),
+    ]
@@ -0,0 +1,67 @@
+import pytest
+
+from executor import Executor
+from line import Line
+from parser import CharParser, OrParser, EndLineParser
+from parser.budget import ParseBudget, ParseBudgetError
+
+
+def _ambiguous():
+    e = OrParser(CharParser('x'))
+    e |= e & e
+    return EndLineParser(e)
+
+
+def test_budget_not_exceeded():
+    with ParseBudget(max_steps=10_000).start() as stats:
+        results = list(CharParser('x').parse(Line('x')))
+
+    assert len(results) == 1
+    assert stats.steps == 1
+    assert stats.variants == 1
+
+
+def test_budget_steps():
+    with pytest.raises(ParseBudgetError) as e:
+        with ParseBudget(max_steps=50).start():
+            list(_ambiguous().parse(Line('x' * 12)))
+
+    assert e.value.stats.steps == 51
+
+
+def test_budget_variants():
+    x = CharParser('x')
+    with pytest.raises(ParseBudgetError) as e:
+        with ParseBudget(max_variants=3).start():
+            list(x[0:].parse(Line('x' * 10)))
+
+    assert e.value.stats.max_node_variants == 4
+
+
+def test_budget_timeout():
+    with pytest.raises(ParseBudgetError) as e:
+        with ParseBudget(timeout=0.01).start():
+            list(_ambiguous().parse(Line('x' * 30)))
+
+    assert e.value.stats.elapsed >= 0.01
+
+
+def test_budget_state_reset():
+    with pytest.raises(ParseBudgetError):
+        with ParseBudget(max_steps=1).start():
+            list(_ambiguous().parse(Line('xxx')))
+
+    # Вне with бюджета нет
+    assert len(list(_ambiguous().parse(Line('xxx')))) == 1
+
+
+@pytest.mark.parametrize('engine', ('host', 'forest'))
+def test_budget_executor(engine):
+    executor = Executor(_ambiguous(), engine=engine, budget=ParseBudget(max_steps=20))
+
+    with pytest.raises(ParseBudgetError):
+        executor.execute(Line('x' * 10))
+
+    assert executor.execute(Line('x')) is not None
+    assert executor.stats.steps > 0
+    assert executor.stats.variants > 0
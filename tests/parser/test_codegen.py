@@ -0,0 +1,125 @@
+import pytest
+
+from executor import Executor
+from line import Line
+from parser import (BasePriority, CharParser, DictParser, EndLineParser, FuncParser, KeyArgument, OrParser,
+                    ParseVariant, PriorityParser)
+from parser.base import ParseError
+from parser.codegen import CompiledEngine, CompiledGrammar
+from parser.state import new_parse_memo
+
+
+class _Priority(BasePriority):
+    pass
+
+
+def _sum_parser():
+    # E = x | E + E -- неоднозначно, число деревьев -- числа Каталана
+    e = OrParser(FuncParser(CharParser('x'), lambda *_: 1))
+    e |= FuncParser(
+        KeyArgument('a', e) & CharParser('+') & KeyArgument('b', e),
+        lambda *_, a, b: a + b
+    )
+    return EndLineParser(e)
+
+
+def _same_as_host(parser, raw_line):
+    with new_parse_memo():
+        host = list(parser.parse(Line(raw_line)))
+
+    assert CompiledGrammar(parser).parse(Line(raw_line)) == host
+
+
+@pytest.mark.parametrize('raw_line', ('x', 'x+x', 'x+x+x', 'x+x+x+x+x'))
+def test_codegen_ambiguous(raw_line):
+    p = _sum_parser()
+
+    with new_parse_memo():
+        host = list(p.parse(Line(raw_line)))
+    variants = CompiledGrammar(p).parse(Line(raw_line))
+
+    assert len(variants) == len(host)
+    for variant in variants:
+        assert variant in host
+
+
+def test_codegen_repeat():
+    digits = OrParser(*map(CharParser, '0123456789'))
+    p = KeyArgument('n', digits[1:]) & CharParser('-')[:2] & CharParser('a')[1:3]
+
+    for raw_line in ('1a', '12-aa', '123aaa'):
+        _same_as_host(p, raw_line)
+
+
+def test_codegen_priority():
+    e = OrParser(FuncParser(CharParser('x'), lambda *_: 1))
+    e |= PriorityParser(FuncParser(
+        KeyArgument('a', e) & CharParser('+') & KeyArgument('b', e),
+        lambda *_, a, b: a + b
+    ), _Priority(10))
+    e |= PriorityParser(FuncParser(
+        KeyArgument('a', e) & CharParser('*') & KeyArgument('b', e),
+        lambda *_, a, b: a * b
+    ), _Priority(20))
+
+    variants = CompiledGrammar(EndLineParser(e)).parse(Line('x+x*x+x'))
+
+    with new_parse_memo():
+        host = list(EndLineParser(e).parse(Line('x+x*x+x')))
+    assert len(variants) == len(host)
+
+
+def test_codegen_lrec():
+    x = OrParser(CharParser('x'))
+    x |= x & CharParser('y')
+
+    assert CompiledGrammar(x).parse(Line('xyy')) == [
+        ParseVariant(CharParser('x'), Line('yy')),
+        ParseVariant(CharParser('x') & CharParser('y'), Line('y')),
+        ParseVariant(CharParser('x') & CharParser('y') & CharParser('y'), Line(''))
+    ]
+
+
+def test_codegen_source():
+    grammar = CompiledGrammar(EndLineParser(CharParser.line('ab')))
+
+    # Символы проверяются прямо в коде, без вызова парсеров
+    assert "s[pos] == 'a'" in grammar.source
+    compile(grammar.source, '<test>', 'exec')
+
+
+def test_codegen_deep_nesting():
+    # And из многих частей не упирается в ограничение вложенности блоков Python
+    p = EndLineParser(CharParser.line('abcdefghijklmnopqrstuvwxyz' * 2))
+    _same_as_host(p, 'abcdefghijklmnopqrstuvwxyz' * 2)
+
+
+def test_codegen_host_fallback():
+    words = DictParser({'ab': 1, 'abc': 2})
+    p = EndLineParser(FuncParser(KeyArgument('w', words) & CharParser('!'), lambda *_, w: w))
+
+    variants = CompiledGrammar(p).parse(Line('abc!'))
+
+    assert len(variants) == 1
+    assert variants[0].parser.calculate(None) == 2
+
+
+def test_codegen_regenerate_after_ior():
+    engine = CompiledEngine()
+    x = OrParser(CharParser('x'))
+    p = EndLineParser(x)
+
+    first = engine.grammar(p)
+    assert engine.grammar(p) is first
+    with pytest.raises(ParseError):
+        engine.parse(p, Line('y'))
+
+    x |= CharParser('y')
+
+    assert engine.grammar(p) is not first
+    assert engine.parse(p, Line('y')) == [ParseVariant(EndLineParser(CharParser('y')), Line(''))]
+
+
+def test_codegen_executor():
+    executor = Executor(_sum_parser(), engine='compiled')
+    assert executor.execute(Line('x+x+x')) == 3
@@ -0,0 +1,95 @@
+from line import Line
+from parser import CharParser, EndLineParser, OrParser, ParseVariant
+from parser.dependencies import grammar_graph
+from parser.logic.lookahead_parser import LookaheadParser
+from parser.logic.or_parser import grammar_extensions
+from parser.recognize import recognizer
+from parser.state import parse_memo, new_parse_memo
+from parser.vm import VMEngine
+
+
+def _grammars():
+    a, b = OrParser(CharParser('a')), OrParser(CharParser('b'))
+    return a, b, EndLineParser(a & b), EndLineParser(b)
+
+
+def test_generation_of_ancestors():
+    a, b, ab, only_b = _grammars()
+    before = [grammar_graph.generation(p) for p in (a, b, ab, only_b)]
+
+    a |= CharParser('x')
+
+    after = [grammar_graph.generation(p) for p in (a, b, ab, only_b)]
+    # Меняются a и те, кто его достигает; b и корень без a -- нет
+    assert [old != new for old, new in zip(before, after)] == [True, False, True, False]
+
+
+def test_added_edges():
+    a, b = OrParser(CharParser('a')), OrParser(CharParser('b'))
+    before = grammar_graph.generation(a)
+
+    a |= b
+    b |= CharParser('c')
+
+    # b стал ребёнком a через `|=`: теперь a зависит от b
+    assert grammar_graph.generation(a) != before
+
+
+def test_compiled_kept():
+    a, b, ab, only_b = _grammars()
+    engine = VMEngine()
+
+    compiled_ab, compiled_b = engine.compiled(ab), engine.compiled(only_b)
+    a |= CharParser('x')
+
+    assert engine.compiled(only_b) is compiled_b
+    assert engine.compiled(ab) is not compiled_ab
+    assert engine.parse(ab, Line('xb')) == [ParseVariant(EndLineParser(CharParser('x') & CharParser('b')), Line(''))]
+
+
+def test_memo_kept():
+    a, b, ab, only_b = _grammars()
+
+    with new_parse_memo():
+        list(only_b.parse(Line('b')))
+        list(ab.parse(Line('ab')))
+        memo = parse_memo()
+        b_variants = memo.variants(b, 'b', grammar_graph.generation(b))
+
+        a |= CharParser('x')
+
+        assert parse_memo() is memo
+        assert memo.variants(b, 'b', grammar_graph.generation(b)) is b_variants
+        assert memo.variants(a, 'ab', grammar_graph.generation(a)) == []
+        assert [variant.line for variant in ab.parse(Line('xb'))] == [Line('')]
+
+
+def test_recognizer_refresh():
+    a, b = OrParser(CharParser('a')), OrParser(CharParser('b'))
+    line = Line('xb')
+
+    with new_parse_memo():
+        table = recognizer(line)
+        assert not LookaheadParser(a).matches(line)
+        assert LookaheadParser(b).matches(line[1:])
+        b_ends = table.ends(b, 1)
+
+        a |= CharParser('x')
+
+        assert recognizer(line) is table
+        assert LookaheadParser(a).matches(line)
+        assert table.ends(b, 1) is b_ends
+
+
+def test_session_extension():
+    a, b, ab, only_b = _grammars()
+    before = grammar_graph.generation(ab), grammar_graph.generation(only_b)
+
+    token = grammar_extensions.set({})
+    try:
+        a |= CharParser('x')
+    finally:
+        grammar_extensions.reset(token)
+
+    assert grammar_graph.generation(ab) != before[0]
+    assert grammar_graph.generation(only_b) == before[1]
@@ -0,0 +1,52 @@
+import sys
+
+from line import Line
+from parser import CharParser, EndLineParser, FuncParser, KeyArgument, OrParser
+from parser.evaluate import calculate
+from parser.state import new_parse_memo
+from parser.vm import VMEngine
+
+
+def _braces():
+    # E = x | (E)
+    e = OrParser(FuncParser(CharParser('x'), lambda *_: 1))
+    e |= FuncParser(CharParser('(') & KeyArgument('e', e) & CharParser(')'), lambda *_, e: e + 1)
+    return EndLineParser(e)
+
+
+def test_calculate_same_as_recursive():
+    p = EndLineParser(FuncParser(
+        KeyArgument('a', CharParser('x')[1:]) & KeyArgument('b', CharParser('y')),
+        lambda *_, a, b: (len(a), b)
+    ))
+    with new_parse_memo():
+        tree = next(iter(p.parse(Line('xxxy')))).parser
+
+    assert calculate(tree, None) == tree.calculate(None)
+
+
+def test_calculate_order():
+    calls = []
+
+    def _f(name):
+        return lambda *_, **kwargs: calls.append(name) or name
+
+    p = FuncParser(
+        KeyArgument('a', FuncParser(CharParser('a'), _f('a'))) & KeyArgument('b', FuncParser(CharParser('b'), _f('b'))),
+        lambda *_, a, b: a + b
+    )
+    with new_parse_memo():
+        tree = next(iter(p.parse(Line('ab')))).parser
+
+    assert calculate(tree, None) == 'ab'
+    assert calls == ['a', 'b']
+
+
+def test_deep_nesting():
+    depth = sys.getrecursionlimit() * 2
+    line = Line('(' * depth + 'x' + ')' * depth)
+
+    variants = VMEngine().parse(_braces(), line)
+
+    assert len(variants) == 1
+    assert calculate(variants[0].parser, None) == depth + 1
@@ -0,0 +1,95 @@
+import pytest
+
+from line import Line
+from parser import CharParser, OrParser, EndLineParser, FuncParser, KeyArgument, ParseVariant
+from parser.base import ParseError
+from parser.forest import ForestEngine
+from executor import Executor
+
+
+def _sum_parser():
+    # E = x | E + E -- неоднозначно, число деревьев -- числа Каталана
+    e = OrParser(FuncParser(CharParser('x'), lambda *_: 1))
+    e |= FuncParser(
+        KeyArgument('a', e) & CharParser('+') & KeyArgument('b', e),
+        lambda *_, a, b: a + b
+    )
+    return EndLineParser(e)
+
+
+@pytest.mark.parametrize('raw_line, count', (
+    ('x', 1),
+    ('x+x', 1),
+    ('x+x+x', 2),
+    ('x+x+x+x', 5),
+    ('x+x+x+x+x', 14),
+))
+def test_forest_count(raw_line, count):
+    p = _sum_parser()
+    forest = ForestEngine().forest(p, Line(raw_line))
+
+    assert forest.count() == count
+    assert forest.count() == len(list(p.parse(Line(raw_line))))
+
+
+def test_forest_same_as_host():
+    p = _sum_parser()
+    line = Line('x+x+x+x')
+
+    host = list(p.parse(line))
+    variants = list(ForestEngine().forest(p, line).variants())
+
+    assert len(variants) == len(host)
+    for variant in variants:
+        assert variant in host
+
+
+def test_forest_big_count():
+    # Деревья не строятся: число Каталана C(19)
+    p = _sum_parser()
+    forest = ForestEngine().forest(p, Line('+'.join('x' * 20)))
+
+    assert forest.count() == 1767263190
+
+
+def test_forest_select():
+    p = _sum_parser()
+    forest = ForestEngine().forest(p, Line('x+x+x'))
+
+    assert forest.select(0) == list(forest.variants())[0]
+    assert forest.select(-1) == list(forest.variants())[-1]
+
+    with pytest.raises(IndexError):
+        forest.select(2)
+
+
+def test_forest_lrec():
+    x = OrParser(CharParser('x'))
+    x |= x & CharParser('y')
+
+    forest = ForestEngine().forest(x, Line('xyy'))
+
+    assert list(forest.variants()) == [
+        ParseVariant(CharParser('x'), Line('yy')),
+        ParseVariant(CharParser('x') & CharParser('y'), Line('y')),
+        ParseVariant(CharParser('x') & CharParser('y') & CharParser('y'), Line(''))
+    ]
+
+
+def test_forest_not_found():
+    with pytest.raises(ParseError):
+        ForestEngine().parse(_sum_parser(), Line('x+'))
+
+
+@pytest.mark.parametrize('engine', ('host', 'forest'))
+def test_forest_executor_distinct(engine):
+    # Все 5 выводов `xxxx` дают одно и то же дерево -- вычисляем один раз
+    calls = []
+    e = OrParser(CharParser('x'))
+    e |= e & e
+    p = EndLineParser(FuncParser(e, lambda *_: calls.append(1)))
+
+    Executor(p, engine=engine).execute(Line('xxxx'))
+
+    assert ForestEngine().forest(p, Line('xxxx')).count() == 5
+    assert len(calls) == 1
@@ -0,0 +1,212 @@
+import pytest
+
+from line import Line
+from parser import AndParser, CharParser, EmptyParser, FactoredParser, FuncParser, KeyArgument, OrParser, RepeatParser
+from parser.engine import HostEngine
+from parser.graph import strong_components
+from parser.optimize import Optimizer, identity_key, optimize
+from parser.state import new_parse_memo
+from parser.vm import VMEngine
+
+digits = OrParser(*map(CharParser, '0123456789'))
+space = CharParser(' ')
+
+
+def _variants(parser, raw_line):
+    try:
+        with new_parse_memo():
+            return [(len(v.line), v.parser) for v in parser.parse(Line(raw_line))]
+    except Exception:
+        return []
+
+
+def _values(parser, raw_line):
+    return [(end, tree.calculate(None)) for end, tree in _variants(parser, raw_line)]
+
+
+def _sum_parser():
+    e = OrParser(FuncParser(KeyArgument('n', digits[1:]), lambda *_, n: int(''.join(d.ch for d in n))))
+    e |= FuncParser(
+        KeyArgument('a', e) & space[:] & CharParser('+') & space[:] & KeyArgument('b', e),
+        lambda *_, a, b: a + b
+    )
+    return e
+
+
+def test_identity_key():
+    assert identity_key(lambda *args, e: e) == 'e'
+    assert identity_key(lambda *args, e: e + 1) is None
+    assert identity_key(lambda x, *args, e: e) is None
+    assert identity_key(lambda *args, e, f: e) is None
+
+
+def test_flatten():
+    inner = OrParser(CharParser('b'), CharParser('c'))
+    p = OrParser(CharParser('a'))
+    p.parsers = (*p.parsers, inner)
+    seq = AndParser(CharParser('x'))
+    seq.parsers = (*seq.parsers, AndParser(CharParser('y'), CharParser('z')))
+
+    root = AndParser()
+    root.parsers = (p, seq)
+
+    optimized, report = optimize(root)
+
+    assert [type(child) for child in optimized.parsers[0].parsers] == [CharParser] * 3
+    assert optimized.parsers[1:] == (CharParser('x'), CharParser('y'), CharParser('z'))
+    assert report.after == report.before - 3
+    for raw_line in ('axyz', 'cxyz', 'dxyz'):
+        assert _variants(optimized, raw_line) == _variants(root, raw_line)
+
+
+def test_flatten_shared_or():
+    # OrParser, которым пользуются в двух местах, не вкладывается: общее мемо
+    shared = OrParser(CharParser('a'), CharParser('b'))
+    p = OrParser(CharParser('c'))
+    p.parsers = (*p.parsers, shared)
+
+    root = AndParser()
+    root.parsers = (p, shared)
+
+    optimized, _ = optimize(root)
+
+    assert optimized.parsers[0].parsers[1] is optimized.parsers[1]
+
+
+def test_flatten_keeps_cycles():
+    p = _sum_parser()
+    optimized, _ = optimize(p)
+    components = strong_components(optimized)
+
+    assert sum(1 for component in components.values() if component == components[id(optimized)]) > 1
+    for raw_line in ('1', '1+2', '1 + 2+3', '1+'):
+        assert _values(optimized, raw_line) == _values(p, raw_line)
+
+
+def test_empty_and_repeat():
+    a = CharParser('a')
+    p = AndParser(a, RepeatParser(CharParser('b'), 0, 1), RepeatParser(CharParser('c'), 2, 3))
+
+    optimized, report = optimize(p)
+
+    assert report.changes['repeat'] == 2
+    assert report.changes['empty'] == 1
+    assert optimized.parsers == (a, CharParser('c'), CharParser('c'))
+    assert _variants(optimized, 'acc') == _variants(p, 'acc')
+
+
+def test_dead():
+    never = AndParser()
+    p = OrParser(CharParser('a'))
+    p.parsers = (*p.parsers, never, CharParser('b') & OrParser(), EmptyParser(), EmptyParser())
+
+    optimized, report = optimize(p)
+
+    assert optimized.parsers == (CharParser('a'), EmptyParser())
+    assert report.changes['dead'] == 3
+
+
+def test_identity():
+    inner = FuncParser(KeyArgument('e', digits), lambda *args, e: e)
+    p = FuncParser(CharParser('-') & KeyArgument('n', inner), lambda *_, n: -int(n.ch))
+
+    optimized, report = optimize(p)
+
+    assert report.changes['identity'] == 1
+    assert optimized.parser.parsers[1].parser == digits
+    assert _values(optimized, '-7') == _values(p, '-7') == [(0, -7)]
+
+
+@pytest.mark.parametrize('inner', (
+        # Дерево -- AndParser: растворилось бы в дереве родителя
+        CharParser('(') & KeyArgument('e', digits),
+        # Дерево -- KeyArgument: родитель получил бы лишний аргумент
+        KeyArgument('e', digits),
+))
+def test_identity_kept(inner):
+    p = FuncParser(CharParser('-') & FuncParser(KeyArgument('x', inner), lambda *args, x: x), lambda *_: 0)
+
+    _, report = optimize(p)
+
+    assert report.changes['identity'] == 0
+
+
+def test_identity_same_trees():
+    # Без обёртки дерево совпало бы с деревом соседней альтернативы
+    p = OrParser(FuncParser(KeyArgument('e', CharParser('a')), lambda *args, e: e))
+    p |= CharParser('a')
+
+    optimized, report = optimize(p)
+
+    assert report.changes['identity'] == 0
+    assert len(_variants(optimized, 'a')) == 2
+
+
+def test_live_grammar_unchanged():
+    inner = OrParser(CharParser('b'))
+    p = OrParser(CharParser('a'))
+    p.parsers = (*p.parsers, inner)
+
+    optimize(p)
+
+    assert p.parsers[1] is inner
+
+
+def test_optimizer_after_ior():
+    p = OrParser(CharParser('a'), CharParser('b'))
+    optimizer = Optimizer()
+
+    first = optimizer.optimized(p)
+    assert optimizer.optimized(p) is first
+
+    p |= CharParser('c')
+    second = optimizer.optimized(p)
+
+    assert second is not first
+    assert len(second.parsers) == 3
+    assert optimizer.report.before == 4
+
+
+@pytest.mark.parametrize('engine', (HostEngine, VMEngine))
+@pytest.mark.parametrize('raw_line', ('1', '12+3', '1+2 + 3'))
+def test_engine_optimize(engine, raw_line):
+    p = _sum_parser()
+
+    with new_parse_memo():
+        expected = [variant.parser.calculate(None) for variant in engine().parse(p, Line(raw_line))]
+    with new_parse_memo():
+        values = [variant.parser.calculate(None) for variant in engine(optimize=True).parse(p, Line(raw_line))]
+
+    assert values == expected
+
+
+def _ops_parser():
+    e = OrParser(FuncParser(KeyArgument('n', digits[1:]), lambda *_, n: int(''.join(d.ch for d in n))))
+    for op, f in (('+', lambda a, b: a + b), ('-', lambda a, b: a - b), ('*', lambda a, b: a * b)):
+        e |= FuncParser(
+            KeyArgument('a', e) & space[:] & CharParser(op) & space[:] & KeyArgument('b', e),
+            lambda *_, a, b, _f=f: _f(a, b)
+        )
+    return e
+
+
+def test_factor():
+    p = _ops_parser()
+
+    optimized, report = optimize(p)
+    factored = [alternative for alternative in optimized.parsers if isinstance(alternative, FactoredParser)]
+
+    assert report.changes['factor'] == 1
+    assert len(factored) == 3
+    assert len({id(alternative.prefix) for alternative in factored}) == 1
+    # KeyArgument('a', e) & space[:] -- разные узлы, но разбирают одно и то же
+    assert len(factored[0].prefix.parsers) == 2
+
+
+@pytest.mark.parametrize('raw_line', ('1', '1+2', '1 - 2*3', '2*3 + 4 - 5', '1+'))
+def test_factor_same_variants(raw_line):
+    p = _ops_parser()
+    optimized, _ = optimize(p, ('factor', ))
+
+    # Те же деревья в том же порядке
+    assert _variants(optimized, raw_line) == _variants(p, raw_line)
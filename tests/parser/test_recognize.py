@@ -0,0 +1,122 @@
+import pytest
+
+from line import Line
+from parser import (BasePriority, CharParser, DictParser, EndLineParser, FuncParser, GroupParser, KeyArgument,
+                    OrParser, PriorityParser, TextParser)
+from parser.engine import HostEngine
+from parser.recognize import match_ends
+from parser.state import ParseState, new_parse_memo
+
+
+class _Priority(BasePriority):
+    pass
+
+
+digits = OrParser(*map(CharParser, '0123456789'))
+
+
+def _priority_parser():
+    e = OrParser(FuncParser(CharParser('x'), lambda *_: 1))
+    e |= GroupParser(CharParser('(') & e & CharParser(')'))
+    # Справа от * -- только то, что не слабее *
+    e |= PriorityParser(FuncParser(
+        KeyArgument('a', e) & CharParser('+') & KeyArgument('b', e),
+        lambda *_, a, b: a + b
+    ), _Priority(10))
+    e |= PriorityParser(FuncParser(
+        KeyArgument('a', e) & CharParser('*') & KeyArgument('b', e),
+        lambda *_, a, b: a * b
+    ), _Priority(20))
+    return e
+
+
+def _host_ends(parser, raw_line):
+    try:
+        with new_parse_memo():
+            return sorted({len(raw_line) - len(variant.line) for variant in parser.parse(Line(raw_line))})
+    except Exception:
+        return []
+
+
+class _Calls(ParseState):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def track(self, parser, variants):
+        self.calls += 1
+        return super().track(parser, variants)
+
+
+@pytest.mark.parametrize('raw_line', ('x', 'x+x', 'x*x+x', 'x*(x+x)', '(x', 'x+', 'x*x*x+(x)*x', ''))
+def test_same_as_host(raw_line):
+    p = _priority_parser()
+
+    assert match_ends(p, raw_line) == _host_ends(p, raw_line)
+    assert match_ends(EndLineParser(p), raw_line) == _host_ends(EndLineParser(p), raw_line)
+
+
+def test_match():
+    p = EndLineParser(_priority_parser())
+
+    assert p.match('x+x*x')
+    assert p.match(Line('(x+x)*x'))
+    assert not p.match('x+')
+    assert not p.match('')
+
+
+def test_match_length():
+    p = _priority_parser()
+
+    assert p.match_length('x+x)') == 3
+    assert p.match_length('x+') == 1
+    assert p.match_length(')') is None
+
+
+def test_priority_filters():
+    # Единственное дерево x*x+x с + под * не проходит PriorityParser(20)
+    e = OrParser(CharParser('x'))
+    e |= PriorityParser(e & CharParser('+') & CharParser('x'), _Priority(10))
+    p = PriorityParser(CharParser('x') & CharParser('*') & e, _Priority(20))
+
+    assert match_ends(p, 'x*x+x') == _host_ends(p, 'x*x+x') == [3]
+
+
+def test_repeat_bounds():
+    p = KeyArgument('n', digits[1:]) & CharParser('-')[:2] & CharParser('a')[1:3]
+
+    for raw_line in ('1a', '12-aa', '123aaa', '1-', '1--a'):
+        assert match_ends(p, raw_line) == _host_ends(p, raw_line)
+
+
+def test_text():
+    p = TextParser(digits[2:]) & CharParser('!')
+
+    assert p.match('12!')
+    assert not p.match('1!')
+
+
+def test_host_fallback():
+    words = DictParser({'ab': 1, 'abc': 2})
+    p = KeyArgument('w', words) & (CharParser('!') / CharParser('c'))
+
+    assert match_ends(p, 'abc!') == _host_ends(p, 'abc!') == [3, 4]
+
+
+def test_no_trees():
+    p = EndLineParser(_priority_parser())
+
+    with _Calls() as state:
+        assert p.match('x*(x+x)+x')
+
+    # Ни один parse не вызван: деревья не строились
+    assert state.calls == 0
+
+
+def test_optimized_grammar():
+    # Обёртки FactoredParser не должны считаться изменениями таблицы (иначе неподвижной точки нет)
+    p = EndLineParser(_priority_parser())
+    optimized = HostEngine(optimize=True).grammar_root(p)
+
+    for raw_line in ('x+x*x', 'x*(x+x)', 'x+'):
+        assert match_ends(optimized, raw_line) == match_ends(p, raw_line)
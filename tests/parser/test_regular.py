@@ -0,0 +1,73 @@
+import pytest
+
+from line import Line
+from parser import CharParser, DictParser, FuncParser, KeyArgument, OrParser
+from parser.base import ParseError
+from parser.codegen import CompiledGrammar
+from parser.regular import RegularAnalysis, regular_subgraphs
+from parser.state import new_parse_memo
+from std_parsers.comment import comment_parser
+from std_parsers.common import spaces, var_name
+from std_parsers.numbers import number
+
+digits = OrParser(*map(CharParser, '0123456789'))
+
+
+def _host(parser, raw_line):
+    try:
+        with new_parse_memo():
+            return [(len(raw_line) - len(v.line), v.parser) for v in parser.parse(Line(raw_line))]
+    except ParseError:
+        return []
+
+
+@pytest.mark.parametrize('parser', (number, spaces, var_name, comment_parser))
+@pytest.mark.parametrize('raw_line', ('-123 + 1', '  # text', 'ab_c1', '7', '', '--1'))
+def test_regular_same_as_host(parser, raw_line):
+    matcher = RegularAnalysis().matcher(parser)
+
+    assert matcher is not None
+    assert matcher.match(raw_line, 0) == _host(parser, raw_line)
+
+
+def test_regular_captures():
+    matcher = RegularAnalysis().matcher(number)
+
+    assert matcher.regex.groupindex.keys() == {'sign', 'digits'}
+    (end, tree), = [result for result in matcher.match('-42', 0) if result[0] == 3]
+    assert tree.parser.key_args().keys() == {'sign', 'digits'}
+
+
+@pytest.mark.parametrize('parser', (
+        digits[:] & digits,
+        CharParser('a')[:] & CharParser('-')[:2] & CharParser('a'),
+        KeyArgument('d', DictParser({'a': 'a'})[1:]),
+        CharParser('a') & CharParser('b'),
+))
+def test_not_regular(parser):
+    # Неоднозначно, меняется на ходу или нечего ускорять
+    assert RegularAnalysis().matcher(parser) is None
+
+
+def test_regular_recursive():
+    e = OrParser(CharParser('x'))
+    e |= CharParser('(') & e & CharParser(')')
+
+    assert regular_subgraphs(e) == []
+
+
+def test_regular_subgraphs():
+    p = FuncParser(KeyArgument('n', digits[1:]) & spaces, lambda *_, n: n) | var_name
+    found = regular_subgraphs(p)
+
+    assert [matcher.parser for matcher in found] == [p.parsers[0], var_name]
+
+
+def test_regular_codegen():
+    p = KeyArgument('n', digits[1:]) & CharParser('-')[:2] & CharParser('a')[1:3]
+    grammar = CompiledGrammar(p)
+
+    assert 'rt.regular(N[' in grammar.source
+    for raw_line in ('1a', '12-aa', '123aaa'):
+        with new_parse_memo():
+            assert grammar.parse(Line(raw_line)) == list(p.parse(Line(raw_line)))
@@ -0,0 +1,52 @@
+import sys
+import threading
+
+from line import Line
+from parser import CharParser, OrParser, EndLineParser, FuncParser
+from parser.state import new_parse_memo, parse_memo
+
+
+def _grammar():
+    e = OrParser(FuncParser(CharParser('x'), lambda *_: 1))
+    e |= FuncParser(e & CharParser('+') & e, lambda *_: 2)
+    return EndLineParser(e)
+
+
+def test_memo_per_parse():
+    with new_parse_memo():
+        memo = parse_memo(OrParser.generation)
+        assert parse_memo(OrParser.generation) is memo
+
+        with new_parse_memo():
+            assert parse_memo(OrParser.generation) is not memo
+
+        assert parse_memo(OrParser.generation) is memo
+        assert parse_memo(OrParser.generation + 1) is not memo
+
+
+def test_parse_from_threads():
+    grammar = _grammar()
+    line = '+'.join('x' * 5)
+    expected = len(list(grammar.parse(Line(line))))
+
+    counts = []
+    barrier = threading.Barrier(8)
+
+    def _worker():
+        barrier.wait()
+        for _ in range(5):
+            counts.append(len(list(grammar.parse(Line(line)))))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=_worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert expected == 14
+    assert counts == [expected] * 40
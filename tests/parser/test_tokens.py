@@ -0,0 +1,102 @@
+import pytest
+
+from line import Line
+from parser import CharParser, EndLineParser, FuncParser, KeyArgument, OrParser, TextParser
+from parser.codegen import CompiledEngine
+from parser.state import new_parse_memo
+from parser.tokens import Lexer, LexerError, TokenStream, use_tokens
+from parser.vm import REGULAR, VMEngine
+
+digits = OrParser(*map(CharParser, '0123456789'))
+space = CharParser(' ')
+
+
+def _sum_parser():
+    e = OrParser(FuncParser(KeyArgument('n', TextParser(digits[1:])), lambda *_, n: int(n)))
+    e |= FuncParser(
+        KeyArgument('a', e) & space[:] & CharParser('+') & space[:] & KeyArgument('b', e),
+        lambda *_, a, b: a + b
+    )
+    return EndLineParser(e)
+
+
+def test_lexer():
+    lexer = Lexer({'number': TextParser(digits[1:]), 'spaces': space[:]})
+    stream = lexer.tokenize(Line("12 +"))
+
+    assert [end for end, _ in stream.token('number', 0)] == [1, 2]
+    assert [end for end, _ in stream.token('spaces', 2)] == [2, 3]
+    assert stream.token('number', 3) == []
+
+
+def test_lexer_not_regular():
+    e = OrParser(CharParser('x'))
+    e |= CharParser('(') & e & CharParser(')')
+
+    with pytest.raises(LexerError):
+        Lexer({'e': e})
+
+
+def test_stream_reads_once():
+    lexer = Lexer({'spaces': space[:]})
+    stream = lexer.tokenize(Line("   x"))
+
+    for _ in range(3):
+        stream.token('spaces', 0)
+    stream.token('spaces', 1)
+
+    assert stream.scans == 2
+
+
+def test_token_parser():
+    lexer = Lexer({'number': TextParser(digits[1:])})
+    p = lexer.token('number') & CharParser('+') & lexer.token('number')
+    line = Line("1+23")
+
+    with new_parse_memo():
+        plain = list(p.parse(line))
+    stream = lexer.tokenize(line)
+    with use_tokens(stream), new_parse_memo():
+        assert list(p.parse(line)) == plain
+
+    # Второй токен прочитан с позиции 2 и запомнен
+    assert stream.scans == 2
+
+
+def test_from_grammar():
+    lexer = Lexer.from_grammar(_sum_parser())
+
+    assert set(lexer.definitions) == {'n', 'token1', 'token2'}
+
+
+@pytest.mark.parametrize('engine', (VMEngine, CompiledEngine))
+@pytest.mark.parametrize('raw_line', ("1", "1 + 2", "1+2 +  3 + 45", "1 +"))
+def test_tokenize_engine(engine, raw_line):
+    p = _sum_parser()
+
+    try:
+        expected = [variant.parser for variant in engine().parse(p, Line(raw_line))]
+    except Exception:
+        expected = []
+    try:
+        variants = [variant.parser for variant in engine(tokenize=True).parse(p, Line(raw_line))]
+    except Exception:
+        variants = []
+
+    assert variants == expected
+
+
+def test_tokenize_program():
+    program = VMEngine(tokenize=True).program(_sum_parser())
+
+    assert program.lexer is not None
+    regular = [arg for rule in program.rules for op, arg in rule.code if op == REGULAR]
+    assert regular and all(matcher in program.lexer.definitions.values() for matcher in regular)
+
+
+def test_stream_covers():
+    line = Line("abc")
+    stream = TokenStream(line)
+
+    assert stream.covers(line[1:])
+    assert not stream.covers(Line("bc"))
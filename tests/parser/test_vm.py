@@ -0,0 +1,131 @@
+import pytest
+
+from executor import Executor
+from line import Line
+from parser import (BasePriority, CharParser, DictParser, EndLineParser, FuncParser, KeyArgument, OrParser,
+                    ParseVariant, PriorityParser)
+from parser.base import ParseError
+from parser.budget import ParseBudget, ParseBudgetError
+from parser.state import new_parse_memo
+from parser.vm import CALL, END, REGULAR, SET, VMEngine, compile_program
+
+
+class _Priority(BasePriority):
+    pass
+
+
+def _sum_parser():
+    # E = x | E + E -- неоднозначно, число деревьев -- числа Каталана
+    e = OrParser(FuncParser(CharParser('x'), lambda *_: 1))
+    e |= FuncParser(
+        KeyArgument('a', e) & CharParser('+') & KeyArgument('b', e),
+        lambda *_, a, b: a + b
+    )
+    return EndLineParser(e)
+
+
+def _same_as_host(parser, raw_line):
+    with new_parse_memo():
+        host = list(parser.parse(Line(raw_line)))
+    variants = VMEngine().parse(parser, Line(raw_line))
+
+    assert len(variants) == len(host)
+    for variant in variants:
+        assert variant in host
+
+
+@pytest.mark.parametrize('raw_line', ('x', 'x+x', 'x+x+x', 'x+x+x+x+x'))
+def test_vm_ambiguous(raw_line):
+    _same_as_host(_sum_parser(), raw_line)
+
+
+def test_vm_lrec():
+    x = OrParser(CharParser('x'))
+    x |= x & CharParser('y')
+
+    assert VMEngine().parse(x, Line('xyy')) == [
+        ParseVariant(CharParser('x'), Line('yy')),
+        ParseVariant(CharParser('x') & CharParser('y'), Line('y')),
+        ParseVariant(CharParser('x') & CharParser('y') & CharParser('y'), Line(''))
+    ]
+
+
+def test_vm_repeat():
+    digits = OrParser(*map(CharParser, '0123456789'))
+    p = KeyArgument('n', digits[1:]) & CharParser('-')[:2] & CharParser('a')[1:3]
+
+    for raw_line in ('1a', '12-aa', '123aaa'):
+        _same_as_host(p, raw_line)
+
+    with pytest.raises(ParseError):
+        VMEngine().parse(p, Line('1-'))
+
+
+def test_vm_set():
+    digits = OrParser(*map(CharParser, '0123456789'))
+    # Без повтора кусок не регулярный: набор -- инструкцией SET
+    program = compile_program(digits & CharParser('x'))
+
+    assert [op for op, _ in program.root.code].count(SET) == 1
+    assert CALL not in [op for op, _ in program.root.code]
+
+
+def test_vm_regular():
+    digits = OrParser(*map(CharParser, '0123456789'))
+    program = compile_program(digits[1:] & CharParser('x'))
+
+    assert [op for op, _ in program.root.code] == [REGULAR, END]
+    _same_as_host(digits[1:] & CharParser('x'), '123x')
+
+
+def test_vm_priority():
+    e = OrParser(FuncParser(CharParser('x'), lambda *_: 1))
+    e |= PriorityParser(FuncParser(
+        KeyArgument('a', e) & CharParser('+') & KeyArgument('b', e),
+        lambda *_, a, b: a + b
+    ), _Priority(10))
+    e |= PriorityParser(FuncParser(
+        KeyArgument('a', e) & CharParser('*') & KeyArgument('b', e),
+        lambda *_, a, b: a * b
+    ), _Priority(20))
+
+    _same_as_host(EndLineParser(e), 'x+x*x+x')
+
+
+def test_vm_host_fallback():
+    words = DictParser({'ab': 1, 'abc': 2})
+    p = EndLineParser(FuncParser(KeyArgument('w', words) & CharParser('!'), lambda *_, w: w))
+
+    variants = VMEngine().parse(p, Line('abc!'))
+
+    assert len(variants) == 1
+    assert variants[0].parser.calculate(None) == 2
+
+
+def test_vm_not_found():
+    with pytest.raises(ParseError):
+        VMEngine().parse(_sum_parser(), Line('x+'))
+
+
+def test_vm_recompile_after_ior():
+    engine = VMEngine()
+    x = OrParser(CharParser('x'))
+    p = EndLineParser(x)
+
+    with pytest.raises(ParseError):
+        engine.parse(p, Line('y'))
+
+    x |= CharParser('y')
+    assert engine.parse(p, Line('y')) == [ParseVariant(EndLineParser(CharParser('y')), Line(''))]
+
+
+def test_vm_executor():
+    executor = Executor(_sum_parser(), engine='vm')
+    assert executor.execute(Line('x+x+x')) == 3
+
+
+def test_vm_budget():
+    executor = Executor(_sum_parser(), engine='vm', budget=ParseBudget(max_steps=5))
+
+    with pytest.raises(ParseBudgetError):
+        executor.execute(Line('+'.join('x' * 10)))
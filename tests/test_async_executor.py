@@ -0,0 +1,60 @@
+import asyncio
+
+from async_executor import AsyncExecutor
+from line import Line
+from parser import CharParser, OrParser, EndLineParser, FuncParser
+from source import AsyncSource, StrSource
+
+
+def _grammar():
+    e = OrParser(FuncParser(CharParser('x'), lambda *_: 1))
+    e |= FuncParser(e & CharParser('+') & e, lambda r: sum(p.calculate(None) for p in r.parsers if p != CharParser('+')))
+    return EndLineParser(e)
+
+
+def test_async_execute():
+    executor = AsyncExecutor(CharParser('x'), every=1)
+
+    assert asyncio.run(executor.aexecute(Line('x'))) == CharParser('x')
+
+
+def test_async_run_source():
+    executor = AsyncExecutor(FuncParser(CharParser.line('xy'), lambda *_: 'ok'))
+
+    assert asyncio.run(executor.run(AsyncSource(StrSource("<test>", "xy\nxy")))) == 'ok'
+
+
+def test_async_interleave():
+    # Пока идут разборы, цикл событий продолжает работать
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(len(ticks))
+            await asyncio.sleep(0)
+
+    async def main():
+        executors = [AsyncExecutor(_grammar(), every=5, policy='first') for _ in range(3)]
+        results = await asyncio.gather(
+            ticker(),
+            *(executor.aexecute(Line('+'.join('x' * 6))) for executor in executors)
+        )
+        return results[1:]
+
+    assert asyncio.run(main()) == [6, 6, 6]
+    assert ticks == [0, 1, 2, 3, 4]
+
+
+def test_async_yields_every_steps():
+    switches = []
+
+    class _Counting(AsyncExecutor):
+        @staticmethod
+        async def _switch(baton):
+            switches.append(1)
+            await AsyncExecutor._switch(baton)
+
+    executor = _Counting(_grammar(), every=10, policy='first')
+
+    assert asyncio.run(executor.aexecute(Line('x+x+x'))) == 3
+    assert len(switches) > 0
@@ -0,0 +1,53 @@
+import main  # noqa: F401
+import modules
+from batch import BatchExecutor, is_mutation
+from line import Line
+from source import StrSource
+from std_parsers.variable import variables
+
+
+def test_is_mutation():
+    assert is_mutation(Line("x = 1"))
+    assert is_mutation(Line("@ |= `x`"))
+    assert is_mutation(Line("import __batch_mod"))
+    assert not is_mutation(Line("x + 1"))
+    assert not is_mutation(Line("imported + 1"))
+    assert not is_mutation(Line("(1 + 2) * 3"))
+
+
+def test_batch_order_and_barriers():
+    lines = "\n".join((
+        "1 + 1",
+        "__batch = 5",
+        "__batch * 2",
+        "(2 + 3) * 4",
+        "__batch = __batch + 1",
+        "__batch * 2",
+        "3!",
+    ))
+    batch = BatchExecutor(lambda: variables['@@'], processes=2, chunksize=1)
+
+    assert batch.execute(StrSource("<batch>", lines)) == [2, 5, 10, 20, 6, 12, 6]
+
+
+def test_batch_single_process():
+    batch = BatchExecutor(lambda: variables['@@'], processes=1)
+
+    assert batch.execute(StrSource("<batch>", "2 * 3\n__batch_one")) == [6, None]
+
+
+def test_batch_nested_assignment():
+    # Присваивание внутри выражения по началу строки не видно
+    lines = "1 + 1\n2 * (__bb = 3)\n__bb + 1"
+    batch = BatchExecutor(lambda: variables['@@'], processes=2, chunksize=1)
+
+    assert batch.execute(StrSource("<batch>", lines)) == [2, 6, 4]
+
+
+def test_batch_import(tmp_path, monkeypatch):
+    monkeypatch.setattr(modules, 'module_path', [str(tmp_path)])
+    (tmp_path / "__batch_mod.abs").write_text("__batch_m = 7\n", encoding='utf-8')
+    lines = "1 + 1\nimport __batch_mod\n__batch_m * 2"
+    batch = BatchExecutor(lambda: variables['@@'], processes=2, chunksize=1)
+
+    assert batch.execute(StrSource("<batch>", lines))[2] == 14
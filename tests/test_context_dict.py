@@ -0,0 +1,59 @@
+import pytest
+
+from context_dict import ContextDict, current_context, global_context, use_context
+
+
+def test_fork_reads_parent():
+    root = ContextDict({'x': 1})
+    child = root.fork(y=2)
+
+    assert child['x'] == 1
+    assert child['y'] == 2
+    assert list(child) == ['x', 'y']
+    assert 'y' not in root
+
+
+def test_fork_copy_on_write():
+    root = ContextDict({'x': 1})
+    child = root.fork()
+
+    child['x'] = 2
+
+    assert child['x'] == 2
+    assert root['x'] == 1
+
+
+def test_delete_shadows_parent():
+    root = ContextDict({'x': 1})
+    child = root.fork()
+
+    del child['x']
+
+    assert 'x' not in child
+    assert root['x'] == 1
+    with pytest.raises(KeyError):
+        del child['x']
+
+
+def test_version():
+    root = ContextDict({'x': 1})
+    child, other = root.fork(), root.fork()
+    version = child.version
+
+    assert child.version == version
+    assert other.version != version
+
+    other['y'] = 1
+    assert child.version == version
+
+    root['z'] = 1
+    assert child.version != version
+
+
+def test_use_context():
+    context = global_context.fork(x=1)
+
+    with use_context(context):
+        assert current_context.get() is context
+
+    assert current_context.get() is global_context
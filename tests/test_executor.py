@@ -0,0 +1,81 @@
+import pytest
+
+from executor import Executor, AmbiguousParseError
+from line import Line
+from parser import CharParser, OrParser, EndLineParser, FuncParser, KeyArgument, PriorityParser, BasePriority
+
+
+class _Priority(BasePriority):
+    pass
+
+
+def _grammar(calls):
+    # E = d | E - E (неоднозначно), вызовы функций пишутся в calls
+    def _sub(*_, a, b):
+        calls.append('-')
+        return a - b
+
+    def _mul(*_, a, b):
+        calls.append('*')
+        return a * b
+
+    e = OrParser(*(FuncParser(CharParser(str(d)), lambda r: int(r.ch)) for d in range(10)))
+    e |= PriorityParser(FuncParser(KeyArgument('a', e) & CharParser('-') & KeyArgument('b', e), _sub), _Priority(10))
+    e |= PriorityParser(FuncParser(KeyArgument('a', e) & CharParser('*') & KeyArgument('b', e), _mul), _Priority(20))
+    return EndLineParser(e)
+
+
+@pytest.mark.parametrize('engine', ('host', 'forest'))
+def test_policy_all(engine):
+    calls = []
+    executor = Executor(_grammar(calls), engine=engine)
+
+    assert executor.execute(Line('8-4-2')) in (2, 6)
+    assert len(calls) == 4
+
+
+@pytest.mark.parametrize('engine', ('host', 'forest'))
+def test_policy_first(engine):
+    calls = []
+    executor = Executor(_grammar(calls), engine=engine, policy='first')
+
+    assert executor.execute(Line('8-4-2')) in (2, 6)
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize('engine', ('host', 'forest'))
+def test_policy_unique(engine):
+    calls = []
+    executor = Executor(_grammar(calls), engine=engine, policy='unique')
+
+    assert executor.execute(Line('8-4')) == 4
+
+    with pytest.raises(AmbiguousParseError):
+        executor.execute(Line('8-4-2'))
+
+    assert calls == ['-']
+
+
+@pytest.mark.parametrize('engine', ('host', 'forest'))
+def test_policy_priority(engine):
+    x = CharParser('x')
+    p = PriorityParser(FuncParser(x, lambda r: 'low'), _Priority(5)) \
+        | PriorityParser(FuncParser(x, lambda r: 'high'), _Priority(7)) \
+        | PriorityParser(FuncParser(x, lambda r: 'middle'), _Priority(6))
+
+    executor = Executor(p, engine=engine, policy='priority')
+
+    assert executor.execute(Line('x')) == 'high'
+
+
+def test_policy_longest():
+    x = CharParser('x')
+    executor = Executor(FuncParser(x[1:], lambda r: len(r.parsers) if hasattr(r, 'parsers') else 1),
+                        policy='longest')
+
+    assert executor.execute(Line('xxxy')) == 3
+
+
+def test_policy_wrong():
+    with pytest.raises(ValueError):
+        Executor(CharParser('x'), policy='random')
@@ -88,3 +88,19 @@ def test_str_pos_eq():
     assert Line("1234", pos=0) == Line("1234", pos=0)
     assert Line("234", pos=0) != Line("1234", pos=0)
     assert Line("234", pos=0) != Line("1234", pos=1)
+
+
+def test_offset():
+    line = Line("abcdef")
+
+    assert line.offset == 0
+    assert line[2:].offset == 2
+    assert line[2:][1:].offset == 3
+    assert line[2:][1:].line == "def"
+
+
+def test_root():
+    line = Line("abcdef")
+
+    assert line.root is line
+    assert line[2:][1:].root is line
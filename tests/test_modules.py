@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+import modules
+from line import Line
+from main import module_loader
+from modules import CACHE_DIR, ImportModuleError
+from session import Session
+
+MODULE = """\
+# Модуль для тестов
+__mod_k = 3
+__mod_f = `%%` & a:@number => a * __mod_k
+@number |= __mod_f
+"""
+
+
+@pytest.fixture
+def module_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(modules, 'module_path', [str(tmp_path)])
+    monkeypatch.setenv('ABSTRACTLY_SNAPSHOT', '1')
+    monkeypatch.setenv('ABSTRACTLY_CACHE_DIR', str(tmp_path / "cache"))
+    (tmp_path / "__mod_test.abs").write_text(MODULE, encoding='utf-8')
+    return tmp_path
+
+
+def _cached(module_dir):
+    return os.listdir(module_dir / "cache" / CACHE_DIR)
+
+
+def test_import(module_dir):
+    session = Session()
+    module = session.execute(Line("import __mod_test"))
+
+    assert not module.cached
+    assert set(module.variables) == {'__mod_k', '__mod_f'}
+    assert session.execute(Line("__mod_k")) == 3
+    assert session.execute(Line("%%2 + 1")) == 7
+    assert len(_cached(module_dir)) == 1
+
+    # Повторный import в той же сессии -- тот же модуль
+    assert session.execute(Line("import __mod_test")) is module
+
+
+def test_import_cached(module_dir):
+    Session().execute(Line("import __mod_test"))
+
+    session = Session()
+    module = session.execute(Line("import __mod_test"))
+
+    assert module.cached
+    assert session.execute(Line("%%2 + 1")) == 7
+    # Грамматику модуль расширил только в своей сессии
+    assert Session().execute(Line("%%2 + 0")) is None
+
+
+def test_import_changed(module_dir):
+    Session().execute(Line("import __mod_test"))
+    (module_dir / "__mod_test.abs").write_text(MODULE.replace("__mod_k = 3", "__mod_k = 4"), encoding='utf-8')
+
+    session = Session()
+    module = session.execute(Line("import __mod_test"))
+
+    assert not module.cached
+    assert session.execute(Line("%%2 + 0")) == 8
+    assert len(_cached(module_dir)) == 2
+
+
+def test_import_no_snapshots(module_dir, monkeypatch):
+    # Без явного включения кэш не читается и не пишется
+    monkeypatch.delenv('ABSTRACTLY_SNAPSHOT')
+    Session().execute(Line("import __mod_test"))
+
+    module = Session().execute(Line("import __mod_test"))
+
+    assert not module.cached
+    assert not (module_dir / "cache").exists()
+    assert not (module_dir / "__abscache__").exists()
+
+
+def test_import_errors(module_dir):
+    (module_dir / "__mod_bad.abs").write_text("__mod_x = 1\n__mod_x +\n", encoding='utf-8')
+    session = Session()
+
+    with session, pytest.raises(ImportModuleError, match="__mod_bad.abs:2"):
+        module_loader.load("__mod_bad", session.executor)
+
+    with pytest.raises(ImportModuleError, match="not found"):
+        module_loader.find("__mod_missing")
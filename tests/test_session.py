@@ -0,0 +1,73 @@
+import asyncio
+
+from line import Line
+from main import live_parser
+from parser import CharParser, FuncParser
+from server import SessionServer, ERROR_PREFIX
+from session import Session
+from std_parsers import number_expressions
+from std_parsers.variable import variables
+
+
+def test_session_variables():
+    first, second = Session(), Session()
+
+    assert first.execute(Line("__session_x = 2")) == 2
+    assert second.execute(Line("__session_x = 3")) == 3
+
+    assert first.execute(Line("__session_x + 1")) == 3
+    assert second.execute(Line("__session_x + 1")) == 4
+    assert '__session_x' not in variables
+
+
+def test_session_grammar_extension():
+    first, second = Session(), Session()
+    parsers = number_expressions.parsers
+
+    with first:
+        expressions = number_expressions
+        expressions |= FuncParser(CharParser.line('qq'), lambda *_: 7)
+        assert expressions is number_expressions
+
+    assert len(number_expressions.parsers) == len(parsers)
+
+    assert first.execute(Line("qq + 1")) == 8
+    assert second.execute(Line("qq + 1")) is None
+    assert second.executor.error is not None
+    assert first.execute(Line("qq * 2")) == 14
+
+
+def test_session_shares_std_grammar():
+    session = Session()
+
+    with session:
+        assert variables['@@'] is live_parser
+
+
+def test_server_sessions():
+    async def _client(port, lines):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        answers = []
+        for line in lines:
+            writer.write(f"{line}\n".encode())
+            await writer.drain()
+            answers.append((await reader.readline()).decode().rstrip("\n"))
+        writer.close()
+        return answers
+
+    async def main():
+        server = SessionServer(every=50)
+        listener = await server.start_tcp()
+        port = listener.sockets[0].getsockname()[1]
+
+        async with listener:
+            return await asyncio.gather(
+                _client(port, ["__srv = 10", "__srv * 2", "(1 + 2) * 3"]),
+                _client(port, ["__srv = 1", "__srv * 2", "__nope"]),
+            )
+
+    first, second = asyncio.run(main())
+
+    assert first == ["10", "20", "9"]
+    assert second[:2] == ["1", "2"]
+    assert second[2].startswith(ERROR_PREFIX)
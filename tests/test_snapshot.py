@@ -0,0 +1,65 @@
+import pickle
+
+import pytest
+
+from line import Line
+from main import std_grammar
+from session import Session
+from snapshot import SnapshotError, grammar_hash, load_snapshot, save_snapshot
+from std_parsers import number_expressions
+
+
+def test_snapshot_restores_session(tmp_path):
+    path = str(tmp_path / "session.snapshot")
+    first = Session()
+
+    first.execute(Line("__snap_x = 20"))
+    first.execute(Line("__snap_f = `%` & a:@number => a * 2 + __snap_x"))
+    first.execute(Line("@number |= __snap_f"))
+    assert first.execute(Line("%1 + 1")) == 23
+
+    with first:
+        saved = save_snapshot(path, std_grammar)
+    assert saved['alternatives'] >= 1
+
+    second = Session()
+    assert second.execute(Line("%1")) is None
+
+    with second:
+        load_snapshot(path, std_grammar)
+
+    assert second.execute(Line("__snap_x")) == 20
+    assert second.execute(Line("%1 + 1")) == 23
+    # Ссылки на std-грамматику -- те же объекты, а не копии
+    assert second.variables['__snap_f'].parser.parsers[1].parser is number_expressions
+
+
+def test_snapshot_stale(tmp_path):
+    path = str(tmp_path / "stale.snapshot")
+
+    with open(path, 'wb') as f:
+        pickle.dump({'version': 1, 'hash': grammar_hash() + "-old"}, f)
+
+    with pytest.raises(SnapshotError):
+        load_snapshot(path, std_grammar)
+
+
+def test_snapshot_version(tmp_path):
+    path = str(tmp_path / "version.snapshot")
+
+    with open(path, 'wb') as f:
+        pickle.dump({'version': -1, 'hash': grammar_hash()}, f)
+
+    with pytest.raises(SnapshotError):
+        load_snapshot(path, std_grammar)
+
+
+def test_snapshot_writable_by_others(tmp_path):
+    path = tmp_path / "shared.snapshot"
+
+    with Session():
+        save_snapshot(str(path), std_grammar)
+    path.chmod(0o666)
+
+    with pytest.raises(SnapshotError, match="writable"):
+        load_snapshot(str(path), std_grammar)
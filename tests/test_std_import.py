@@ -0,0 +1,70 @@
+import subprocess
+import sys
+
+# Сколько можно потратить на импорт только арифметики (с запуском интерпретатора)
+IMPORT_BUDGET = 1.0
+
+
+def _run(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        check=True, stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout
+
+
+def test_import_is_lazy():
+    loaded = _run(
+        "import sys, std_parsers\n"
+        "print(sorted(m for m in sys.modules if m.startswith('std_parsers.')))"
+    )
+
+    assert loaded.strip() == "[]"
+
+
+def test_numbers_only():
+    loaded = _run(
+        "import sys\n"
+        "from std_parsers import number_expressions\n"
+        "print(sorted(m for m in sys.modules if m.startswith('std_parsers.')))"
+    )
+
+    assert "'std_parsers.numbers'" in loaded
+    assert "std_parsers.parser" not in loaded
+    assert "std_parsers.comment" not in loaded
+
+
+def test_lazy_variable():
+    result = _run(
+        "import sys\n"
+        "import std_parsers\n"
+        "from std_parsers.variable import variables\n"
+        "assert 'std_parsers.parser' not in sys.modules\n"
+        "print(variables['@parser'] is std_parsers.parser_parser)"
+    )
+
+    assert result.strip() == "True"
+
+
+def test_lazy_in_session():
+    # Грамматика, впервые построенная внутри сессии, общая для всех
+    result = _run(
+        "import std_parsers\n"
+        "from session import Session\n"
+        "with Session():\n"
+        "    parser_parser = std_parsers.parser_parser\n"
+        "    in_session = len(parser_parser.parsers)\n"
+        "print(len(parser_parser._parsers) == in_session > 0)"
+    )
+
+    assert result.strip() == "True"
+
+
+def test_import_budget():
+    elapsed = _run(
+        "import time\n"
+        "started = time.perf_counter()\n"
+        "from std_parsers import number_expressions\n"
+        "print(time.perf_counter() - started)"
+    )
+
+    assert float(elapsed) < IMPORT_BUDGET